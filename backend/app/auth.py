@@ -3,12 +3,13 @@ from typing import Optional
 from jose import jwt, JWTError  # УДАЛИ ЭТУ СТРОКУ если python-jose не установлен
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 
-from backend.app.database import get_db
+from backend.app.database import get_db, use_user_shard
 from backend.app import models
 
 load_dotenv()
@@ -55,22 +56,38 @@ def verify_token(token: str):
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Неверные учетные данные"
-    )
-    
-    payload = verify_token(token)
+def user_from_token(db: Session, token: Optional[str]):
+    """Пользователь по JWT с сессией, привязанной к его шарду, или None."""
+    payload = verify_token(token) if token else None
     if not payload:
-        raise credentials_exception
+        return None
     
     user_id: str = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        return None
     
     user = db.query(models.User).filter(models.User.id == int(user_id)).first()
     if user is None:
-        raise credentials_exception
+        return None
     
+    use_user_shard(db, user)
+    return user
+
+async def get_current_user(
+    connection: HTTPConnection,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    batch = connection.scope.get("fitlog.batch")
+    if batch:
+        return batch["user"]
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Неверные учетные данные"
+    )
+    
+    user = user_from_token(db, token)
+    if user is None:
+        raise credentials_exception
     return user
\ No newline at end of file
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class ResultCache:
+    """LRU-кэш результатов агрегатов с TTL и сбросом по пользователю.
+
+    Ключ всегда начинается с user_id. При записи данных пользователя
+    его "поколение" получает новый номер, и все старые ключи перестают совпадать.
+    Поколения хранятся для maxsize последних сброшенных пользователей (LRU).
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = OrderedDict()
+        # номера поколений общие для всех пользователей и не повторяются;
+        # у пользователей без своего поколения оно равно _floor
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, self._floor)
+
+    def _full_key(self, user_id: int, key: Hashable):
+        return (user_id, self._generation(user_id), key)
+
+    def get(self, user_id: int, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            full_key = self._full_key(user_id, key)
+            entry = self._data.get(full_key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[full_key]
+                return None
+            self._data.move_to_end(full_key)
+            return value
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generation(user_id)
+
+    def set(self, user_id: int, key: Hashable, value: Any, ttl: Optional[float] = None,
+            generation: Optional[int] = None):
+        with self._lock:
+            # результат, посчитанный до записи данных пользователя, уже устарел
+            if generation is not None and generation != self._generation(user_id):
+                return
+            full_key = self._full_key(user_id, key)
+            self._data[full_key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._counter += 1
+            self._generations[user_id] = self._counter
+            self._generations.move_to_end(user_id)
+            while len(self._generations) > self.maxsize:
+                self._generations.popitem(last=False)
+                # вытесненный пользователь не должен вернуться к старому поколению,
+                # поэтому пользователи без своего поколения получают новый номер
+                self._floor = self._counter
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+            self._floor = self._counter
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые вычисления.
+
+    Первый поток с данным ключом считает результат, остальные ждут его
+    и получают тот же результат (или ту же ошибку).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+result_cache = ResultCache()
+single_flight = SingleFlight()
+
+def cached(user_id: int, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+    """Результат из кэша, иначе одно вычисление на все одновременные запросы.
+
+    Поколение входит в ключ single-flight: запросы после записи данных
+    не присоединяются к вычислению, начатому до нее.
+    """
+    value = result_cache.get(user_id, key)
+    if value is not None:
+        return value
+
+    generation = result_cache.generation(user_id)
+
+    def load():
+        # между промахом и началом вычисления результат мог положить предыдущий лидер
+        value = result_cache.get(user_id, key)
+        if value is None:
+            value = compute()
+            result_cache.set(user_id, key, value, ttl, generation=generation)
+        return value
+
+    return single_flight.do((user_id, generation, key), load)
@@ -0,0 +1,63 @@
+from typing import List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets: сохраняет форму ряда при прореживании.
+
+    Точки должны быть отсортированы по x. Первая и последняя точки сохраняются всегда.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        bucket_start = int(i * bucket_size) + 1
+        bucket_end = int((i + 1) * bucket_size) + 1
+
+        next_start = bucket_end
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        next_size = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / next_size
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / next_size
+
+        ax, ay = points[selected]
+        max_area = -1.0
+        for j in range(bucket_start, bucket_end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                selected = j
+        sampled.append(points[selected])
+
+    sampled.append(points[-1])
+    return sampled
+
+def min_max(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Делит ряд на threshold / 2 корзин и оставляет в каждой минимум и максимум."""
+    count = len(points)
+    if threshold >= count or threshold < 2:
+        return list(points)
+
+    buckets = threshold // 2
+    bucket_size = count / buckets
+    sampled = []
+
+    for i in range(buckets):
+        bucket = points[int(i * bucket_size):int((i + 1) * bucket_size)]
+        if not bucket:
+            continue
+        low = min(bucket, key=lambda p: p[1])
+        high = max(bucket, key=lambda p: p[1])
+        sampled.extend(sorted({low, high}))
+
+    return sampled
+
+METHODS = {
+    "lttb": lttb,
+    "minmax": min_max,
+}
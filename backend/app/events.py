@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app import models
+
+QUEUE_SIZE = int(os.getenv("FITLOG_STREAM_QUEUE", "100"))
+HEARTBEAT_SECONDS = float(os.getenv("FITLOG_STREAM_HEARTBEAT", "15"))
+
+class Subscription:
+    def __init__(self, user_id: int, loop, size: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def _put(self, event: dict):
+        # выполняется в цикле событий подписчика
+        if self.queue.full():
+            # клиент не успевает читать: вместо выборочной потери событий
+            # сбрасываем очередь и просим перечитать дашборд целиком
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync", "data": {}}
+        self.queue.put_nowait(event)
+
+class EventBus:
+    """Публикация изменений подписчикам внутри процесса.
+
+    publish вызывается из обработчиков в пуле потоков, очереди живут в цикле
+    событий подписчика. Без подписчиков публикация - один поиск в словаре,
+    поэтому события для дашборда стоит собирать только при has_subscribers.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: int, event_type: str, data: Optional[dict] = None):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        event = {"type": event_type, "data": data or {}}
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # цикл подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+event_bus = EventBus()
+
+def publish_workout(user_id: int, action: str, workout: models.Workout):
+    if event_bus.has_subscribers(user_id):
+        event_bus.publish(user_id, "workout", {
+            "action": action,
+            "id": workout.id,
+            "date": str(workout.date),
+            "name": workout.name,
+            "duration": workout.duration
+        })
+
+def publish_meal(db: Session, user_id: int, action: str, meal: models.Meal, *days: date):
+    """Событие о приеме пищи и пересчитанные итоги за его день (и прежний день при переносе)."""
+    if not event_bus.has_subscribers(user_id):
+        return
+    event_bus.publish(user_id, "meal", {
+        "action": action,
+        "id": meal.id,
+        "date": str(meal.date),
+        "meal_type": meal.meal_type,
+        "name": meal.name,
+        "calories": meal.calories
+    })
+    for day in {meal.date, *days}:
+        publish_daily_totals(db, user_id, day)
+
+def publish_daily_totals(db: Session, user_id: int, day: date):
+    if not event_bus.has_subscribers(user_id):
+        return
+    row = db.query(
+        func.count(models.Meal.id).label("meal_count"),
+        func.coalesce(func.sum(models.Meal.calories), 0).label("calories"),
+        func.coalesce(func.sum(models.Meal.protein), 0).label("protein"),
+        func.coalesce(func.sum(models.Meal.carbs), 0).label("carbs"),
+        func.coalesce(func.sum(models.Meal.fat), 0).label("fat")
+    ).filter(
+        models.Meal.user_id == user_id,
+        models.Meal.date == day
+    ).one()
+    event_bus.publish(user_id, "daily_totals", {
+        "date": str(day),
+        "meal_count": row.meal_count,
+        "totals": {
+            "calories": row.calories,
+            "protein": row.protein,
+            "carbs": row.carbs,
+            "fat": row.fat
+        }
+    })
+
+def publish_goal(user_id: int, action: str, goal: models.Goal):
+    if not event_bus.has_subscribers(user_id):
+        return
+    progress = None
+    if goal.target_value:
+        progress = round(min((goal.current_value or 0) / goal.target_value, 1.0) * 100, 1)
+    event_bus.publish(user_id, "goal", {
+        "action": action,
+        "id": goal.id,
+        "title": goal.title,
+        "current_value": goal.current_value,
+        "target_value": goal.target_value,
+        "progress": progress,
+        "is_completed": goal.is_completed
+    })
+
+def publish_deleted(user_id: int, event_type: str, entity_id: int):
+    if event_bus.has_subscribers(user_id):
+        event_bus.publish(user_id, event_type, {"action": "deleted", "id": entity_id})
+
+def publish_refresh(user_id: int, *entities: str):
+    # массовые и отложенные изменения: клиент перечитывает перечисленные разделы
+    if event_bus.has_subscribers(user_id):
+        event_bus.publish(user_id, "refresh", {"entities": sorted(entities)})
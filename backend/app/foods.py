@@ -0,0 +1,207 @@
+import csv
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, object_session
+
+from backend.app import models
+from backend.app.cache import SingleFlight
+
+DEFAULT_DATASET = Path(__file__).parent / "data" / "foods.csv"
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat")
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+class FoodIndex:
+    """Префиксный индекс справочника продуктов в памяти.
+
+    Для каждой области (user_id или None для общего справочника) хранится
+    отсортированный список пар (слово, food_id), поиск идет через bisect.
+    Области загружаются лениво и сбрасываются при изменении справочника.
+    При шардировании у каждого шарда свои id, поэтому ключ включает шард.
+
+    Загрузка идет вне блокировки: одновременные промахи по одной области
+    ждут один запрос к базе. В памяти не больше maxsize областей и maxsize
+    поколений сброшенных областей (LRU).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._scopes = OrderedDict()
+        # как в ResultCache: номера поколений не повторяются, по умолчанию - _floor
+        self._generations = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._loads = SingleFlight()
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id: Optional[int]) -> int:
+        return self._generations.get(user_id, self._floor)
+
+    def _load_scope(self, db: Session, user_id: Optional[int]):
+        foods = {}
+        entries = []
+        for food in db.query(models.Food).filter(models.Food.user_id == user_id).all():
+            foods[food.id] = food.to_dict()
+            for word in set(_words(food.name)):
+                entries.append((word, food.id))
+        entries.sort()
+        return entries, foods
+
+    def _scope(self, db: Session, user_id: Optional[int]):
+        key = (db.info.get("shard"), user_id)
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is not None:
+                self._scopes.move_to_end(key)
+                return scope
+            generation = self._generation(user_id)
+
+        def load():
+            scope = self._load_scope(db, user_id)
+            with self._lock:
+                # справочник изменился во время загрузки - такой снимок не кэшируется
+                if generation == self._generation(user_id):
+                    self._scopes[key] = scope
+                    while len(self._scopes) > self.maxsize:
+                        self._scopes.popitem(last=False)
+            return scope
+
+        return self._loads.do((key, generation), load)
+
+    def _prefix_ids(self, entries, prefix: str):
+        ids = set()
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and entries[position][0].startswith(prefix):
+            ids.add(entries[position][1])
+            position += 1
+        return ids
+
+    def suggest(self, db: Session, user_id: int, query: str, limit: int = 10):
+        tokens = _words(query)
+        if not tokens:
+            return []
+
+        results = []
+        for scope in (user_id, None):
+            entries, foods = self._scope(db, scope)
+            ids = self._prefix_ids(entries, tokens[0])
+            for token in tokens[1:]:
+                ids &= self._prefix_ids(entries, token)
+            found = [foods[food_id] for food_id in ids]
+            found.sort(key=lambda f: (-(f["usage_count"] or 0), f["name"]))
+            results.extend(found)
+            if len(results) >= limit:
+                break
+
+        return results[:limit]
+
+    def record_usage(self, food: models.Food):
+        key = (object_session(food).info.get("shard"), food.user_id)
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is not None and food.id in scope[1]:
+                scope[1][food.id]["usage_count"] = food.usage_count
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            self._counter += 1
+            self._generations[user_id] = self._counter
+            self._generations.move_to_end(user_id)
+            while len(self._generations) > self.maxsize:
+                self._generations.popitem(last=False)
+                self._floor = self._counter
+            for key in [key for key in self._scopes if key[1] == user_id]:
+                del self._scopes[key]
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._generations.clear()
+            self._floor = self._counter
+
+food_index = FoodIndex()
+
+def get_food(db: Session, user_id: int, food_id: int) -> Optional[models.Food]:
+    return db.query(models.Food).filter(
+        models.Food.id == food_id,
+        (models.Food.user_id == user_id) | (models.Food.user_id.is_(None))
+    ).first()
+
+def fill_from_food(meal_fields: dict, explicit: set, food: models.Food) -> dict:
+    """Берет из продукта название и БЖУ, которые не были заданы в запросе явно."""
+    if "name" not in explicit:
+        meal_fields["name"] = food.name
+    for field in MACRO_FIELDS:
+        if field not in explicit:
+            meal_fields[field] = getattr(food, field)
+    return meal_fields
+
+def seed_from_meals(db: Session, user_id: int) -> int:
+    """Добавляет в справочник пользователя все его блюда, которых там еще нет."""
+    known_names = select(models.Food.name).where(models.Food.user_id == user_id)
+    distinct_meals = select(
+        models.Meal.user_id,
+        models.Meal.name,
+        func.avg(models.Meal.calories),
+        func.avg(models.Meal.protein),
+        func.avg(models.Meal.carbs),
+        func.avg(models.Meal.fat),
+        func.count(models.Meal.id),
+        func.current_timestamp()
+    ).where(
+        models.Meal.user_id == user_id,
+        models.Meal.name.not_in(known_names)
+    ).group_by(models.Meal.user_id, models.Meal.name)
+
+    result = db.execute(insert(models.Food).from_select(
+        ["user_id", "name", "calories", "protein", "carbs", "fat", "usage_count", "created_at"],
+        distinct_meals
+    ))
+    db.commit()
+    food_index.invalidate(user_id)
+    return result.rowcount
+
+def import_dataset(db: Session, path: Path = DEFAULT_DATASET) -> int:
+    """Импортирует общий справочник из CSV (name, calories, protein, carbs, fat)."""
+    known_names = {
+        name for (name,) in db.query(models.Food.name).filter(models.Food.user_id.is_(None))
+    }
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = row["name"].strip()
+            if not name or name in known_names:
+                continue
+            known_names.add(name)
+            food = {"user_id": None, "name": name, "usage_count": 0, "created_at": datetime.utcnow()}
+            for field in MACRO_FIELDS:
+                food[field] = float(row[field]) if row.get(field) else None
+            rows.append(food)
+
+    if rows:
+        db.execute(insert(models.Food), rows)
+        db.commit()
+    food_index.invalidate(None)
+    return len(rows)
+
+if __name__ == "__main__":
+    from backend.app.database import SHARDS, init_db, open_shard_session, shard_names
+
+    init_db()
+    dataset = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DATASET
+    # общий справочник нужен в каждом шарде; новые шарды копируют его из основной базы
+    for shard in (shard_names() if SHARDS else [None]):
+        db = open_shard_session(shard)
+        try:
+            print(f"{shard or 'fitlog.db'}: импортировано продуктов: {import_dataset(db, dataset)}")
+        finally:
+            db.close()
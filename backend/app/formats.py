@@ -0,0 +1,100 @@
+import json
+import struct
+import sys
+from array import array
+from datetime import date
+from typing import Dict, List, Optional
+
+from fastapi import Response
+
+# format=json - обычный список объектов, columnar - колонки массивами,
+# packed - application/octet-stream с колонками float32
+SERIES_FORMAT_PATTERN = "^(json|columnar|packed)$"
+
+EPOCH = date(1970, 1, 1)
+
+Columns = Dict[str, list]
+
+def columns_from_rows(rows, keys: List[str]) -> Columns:
+    columns = {key: [] for key in keys}
+    for row in rows:
+        for key, value in zip(keys, row):
+            columns[key].append(value)
+    return columns
+
+def _is_date_column(values: list) -> bool:
+    return bool(values) and isinstance(values[0], date)
+
+def _delta_encode(values: List[date]) -> List[int]:
+    deltas = []
+    previous = values[0]
+    for value in values:
+        deltas.append((value - previous).days)
+        previous = value
+    return deltas
+
+def to_columnar(columns: Columns, delta_dates: bool = False) -> dict:
+    result = {}
+    for key, values in columns.items():
+        if _is_date_column(values):
+            if delta_dates:
+                result[f"{key}_start"] = values[0].isoformat()
+                values = _delta_encode(values)
+            else:
+                values = [v.isoformat() for v in values]
+        result[key] = values
+    return result
+
+def _float_column(values: list) -> Optional[array]:
+    if _is_date_column(values):
+        return array("f", ((v - EPOCH).days for v in values))
+    if all(v is None or isinstance(v, (int, float)) for v in values):
+        return array("f", (float("nan") if v is None else v for v in values))
+    return None
+
+def pack_tables(tables: Dict[str, Columns], meta: Optional[dict] = None) -> bytes:
+    """Упаковывает таблицы в бинарный формат.
+
+    Структура: uint32 длина заголовка, JSON-заголовок (дополненный пробелами
+    до кратности 4), затем числовые колонки подряд как little-endian float32.
+    Даты хранятся как число дней от 1970-01-01, None - как NaN.
+    Нечисловые колонки целиком кладутся в заголовок.
+    """
+    header = {"meta": meta or {}, "tables": []}
+    body = bytearray()
+
+    for name, columns in tables.items():
+        table = {"name": name, "rows": 0, "columns": [], "strings": {}}
+        for key, values in columns.items():
+            table["rows"] = len(values)
+            packed = _float_column(values)
+            if packed is None:
+                table["strings"][key] = values
+                continue
+            if sys.byteorder == "big":
+                packed.byteswap()
+            table["columns"].append({
+                "name": key,
+                "type": "date" if _is_date_column(values) else "float32",
+                "offset": len(body)
+            })
+            body.extend(packed.tobytes())
+        header["tables"].append(table)
+
+    header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 4)
+    return struct.pack("<I", len(header_bytes)) + header_bytes + bytes(body)
+
+def encode_tables(
+    tables: Dict[str, Columns],
+    fmt: str,
+    delta_dates: bool = False,
+    meta: Optional[dict] = None
+):
+    if fmt == "packed":
+        return Response(content=pack_tables(tables, meta), media_type="application/octet-stream")
+
+    result = dict(meta or {})
+    for name, columns in tables.items():
+        result[name] = to_columnar(columns, delta_dates)
+    return result
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, SessionTransaction
+
+from backend.app import models
+from backend.app.database import SHARDS, open_shard_session, shard_names
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv("FITLOG_IDEMPOTENCY_TTL_HOURS", "24")))
+COMPACT_INTERVAL = float(os.getenv("FITLOG_IDEMPOTENCY_COMPACT_SECONDS", "600"))
+COMPACT_BATCH = 1000
+
+def request_hash(route: str, payload: BaseModel) -> str:
+    # только присланные поля: повтор без даты на следующий день получил бы другую дату по умолчанию
+    body = json.dumps(payload.model_dump(mode="json", exclude_unset=True), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{route}\n{body}".encode()).hexdigest()
+
+def _replay(record: models.IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        status_code=record.status_code,
+        content=json.loads(record.response),
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def find_response(db: Session, user_id: int, key: str, route: str, payload: BaseModel) -> Optional[JSONResponse]:
+    record = db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.expires_at > datetime.utcnow()
+    ).first()
+    if record is None:
+        return None
+    if record.request_hash != request_hash(route, payload):
+        raise HTTPException(status_code=422, detail="Idempotency-Key уже использован для другого запроса")
+    return _replay(record)
+
+def save_response(db: Session, savepoint: SessionTransaction, user_id: int, key: str, route: str,
+                  payload: BaseModel, status_code: int, body: dict) -> Optional[JSONResponse]:
+    """Сохраняет ответ в текущей транзакции, вызывается перед commit.
+
+    savepoint - db.begin_nested(), открытый до записи самих данных. Если тот же
+    ключ успел зафиксировать параллельный запрос, откатывается только он (запись
+    этого запроса и ключ) и возвращается сохраненный ответ; если ответа уже нет
+    (ключ истек, ошибка не из-за ключа) - 409.
+    """
+    now = datetime.utcnow()
+    # просроченная запись с тем же ключом еще может лежать до чистки
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.expires_at <= now
+    ).delete(synchronize_session=False)
+    db.add(models.IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=request_hash(route, payload),
+        status_code=status_code,
+        response=json.dumps(body, ensure_ascii=False),
+        created_at=now,
+        expires_at=now + IDEMPOTENCY_TTL
+    ))
+    try:
+        db.flush()
+    except IntegrityError:
+        savepoint.rollback()
+        stored = find_response(db, user_id, key, route, payload)
+        if stored is None:
+            raise HTTPException(status_code=409, detail="Не удалось сохранить запрос с этим Idempotency-Key, повторите позже")
+        return stored
+    savepoint.commit()
+    return None
+
+def compact_expired(db: Session) -> int:
+    """Удаляет просроченные ключи порциями, чтобы не держать долго блокировку записи."""
+    removed = 0
+    while True:
+        expired = db.query(models.IdempotencyKey.id).filter(
+            models.IdempotencyKey.expires_at <= datetime.utcnow()
+        ).limit(COMPACT_BATCH).subquery()
+        count = db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.id.in_(expired.select())
+        ).delete(synchronize_session=False)
+        db.commit()
+        removed += count
+        if count < COMPACT_BATCH:
+            return removed
+
+class IdempotencyCompactor:
+    """Периодическая чистка просроченных ключей во всех шардах."""
+
+    def __init__(self, interval: float = COMPACT_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def compact(self) -> int:
+        removed = 0
+        for shard in (shard_names() if SHARDS else [None]):
+            db = open_shard_session(shard)
+            try:
+                removed += compact_expired(db)
+            finally:
+                db.close()
+        return removed
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                removed = await loop.run_in_executor(None, self.compact)
+                if removed:
+                    logger.info("Удалено просроченных ключей идемпотентности: %s", removed)
+            except Exception:
+                logger.exception("Ошибка чистки ключей идемпотентности")
+            await asyncio.sleep(self.interval)
+
+idempotency_compactor = IdempotencyCompactor()
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import SHARDS, SessionLocal, use_user_shard
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Optional[int], dict, Callable[[float], None]], Optional[dict]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+def job_handler(kind: str):
+    def register(func: JobHandler):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+class JobRunner:
+    """Фоновое выполнение тяжелых задач вне обработчиков запросов.
+
+    Задачи хранятся в таблице jobs, поэтому незавершенные задачи
+    переживают перезапуск. Одновременно выполняется не больше
+    concurrency задач, сами обработчики синхронные и идут в пуле потоков.
+    """
+
+    def __init__(self, concurrency: int = 2, retry_delay: float = 2.0):
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+        self._queue = None
+        self._loop = None
+        self._workers = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for job_id in await self._loop.run_in_executor(None, self._recover):
+            self._queue.put_nowait(job_id)
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, db: Session, kind: str, user_id: Optional[int] = None,
+               params: Optional[dict] = None, max_attempts: int = 3) -> models.Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+
+        job = models.Job(
+            user_id=user_id,
+            kind=kind,
+            status="queued",
+            progress=0,
+            attempts=0,
+            max_attempts=max_attempts,
+            params=json.dumps(params or {}, ensure_ascii=False)
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._enqueue(job.id)
+        return job
+
+    def _enqueue(self, job_id: int, delay: float = 0):
+        # submit вызывается из потоков пула, очередь живет в цикле событий
+        if not self.running:
+            return
+        if delay:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._queue.put_nowait, job_id)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+
+    def _recover(self):
+        db = SessionLocal()
+        try:
+            db.query(models.Job).filter(models.Job.status == "running").update(
+                {"status": "queued"}, synchronize_session=False
+            )
+            db.commit()
+            return [job_id for (job_id,) in db.query(models.Job.id).filter(
+                models.Job.status == "queued"
+            ).order_by(models.Job.id)]
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                retry = await self._loop.run_in_executor(None, self._execute, job_id)
+                if retry:
+                    self._enqueue(job_id, delay=self.retry_delay * retry)
+            except Exception:
+                logger.exception("Ошибка обработки задачи %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job_id: int) -> int:
+        """Выполняет задачу, возвращает номер попытки, если нужен повтор, иначе 0."""
+        db = SessionLocal()
+        try:
+            job = db.get(models.Job, job_id)
+            if job is None or job.status != "queued":
+                return 0
+
+            job.status = "running"
+            job.attempts = (job.attempts or 0) + 1
+            job.started_at = datetime.utcnow()
+            db.commit()
+            if SHARDS and job.user_id is not None:
+                use_user_shard(db, db.get(models.User, job.user_id))
+
+            # report фиксирует текущую транзакцию обработчика: отдельное соединение
+            # ждало бы блокировку записи SQLite, которую держит сам обработчик
+            def report(progress: float):
+                db.execute(
+                    update(models.Job).where(models.Job.id == job_id)
+                    .values(progress=max(0.0, min(1.0, progress)))
+                )
+                db.commit()
+
+            handler = JOB_HANDLERS[job.kind]
+            params = json.loads(job.params) if job.params else {}
+            try:
+                result = handler(db, job.user_id, params, report)
+            except Exception:
+                db.rollback()
+                job = db.get(models.Job, job_id)
+                job.error = traceback.format_exc(limit=5)
+                if job.attempts < job.max_attempts:
+                    job.status = "queued"
+                    db.commit()
+                    return job.attempts
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+                db.commit()
+                return 0
+
+            job.status = "succeeded"
+            job.progress = 1.0
+            job.error = None
+            job.result = json.dumps(result or {}, ensure_ascii=False, default=str)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return 0
+        finally:
+            db.close()
+
+job_runner = JobRunner()
+
+@job_handler("seed_foods")
+def _seed_foods(db: Session, user_id: Optional[int], params: dict, report):
+    from backend.app.foods import seed_from_meals
+
+    return {"added": seed_from_meals(db, user_id)}
+
+@job_handler("rebuild_search_index")
+def _rebuild_search_index(db: Session, user_id: Optional[int], params: dict, report):
+    from backend.app.search import rebuild_user_index
+
+    return {"indexed": rebuild_user_index(db, user_id, report)}
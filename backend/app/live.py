@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import exists, insert, or_, update
+
+from backend.app import models, schemas
+from backend.app.cache import result_cache
+from backend.app.database import SHARDS, open_shard_session, shard_names
+from backend.app.events import publish_refresh
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_MS = int(os.getenv("FITLOG_LIVE_FLUSH_MS", "1000"))
+FLUSH_MAX_EVENTS = int(os.getenv("FITLOG_LIVE_MAX_PENDING", "200"))
+# сколько хранится состояние для продолжения после переподключения
+LIVE_STATE_TTL = timedelta(hours=float(os.getenv("FITLOG_LIVE_STATE_TTL_HOURS", "168")))
+PURGE_INTERVAL = float(os.getenv("FITLOG_LIVE_PURGE_SECONDS", "3600"))
+
+class LiveSession:
+    """Состояние живой тренировки между сбросами в базу.
+
+    События копятся в памяти и записываются пачкой: новые упражнения, затем
+    подходы одним INSERT. Номер последнего записанного события и id упражнений,
+    созданных по ссылкам клиента, хранятся в live_sessions в той же транзакции,
+    поэтому после переподключения (и перезапуска сервера) клиент досылает
+    только события с номером больше received.
+    """
+
+    def __init__(self, workout_id: int, user_id: int, shard: Optional[str], saved: int,
+                 refs: dict, exercise_ids: set):
+        self.workout_id = workout_id
+        self.user_id = user_id
+        self.shard = shard
+        self.saved = saved
+        self.received = saved
+        self.refs = refs
+        self.exercise_ids = exercise_ids
+        self.pending = []
+        self.pending_refs = set()
+        self.websocket = None
+        self.lock = asyncio.Lock()
+
+    async def add(self, event: dict) -> Optional[str]:
+        """Принимает событие клиента; возвращает текст ошибки или None.
+
+        received растет только для принятых событий: отклоненное клиент
+        может исправить и прислать снова с тем же номером.
+        """
+        kind = event.get("type")
+        try:
+            if kind == "exercise":
+                data = schemas.LiveExerciseEvent.model_validate(event)
+            elif kind == "set":
+                data = schemas.LiveSetEvent.model_validate(event)
+            else:
+                return "Неизвестный тип события"
+        except ValueError:
+            return "Неверный формат события"
+
+        if data.seq <= self.received:
+            # повтор после переподключения: уже принято
+            return None
+
+        if kind == "exercise":
+            if data.ref in self.refs or data.ref in self.pending_refs:
+                return "Ссылка на упражнение уже использована"
+            self.pending_refs.add(data.ref)
+        elif data.exercise_id is not None:
+            if data.exercise_id not in self.exercise_ids:
+                # упражнение могли добавить через REST уже после открытия сессии
+                self.exercise_ids = await asyncio.get_running_loop().run_in_executor(None, self._load_exercise_ids)
+                if data.exercise_id not in self.exercise_ids:
+                    return "Упражнение не найдено"
+        elif data.exercise_ref is None or (
+            data.exercise_ref not in self.refs and data.exercise_ref not in self.pending_refs
+        ):
+            return "Упражнение не найдено"
+
+        self.received = data.seq
+        self.pending.append((kind, data))
+        return None
+
+    def _load_exercise_ids(self) -> set:
+        db = open_shard_session(self.shard)
+        try:
+            return load_exercise_ids(db, self.workout_id)
+        finally:
+            db.close()
+
+    @property
+    def due(self) -> bool:
+        return len(self.pending) >= FLUSH_MAX_EVENTS
+
+    async def flush(self) -> bool:
+        """Сбрасывает накопленное; возвращает True, если что-то записано."""
+        async with self.lock:
+            if not self.pending:
+                return False
+            batch = list(self.pending)
+            refs = await asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+            del self.pending[:len(batch)]
+            self.refs = refs
+            self.pending_refs.difference_update(refs)
+            self.exercise_ids.update(refs.values())
+            self.saved = batch[-1][1].seq
+        result_cache.invalidate_user(self.user_id)
+        publish_refresh(self.user_id, "workouts")
+        return True
+
+    def _write(self, batch) -> dict:
+        refs = dict(self.refs)
+        db = open_shard_session(self.shard)
+        try:
+            state = db.query(models.LiveSessionState).filter(
+                models.LiveSessionState.workout_id == self.workout_id
+            ).first()
+            if state is None:
+                state = models.LiveSessionState(workout_id=self.workout_id, last_seq=0)
+                db.add(state)
+            else:
+                # запись могла завершиться, когда ожидавший ее обработчик уже отменен
+                refs.update(json.loads(state.refs))
+                batch = [(kind, data) for kind, data in batch if data.seq > state.last_seq]
+                if not batch:
+                    return refs
+
+            exercises = [data for kind, data in batch if kind == "exercise"]
+            if exercises:
+                rows = [
+                    {"workout_id": self.workout_id, **data.dict(include={"name", "category", "order"})}
+                    for data in exercises
+                ]
+                if db.get_bind().dialect.insert_returning:
+                    ids = db.scalars(
+                        insert(models.Exercise).returning(models.Exercise.id, sort_by_parameter_order=True),
+                        rows
+                    ).all()
+                else:
+                    ids = [db.execute(insert(models.Exercise), row).inserted_primary_key[0] for row in rows]
+                refs.update({data.ref: exercise_id for data, exercise_id in zip(exercises, ids)})
+
+            set_rows = [
+                {
+                    "exercise_id": data.exercise_id if data.exercise_id is not None else refs[data.exercise_ref],
+                    **data.dict(exclude={"seq", "exercise_id", "exercise_ref"})
+                }
+                for kind, data in batch if kind == "set"
+            ]
+            if set_rows:
+                db.execute(insert(models.ExerciseSet), set_rows)
+
+            # вставка в обход ORM не вызывает before_flush из sync.py
+            db.execute(
+                update(models.Workout)
+                .where(models.Workout.id == self.workout_id)
+                .values(updated_at=datetime.utcnow())
+            )
+            state.last_seq = batch[-1][1].seq
+            state.refs = json.dumps(refs)
+            db.commit()
+            return refs
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+def load_exercise_ids(db, workout_id: int) -> set:
+    return {exercise_id for (exercise_id,) in db.query(models.Exercise.id).filter(
+        models.Exercise.workout_id == workout_id
+    )}
+
+def purge_live_states(db) -> int:
+    """Удаляет состояния удаленных тренировок и не менявшиеся дольше LIVE_STATE_TTL."""
+    removed = db.query(models.LiveSessionState).filter(or_(
+        models.LiveSessionState.updated_at < datetime.utcnow() - LIVE_STATE_TTL,
+        ~exists().where(models.Workout.id == models.LiveSessionState.workout_id)
+    )).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+class LiveSessions:
+    """Открытые живые сессии по id тренировки; одна активная связь на тренировку."""
+
+    def __init__(self):
+        self._sessions: Dict[int, LiveSession] = {}
+
+    def get(self, workout_id: int) -> Optional[LiveSession]:
+        return self._sessions.get(workout_id)
+
+    def open(self, db, workout: models.Workout) -> LiveSession:
+        session = self._sessions.get(workout.id)
+        if session is not None:
+            # несброшенные события после ошибки записи остаются в памяти
+            return session
+
+        state = db.query(models.LiveSessionState).filter(
+            models.LiveSessionState.workout_id == workout.id
+        ).first()
+        # id тренировки в SQLite может достаться новой записи после удаления старой
+        if state is not None and state.updated_at and workout.created_at and state.updated_at < workout.created_at:
+            db.delete(state)
+            db.commit()
+            state = None
+
+        session = LiveSession(
+            workout.id, workout.user_id, db.info.get("shard"),
+            state.last_seq if state else 0,
+            json.loads(state.refs) if state else {},
+            load_exercise_ids(db, workout.id)
+        )
+        self._sessions[workout.id] = session
+        return session
+
+    def close(self, session: LiveSession):
+        if not session.pending and self._sessions.get(session.workout_id) is session:
+            del self._sessions[session.workout_id]
+
+    def clear(self):
+        self._sessions.clear()
+
+live_sessions = LiveSessions()
+
+class LiveStatePurger:
+    """Периодическая чистка старых состояний живых тренировок во всех шардах."""
+
+    def __init__(self, interval: float = PURGE_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def purge(self) -> int:
+        removed = 0
+        for shard in (shard_names() if SHARDS else [None]):
+            db = open_shard_session(shard)
+            try:
+                removed += purge_live_states(db)
+            finally:
+                db.close()
+        return removed
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                removed = await loop.run_in_executor(None, self.purge)
+                if removed:
+                    logger.info("Удалено состояний живых тренировок: %s", removed)
+            except Exception:
+                logger.exception("Ошибка чистки состояний живых тренировок")
+            await asyncio.sleep(self.interval)
+
+live_state_purger = LiveStatePurger()
@@ -4,18 +4,31 @@ from fastapi.staticfiles import StaticFiles
 import os
 from contextlib import asynccontextmanager
 
-from backend.app.database import engine, Base
-from backend.app.routers import users, workouts, meals, measurements, goals, stats
+from backend.app.database import init_db
+from backend.app.idempotency import idempotency_compactor
+from backend.app.jobs import job_runner
+from backend.app.live import live_state_purger
+from backend.app.write_buffer import write_buffer
+from backend.app.ratelimit import RateLimitMiddleware
+from backend.app.routers import users, workouts, meals, measurements, goals, stats, search, foods, batch, sync, jobs, buffered, templates, bulk, live, stream
 
 # Создаем таблицы
-Base.metadata.create_all(bind=engine)
+init_db()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Запуск приложения
+    await job_runner.start()
+    await write_buffer.start()
+    await idempotency_compactor.start()
+    await live_state_purger.start()
     print("FitLog API запущен!")
     yield
     # Завершение работы
+    await live_state_purger.stop()
+    await idempotency_compactor.stop()
+    await write_buffer.stop()
+    await job_runner.stop()
     print("FitLog API остановлен")
 
 app = FastAPI(
@@ -28,6 +41,8 @@ app = FastAPI(
 )
 
 # CORS
+# лимиты внутри CORS, чтобы ответы 429/503 тоже несли CORS-заголовки
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # В продакшене замените на конкретные домены
@@ -47,6 +62,16 @@ app.include_router(meals.router, prefix="/api")
 app.include_router(measurements.router, prefix="/api")
 app.include_router(goals.router, prefix="/api")
 app.include_router(stats.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(foods.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(sync.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(buffered.router, prefix="/api")
+app.include_router(templates.router, prefix="/api")
+app.include_router(bulk.router, prefix="/api")
+app.include_router(live.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
 
 @app.get("/")
 def read_root():
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, Date, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import json
 from backend.app.database import Base
 
+# номер последней транзакции, изменившей синхронизируемые строки (см. sync.py);
+# подставляется самой базой при любом INSERT и UPDATE, в том числе через Core
+SYNC_SEQ = text("(SELECT value FROM sync_counters WHERE id = 1)")
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -12,6 +17,8 @@ class User(Base):
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # имя шарда с данными пользователя (FITLOG_SHARDS), NULL - основная база
+    shard = Column(String(50))
     
     workouts = relationship("Workout", back_populates="owner", cascade="all, delete-orphan")
     meals = relationship("Meal", back_populates="owner", cascade="all, delete-orphan")
@@ -30,6 +37,10 @@ class User(Base):
 
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        Index("ix_workouts_user_id_date", "user_id", "date"),
+        Index("ix_workouts_user_id_sync_seq", "user_id", "sync_seq"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(Date, default=datetime.utcnow().date(), nullable=False)
@@ -37,6 +48,8 @@ class Workout(Base):
     duration = Column(Integer)
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_seq = Column(Integer, default=SYNC_SEQ, onupdate=SYNC_SEQ)
     
     owner = relationship("User", back_populates="workouts")
     exercises = relationship("Exercise", back_populates="workout", cascade="all, delete-orphan")
@@ -55,11 +68,16 @@ class Workout(Base):
 
 class Exercise(Base):
     __tablename__ = "exercises"
+    __table_args__ = (
+        Index("ix_exercises_workout_id", "workout_id"),
+        Index("ix_exercises_name_workout_id", "name", "workout_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     workout_id = Column(Integer, ForeignKey("workouts.id"), nullable=False)
     name = Column(String(100), nullable=False)
     category = Column(String(50))
     order = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     workout = relationship("Workout", back_populates="exercises")
     sets = relationship("ExerciseSet", back_populates="exercise", cascade="all, delete-orphan")
@@ -76,6 +94,9 @@ class Exercise(Base):
 
 class ExerciseSet(Base):
     __tablename__ = "exercise_sets"
+    __table_args__ = (
+        Index("ix_exercise_sets_exercise_id", "exercise_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
     set_number = Column(Integer, nullable=False)
@@ -83,6 +104,7 @@ class ExerciseSet(Base):
     weight = Column(Float)
     rest_time = Column(Integer)
     completed = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     exercise = relationship("Exercise", back_populates="sets")
     
@@ -97,8 +119,54 @@ class ExerciseSet(Base):
             'completed': self.completed
         }
 
+class WorkoutTemplate(Base):
+    __tablename__ = "workout_templates"
+    __table_args__ = (
+        Index("ix_workout_templates_user_id", "user_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(100), nullable=False)
+    duration = Column(Integer)
+    notes = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    exercises = relationship("TemplateExercise", back_populates="template", cascade="all, delete-orphan")
+
+class TemplateExercise(Base):
+    __tablename__ = "template_exercises"
+    __table_args__ = (
+        Index("ix_template_exercises_template_id", "template_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    template_id = Column(Integer, ForeignKey("workout_templates.id"), nullable=False)
+    name = Column(String(100), nullable=False)
+    category = Column(String(50))
+    order = Column(Integer, default=0)
+    
+    template = relationship("WorkoutTemplate", back_populates="exercises")
+    sets = relationship("TemplateSet", back_populates="exercise", cascade="all, delete-orphan")
+
+class TemplateSet(Base):
+    __tablename__ = "template_sets"
+    __table_args__ = (
+        Index("ix_template_sets_exercise_id", "exercise_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    exercise_id = Column(Integer, ForeignKey("template_exercises.id"), nullable=False)
+    set_number = Column(Integer, nullable=False)
+    reps = Column(Integer)
+    weight = Column(Float)
+    rest_time = Column(Integer)
+    
+    exercise = relationship("TemplateExercise", back_populates="sets")
+
 class Meal(Base):
     __tablename__ = "meals"
+    __table_args__ = (
+        Index("ix_meals_user_id_date", "user_id", "date"),
+        Index("ix_meals_user_id_sync_seq", "user_id", "sync_seq"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(Date, default=datetime.utcnow().date(), nullable=False)
@@ -110,6 +178,8 @@ class Meal(Base):
     fat = Column(Float)
     notes = Column(Text)
     time = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_seq = Column(Integer, default=SYNC_SEQ, onupdate=SYNC_SEQ)
     
     owner = relationship("User", back_populates="meals")
     
@@ -130,6 +200,10 @@ class Meal(Base):
 
 class Measurement(Base):
     __tablename__ = "measurements"
+    __table_args__ = (
+        Index("ix_measurements_user_id_date", "user_id", "date"),
+        Index("ix_measurements_user_id_sync_seq", "user_id", "sync_seq"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(Date, default=datetime.utcnow().date(), nullable=False)
@@ -145,6 +219,8 @@ class Measurement(Base):
     thigh_right = Column(Float)
     calf_left = Column(Float)
     calf_right = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_seq = Column(Integer, default=SYNC_SEQ, onupdate=SYNC_SEQ)
     
     owner = relationship("User", back_populates="measurements")
     
@@ -169,6 +245,9 @@ class Measurement(Base):
 
 class Goal(Base):
     __tablename__ = "goals"
+    __table_args__ = (
+        Index("ix_goals_user_id_sync_seq", "user_id", "sync_seq"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=False)
@@ -180,6 +259,8 @@ class Goal(Base):
     deadline = Column(Date)
     is_completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_seq = Column(Integer, default=SYNC_SEQ, onupdate=SYNC_SEQ)
     
     owner = relationship("User", back_populates="goals")
     
@@ -196,4 +277,128 @@ class Goal(Base):
             'deadline': self.deadline.isoformat() if self.deadline else None,
             'is_completed': self.is_completed,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class Food(Base):
+    __tablename__ = "foods"
+    __table_args__ = (
+        Index("ix_foods_user_id_name", "user_id", "name"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    # NULL - общий справочник, импортированный из локального набора данных
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    name = Column(String(200), nullable=False)
+    calories = Column(Float)
+    protein = Column(Float)
+    carbs = Column(Float)
+    fat = Column(Float)
+    usage_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'calories': self.calories,
+            'protein': self.protein,
+            'carbs': self.carbs,
+            'fat': self.fat,
+            'usage_count': self.usage_count
+        }
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_id_sync_seq", "user_id", "sync_seq"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sync_seq = Column(Integer, default=SYNC_SEQ)
+    
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
+class SyncCounter(Base):
+    __tablename__ = "sync_counters"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_jobs_status", "status"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    kind = Column(String(50), nullable=False)
+    # queued, running, succeeded, failed
+    status = Column(String(20), nullable=False, default="queued")
+    progress = Column(Float, default=0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    params = Column(Text)
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'params': json.loads(self.params) if self.params else None,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class WriteBufferState(Base):
+    __tablename__ = "write_buffer_state"
+    # одна строка: номер последней записи журнала буфера, попавшей в базу
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_user_id_key", "user_id", "key", unique=True),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    # хеш метода, пути и тела запроса: тот же ключ с другим запросом - ошибка клиента
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+class LiveSessionState(Base):
+    __tablename__ = "live_sessions"
+    __table_args__ = (
+        Index("ix_live_sessions_workout_id", "workout_id", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    # без внешнего ключа: удаление тренировки не должно зависеть от сессий
+    workout_id = Column(Integer, nullable=False)
+    # последний сохраненный номер события и id упражнений, созданных по ссылкам клиента
+    last_seq = Column(Integer, nullable=False, default=0)
+    refs = Column(Text, nullable=False, default="{}")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+
+from backend.app.auth import verify_token
+
+ENABLED = os.getenv("FITLOG_RATE_LIMIT", "1") == "1"
+
+# одновременно обрабатываемые запросы, очередь за ними и максимальное ожидание в очереди
+MAX_CONCURRENT = int(os.getenv("FITLOG_MAX_CONCURRENT", "64"))
+MAX_QUEUE = int(os.getenv("FITLOG_MAX_QUEUE", "256"))
+MAX_QUEUE_WAIT = float(os.getenv("FITLOG_MAX_QUEUE_WAIT", "2.0"))
+
+# долгие потоки (SSE) не занимают места среди MAX_CONCURRENT, иначе
+# открытые дашборды со временем заняли бы их все
+UNQUEUED_PREFIXES = ("/api/stream/",)
+
+# (класс, метод или None для любого, префикс пути); первое совпадение выигрывает
+ROUTE_CLASSES = [
+    ("auth", "POST", "/api/users/login"),
+    ("auth", "POST", "/api/users/register"),
+    ("heavy", "GET", "/api/workouts/stats/"),
+    ("heavy", "GET", "/api/stats/"),
+    ("heavy", "GET", "/api/search/"),
+    ("heavy", None, "/api/batch"),
+]
+
+# класс: {"user" | "ip": (токенов в секунду, размер корзины)}
+LIMITS = {
+    # bcrypt на каждый вход: ограничиваем по IP, пользователя здесь еще нет
+    "auth": {"ip": (0.5, 20)},
+    "heavy": {"user": (2, 20), "ip": (10, 60)},
+    "write": {"user": (10, 40), "ip": (30, 120)},
+    "default": {"user": (20, 80), "ip": (50, 200)},
+}
+
+def route_class(method: str, path: str) -> str:
+    for name, route_method, prefix in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and path.startswith(prefix):
+            return name
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "default"
+    return "write"
+
+class TokenBuckets:
+    """Корзины токенов в памяти: на ключ хранится (токены, время пересчета).
+
+    Токены досчитываются лениво при обращении, фонового таймера нет.
+    Когда ключей больше max_keys, выбрасываются давно не тронутые корзины:
+    они уже полны и ничем не отличаются от отсутствующих.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate: float, burst: float) -> float:
+        """Списывает токен; возвращает 0 или сколько секунд ждать до следующего."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+            return wait
+
+    def _evict(self, now: float):
+        # лимиты в ключе не хранятся; за минуту любая из корзин LIMITS наполняется
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > 60]
+        for key in stale:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+buckets = TokenBuckets()
+
+def _user_id(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            payload = verify_token(token)
+            return payload.get("sub") if payload else None
+    return None
+
+async def _reject(send, status: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class RateLimitMiddleware:
+    """Лимиты запросов по пользователю и IP плюс контроль допуска.
+
+    Сначала проверяются корзины токенов (429), затем запрос ждет место среди
+    MAX_CONCURRENT обрабатываемых. Если очередь длиннее MAX_QUEUE или место
+    не освободилось за MAX_QUEUE_WAIT, запрос сразу получает 503: лучше быстро
+    отказать лишним, чем растянуть задержку для всех.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._slots = None
+        self._loop = None
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        # подзапросы /api/batch уже посчитаны вместе с родительским запросом
+        if (not ENABLED or scope["type"] != "http" or not scope["path"].startswith("/api/")
+                or "fitlog.batch" in scope):
+            await self.app(scope, receive, send)
+            return
+
+        class_name = route_class(scope["method"], scope["path"])
+        limits = LIMITS[class_name]
+        user_id = _user_id(scope) if "user" in limits else None
+        client = scope.get("client")
+        checks = [("ip", client[0] if client else None), ("user", user_id)]
+
+        for kind, identity in checks:
+            if identity is None or kind not in limits:
+                continue
+            rate, burst = limits[kind]
+            wait = buckets.take((class_name, kind, identity), rate, burst)
+            if wait:
+                await _reject(send, 429, wait, "Слишком много запросов, повторите позже")
+                return
+
+        if scope["path"].startswith(UNQUEUED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(MAX_CONCURRENT)
+
+        if self._slots.locked():
+            if self._waiting >= MAX_QUEUE:
+                await _reject(send, 503, MAX_QUEUE_WAIT, "Сервер перегружен, повторите позже")
+                return
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), MAX_QUEUE_WAIT)
+            except asyncio.TimeoutError:
+                await _reject(send, 503, MAX_QUEUE_WAIT, "Сервер перегружен, повторите позже")
+                return
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
@@ -0,0 +1,160 @@
+"""Перенос пользователей между шардами (FITLOG_SHARDS).
+
+    python -m backend.app.rebalance              # всех пользователей - в шард по текущей схеме
+    python -m backend.app.rebalance --dry-run    # только показать, кто куда переедет
+    python -m backend.app.rebalance --user 5 --to shard_3
+
+Первый запуск после включения шардирования переносит данные из основной
+базы в шарды. Запускать при остановленном сервере: перенос идет по строкам,
+а кэш и буфер записи работающего процесса о нем не узнают.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from backend.app import models
+from backend.app.database import (
+    MAIN_SHARD, SHARDS, Base, SessionLocal, default_shard, get_shard_engine, init_db
+)
+
+# (таблица, колонка-ссылка, родительская таблица); None - строки выбираются по user_id
+COPY_ORDER = [
+    ("workouts", "user_id", None),
+    ("exercises", "workout_id", "workouts"),
+    ("exercise_sets", "exercise_id", "exercises"),
+    ("meals", "user_id", None),
+    ("measurements", "user_id", None),
+    ("goals", "user_id", None),
+    ("foods", "user_id", None),
+    ("workout_templates", "user_id", None),
+    ("template_exercises", "template_id", "workout_templates"),
+    ("template_sets", "exercise_id", "template_exercises"),
+    ("live_sessions", "workout_id", "workouts"),
+    # сохраненные ответы повторяются как есть, с id на момент первого запроса
+    ("idempotency_keys", "user_id", None),
+]
+
+# если при переезде меняются id, клиенты синхронизации получают удаление старых записей;
+# дочерние упражнения и подходы удаляются вместе с тренировкой
+TOMBSTONE_ENTITIES = {"workouts", "meals", "measurements", "goals"}
+
+def _owned_ids(table_name: str, user_id: int):
+    tables = Base.metadata.tables
+    for name, column, parent in COPY_ORDER:
+        if name == table_name:
+            table = tables[name]
+            if parent is None:
+                return select(table.c.id).where(table.c.user_id == user_id)
+            return select(table.c.id).where(table.c[column].in_(_owned_ids(parent, user_id)))
+    raise KeyError(table_name)
+
+def move_user(directory_db, user: models.User, target: str) -> dict:
+    source = user.shard or MAIN_SHARD
+    if source == target:
+        return {}
+
+    tables = Base.metadata.tables
+    tombstones = tables["tombstones"]
+    counters = tables["sync_counters"]
+    now = datetime.utcnow()
+    id_maps = {}
+    moved = {}
+
+    with get_shard_engine(source).connect() as src, get_shard_engine(target).begin() as dst:
+        # у шардов свои счетчики синхронизации: перенесенные строки получают номер
+        # больше обоих, иначе клиент с токеном старого шарда их не увидит
+        source_seq = src.execute(select(counters.c.value)).scalar() or 0
+        dst.execute(counters.update().values(value=func.max(counters.c.value, source_seq) + 1))
+        seq = dst.execute(select(counters.c.value)).scalar()
+
+        for name, column, parent in COPY_ORDER:
+            table = tables[name]
+            rows = [dict(row._mapping) for row in src.execute(
+                table.select().where(table.c.id.in_(_owned_ids(name, user.id))).order_by(table.c.id)
+            )]
+            old_ids = [row["id"] for row in rows]
+            # id сохраняются, если в целевом шарде все id меньше переносимых;
+            # иначе выдаются новые выше обоих диапазонов, чтобы не совпасть со старыми
+            target_max = dst.execute(select(func.max(table.c.id))).scalar() or 0
+            renumbered = bool(rows) and target_max >= old_ids[0]
+            if renumbered:
+                start = max(target_max, old_ids[-1]) + 1
+                id_maps[name] = {old_id: start + number for number, old_id in enumerate(old_ids)}
+            else:
+                id_maps[name] = {old_id: old_id for old_id in old_ids}
+
+            for row in rows:
+                row["id"] = id_maps[name][row["id"]]
+                if parent is not None:
+                    row[column] = id_maps[parent][row[column]]
+                if "updated_at" in row:
+                    row["updated_at"] = now
+                if "sync_seq" in row:
+                    row["sync_seq"] = seq
+            if rows:
+                dst.execute(table.insert(), rows)
+            moved[name] = len(rows)
+
+            if name in TOMBSTONE_ENTITIES and renumbered:
+                dst.execute(tombstones.insert(), [
+                    {"user_id": user.id, "entity": name, "entity_id": old_id, "deleted_at": now, "sync_seq": seq}
+                    for old_id in old_ids
+                ])
+
+        old_tombstones = [dict(row._mapping) for row in src.execute(
+            tombstones.select().where(tombstones.c.user_id == user.id)
+        )]
+        for row in old_tombstones:
+            row.pop("id")
+            row["sync_seq"] = seq
+        if old_tombstones:
+            dst.execute(tombstones.insert(), old_tombstones)
+
+    user.shard = target
+    directory_db.commit()
+
+    # удаляем из старого шарда только после переключения каталога
+    with get_shard_engine(source).begin() as src:
+        for name, _, _ in reversed(COPY_ORDER):
+            table = tables[name]
+            src.execute(table.delete().where(table.c.id.in_(_owned_ids(name, user.id))))
+        src.execute(tombstones.delete().where(tombstones.c.user_id == user.id))
+
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user", type=int)
+    parser.add_argument("--to")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not SHARDS:
+        sys.exit("Шардирование выключено: задайте FITLOG_SHARDS")
+    if (args.user is None) != (args.to is None):
+        sys.exit("--user и --to указываются вместе")
+
+    init_db()
+    db = SessionLocal()
+    try:
+        query = db.query(models.User).order_by(models.User.id)
+        if args.user is not None:
+            query = query.filter(models.User.id == args.user)
+
+        for user in query.all():
+            target = args.to or default_shard(user.id)
+            source = user.shard or MAIN_SHARD
+            if source == target:
+                continue
+            if args.dry_run:
+                print(f"{user.username}: {source} -> {target}")
+                continue
+            moved = move_user(db, user, target)
+            print(f"{user.username}: {source} -> {target}, строк: {sum(moved.values())}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
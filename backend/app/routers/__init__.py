@@ -4,6 +4,16 @@ from .meals import router as meals_router
 from .measurements import router as measurements_router
 from .goals import router as goals_router
 from .stats import router as stats_router
+from .search import router as search_router
+from .foods import router as foods_router
+from .batch import router as batch_router
+from .sync import router as sync_router
+from .jobs import router as jobs_router
+from .buffered import router as buffered_router
+from .templates import router as templates_router
+from .bulk import router as bulk_router
+from .live import router as live_router
+from .stream import router as stream_router
 
 __all__ = [
     "users_router",
@@ -11,5 +21,15 @@ __all__ = [
     "meals_router",
     "measurements_router",
     "goals_router",
-    "stats_router"
+    "stats_router",
+    "search_router",
+    "foods_router",
+    "batch_router",
+    "sync_router",
+    "jobs_router",
+    "buffered_router",
+    "templates_router",
+    "bulk_router",
+    "live_router",
+    "stream_router"
 ]
\ No newline at end of file
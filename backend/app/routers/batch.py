@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+
+router = APIRouter(tags=["batch"])
+
+API_PREFIX = "/api"
+
+# роутеры отвечают 307 на путь без завершающего слэша; переход выполняется здесь же
+REDIRECT_STATUSES = {301, 302, 307, 308}
+MAX_REDIRECTS = 3
+# потоки (SSE) не заканчиваются сами, в пакете им не место
+STREAM_PREFIXES = ("/stream/",)
+SUB_REQUEST_TIMEOUT = float(os.getenv("FITLOG_BATCH_TIMEOUT", "10"))
+
+class _NotJSON(Exception):
+    pass
+
+async def _call(request: Request, path: str, query_string: bytes, user: models.User, db: Session) -> dict:
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "headers": [
+            (name, value) for name, value in request.scope["headers"]
+            if name in (b"authorization", b"accept")
+        ],
+        "app": request.scope["app"],
+        "state": {},
+        "fitlog.batch": {"user": user, "db": db},
+    }
+
+    response = {"status": 500, "headers": {}, "body": b""}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # тело отдается один раз, дальше "клиент" ждет конца ответа и отключается
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+            content_type = response["headers"].get("content-type")
+            # не JSON (потоки, format=packed) прерывается, не дожидаясь тела
+            if content_type and not content_type.startswith("application/json"):
+                raise _NotJSON(content_type)
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body", False):
+                finished.set()
+
+    await request.scope["app"](scope, receive, send)
+    return response
+
+async def _dispatch(request: Request, item: schemas.BatchItem, user: models.User, db: Session):
+    path, _, inline_query = item.path.partition("?")
+    path = API_PREFIX + path
+    query_string = "&".join(q for q in (inline_query, urlencode(item.params, doseq=True)) if q).encode()
+
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            if path[len(API_PREFIX):].startswith(STREAM_PREFIXES):
+                return {"path": item.path, "status": 400, "body": {"detail": "Потоки недоступны в пакетном запросе"}}
+            response = await asyncio.wait_for(_call(request, path, query_string, user, db), SUB_REQUEST_TIMEOUT)
+            location = urlsplit(response["headers"].get("location", ""))
+            if response["status"] not in REDIRECT_STATUSES or not location.path.startswith(API_PREFIX + "/"):
+                break
+            path, query_string = location.path, location.query.encode()
+    except _NotJSON:
+        return {"path": item.path, "status": 415, "body": {"detail": "Формат ответа не поддерживается в пакетном запросе"}}
+    except asyncio.TimeoutError:
+        return {"path": item.path, "status": 504, "body": {"detail": "Подзапрос выполнялся слишком долго"}}
+    except Exception:
+        db.rollback()
+        return {"path": item.path, "status": 500, "body": {"detail": "Ошибка выполнения подзапроса"}}
+
+    body = json.loads(response["body"]) if response["body"] else None
+    return {"path": item.path, "status": response["status"], "body": body}
+
+@router.post("/batch")
+async def run_batch(
+    batch: schemas.BatchRequest,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # подзапросы выполняются по очереди: все они используют одну сессию,
+    # а Session нельзя разделять между потоками
+    responses = []
+    for item in batch.requests:
+        if responses and responses[-1]["status"] == 504:
+            # обработчик зависшего подзапроса может еще работать с общей сессией
+            responses.append({"path": item.path, "status": 504, "body": {"detail": "Не выполнен после таймаута"}})
+            continue
+        if item.path.partition("?")[0].rstrip("/") == "/batch":
+            responses.append({"path": item.path, "status": 400, "body": {"detail": "Вложенный batch запрещен"}})
+            continue
+        responses.append(await _dispatch(request, item, current_user, db))
+
+    return {"responses": responses}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.foods import fill_from_food, get_food
+from backend.app.write_buffer import write_buffer
+
+router = APIRouter(prefix="/buffered", tags=["buffered"])
+
+# ответ 202: запись сохранена в журнал буфера и появится в базе при ближайшем сбросе
+
+@router.post("/sets", response_model=schemas.BufferedWrite, status_code=202)
+def buffer_set(
+    set_data: schemas.BufferedSetCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    exercise = db.query(models.Exercise.id).join(models.Workout).filter(
+        models.Exercise.id == set_data.exercise_id,
+        models.Workout.user_id == current_user.id
+    ).first()
+    if not exercise:
+        raise HTTPException(status_code=404, detail="Упражнение не найдено")
+    
+    seq = write_buffer.append(
+        "set", current_user.id, schemas.ExerciseSetCreate(**set_data.dict(exclude={"exercise_id"})),
+        exercise_id=set_data.exercise_id
+    )
+    return {"seq": seq, "pending": write_buffer.pending}
+
+@router.post("/meals", response_model=schemas.BufferedWrite, status_code=202)
+def buffer_meal(
+    meal_data: schemas.MealCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    meal_fields = meal_data.dict(exclude={"food_id"})
+    if meal_data.food_id is not None:
+        food = get_food(db, current_user.id, meal_data.food_id)
+        if not food:
+            raise HTTPException(status_code=404, detail="Продукт не найден")
+        # usage_count не увеличиваем: иначе каждая запись снова требовала бы транзакции
+        fill_from_food(meal_fields, meal_data.model_fields_set, food)
+    
+    if not meal_fields.get("name"):
+        raise HTTPException(status_code=422, detail="Укажите название блюда или food_id")
+    
+    seq = write_buffer.append("meal", current_user.id, schemas.MealBase(**meal_fields))
+    return {"seq": seq, "pending": write_buffer.pending}
+
+@router.post("/measurements", response_model=schemas.BufferedWrite, status_code=202)
+def buffer_measurement(
+    measurement_data: schemas.MeasurementCreate,
+    current_user: models.User = Depends(get_current_user)
+):
+    seq = write_buffer.append("measurement", current_user.id, measurement_data)
+    return {"seq": seq, "pending": write_buffer.pending}
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.cache import result_cache
+from backend.app.events import publish_refresh
+
+router = APIRouter(prefix="/bulk", tags=["bulk"])
+
+# сущность -> (модель, схема допустимых полей для обновления, колонка даты для диапазона)
+BULK_ENTITIES = {
+    "workouts": (models.Workout, schemas.WorkoutBase, "date"),
+    "meals": (models.Meal, schemas.MealBase, "date"),
+    "measurements": (models.Measurement, schemas.MeasurementBase, "date"),
+    "goals": (models.Goal, schemas.GoalBase, "deadline"),
+}
+
+def _entity(entity: str):
+    if entity not in BULK_ENTITIES:
+        raise HTTPException(status_code=404, detail="Неизвестный тип записей")
+    return BULK_ENTITIES[entity]
+
+def _selected_ids(model, date_column: str, user_id: int, bulk_filter: schemas.BulkFilter):
+    if bulk_filter.ids is None and bulk_filter.date_from is None and bulk_filter.date_to is None:
+        raise HTTPException(status_code=422, detail="Укажите ids или диапазон дат")
+    
+    query = select(model.id).where(model.user_id == user_id)
+    if bulk_filter.ids is not None:
+        query = query.where(model.id.in_(bulk_filter.ids))
+    if bulk_filter.date_from:
+        query = query.where(getattr(model, date_column) >= bulk_filter.date_from)
+    if bulk_filter.date_to:
+        query = query.where(getattr(model, date_column) <= bulk_filter.date_to)
+    return query
+
+@router.post("/{entity}/delete", response_model=schemas.BulkResult)
+def bulk_delete(
+    entity: str,
+    bulk_filter: schemas.BulkFilter,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    model, _, date_column = _entity(entity)
+    ids = _selected_ids(model, date_column, current_user.id, bulk_filter)
+    
+    # удаление в обход ORM не вызывает before_flush из sync.py
+    db.execute(insert(models.Tombstone).from_select(
+        ["user_id", "entity", "entity_id", "deleted_at"],
+        select(literal(current_user.id), literal(entity), model.id, literal(datetime.utcnow()))
+        .where(model.id.in_(ids))
+    ))
+    
+    if model is models.Workout:
+        # каскад по индексам exercises.workout_id и exercise_sets.exercise_id
+        exercise_ids = select(models.Exercise.id).where(models.Exercise.workout_id.in_(ids))
+        db.execute(delete(models.ExerciseSet).where(models.ExerciseSet.exercise_id.in_(exercise_ids)))
+        db.execute(delete(models.Exercise).where(models.Exercise.workout_id.in_(ids)))
+    
+    result = db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    if result.rowcount:
+        result_cache.invalidate_user(current_user.id)
+        publish_refresh(current_user.id, entity)
+    return {"count": result.rowcount}
+
+@router.post("/{entity}/update", response_model=schemas.BulkResult)
+def bulk_update(
+    entity: str,
+    bulk_update: schemas.BulkUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    model, schema, date_column = _entity(entity)
+    if not bulk_update.values:
+        raise HTTPException(status_code=422, detail="Нет полей для обновления")
+    
+    values = {}
+    for field, value in bulk_update.values.items():
+        if field not in schema.model_fields:
+            raise HTTPException(status_code=422, detail=f"Поле {field} нельзя изменить")
+        try:
+            values[field] = TypeAdapter(schema.model_fields[field].annotation).validate_python(value)
+        except ValidationError:
+            raise HTTPException(status_code=422, detail=f"Неверное значение поля {field}")
+    values["updated_at"] = datetime.utcnow()
+    
+    result = db.execute(
+        update(model)
+        .where(model.id.in_(_selected_ids(model, date_column, current_user.id, bulk_update)))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        result_cache.invalidate_user(current_user.id)
+        publish_refresh(current_user.id, entity)
+    return {"count": result.rowcount}
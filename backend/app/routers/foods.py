@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.foods import food_index
+from backend.app.jobs import job_runner
+
+router = APIRouter(prefix="/foods", tags=["foods"])
+
+@router.get("/suggest", response_model=List[schemas.Food])
+def suggest_foods(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return food_index.suggest(db, current_user.id, q, limit=limit)
+
+@router.get("/", response_model=List[schemas.Food])
+def get_foods(
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    foods = db.query(models.Food).filter(
+        models.Food.user_id == current_user.id
+    ).order_by(models.Food.name).offset(skip).limit(limit).all()
+    return foods
+
+@router.post("/", response_model=schemas.Food, status_code=201)
+def create_food(
+    food_data: schemas.FoodCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    db_food = models.Food(user_id=current_user.id, usage_count=0, **food_data.dict())
+    db.add(db_food)
+    db.commit()
+    db.refresh(db_food)
+    food_index.invalidate(current_user.id)
+    return db_food
+
+@router.post("/seed", response_model=schemas.Job, status_code=202)
+def seed_foods(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = job_runner.submit(db, "seed_foods", user_id=current_user.id)
+    return job.to_dict()
@@ -5,6 +5,8 @@ from typing import List
 from backend.app.database import get_db
 from backend.app import models, schemas
 from backend.app.auth import get_current_user
+from backend.app.cache import result_cache
+from backend.app.events import publish_deleted, publish_goal
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
@@ -43,7 +45,9 @@ def create_goal(
     db_goal = models.Goal(user_id=current_user.id, **goal_data.dict())
     db.add(db_goal)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(db_goal)
+    publish_goal(current_user.id, "created", db_goal)
     return db_goal
 
 @router.put("/{goal_id}", response_model=schemas.Goal)
@@ -65,7 +69,9 @@ def update_goal(
         setattr(goal, field, value)
     
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(goal)
+    publish_goal(current_user.id, "updated", goal)
     return goal
 
 @router.delete("/{goal_id}", status_code=204)
@@ -84,6 +90,8 @@ def delete_goal(
     
     db.delete(goal)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
+    publish_deleted(current_user.id, "goal", goal_id)
 
 @router.patch("/{goal_id}/complete", response_model=schemas.Goal)
 def complete_goal(
@@ -104,5 +112,7 @@ def complete_goal(
     goal.is_completed = True
     
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(goal)
+    publish_goal(current_user.id, "updated", goal)
     return goal
\ No newline at end of file
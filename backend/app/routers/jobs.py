@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.jobs import job_runner
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# задачи, которые пользователь может запускать сам
+USER_JOB_KINDS = {"seed_foods", "rebuild_search_index"}
+
+@router.post("/", response_model=schemas.Job, status_code=202)
+def create_job(
+    job_data: schemas.JobCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if job_data.kind not in USER_JOB_KINDS:
+        raise HTTPException(status_code=400, detail="Неизвестный тип задачи")
+    
+    job = job_runner.submit(db, job_data.kind, user_id=current_user.id, params=job_data.params)
+    return job.to_dict()
+
+@router.get("/", response_model=List[schemas.Job])
+def get_jobs(
+    limit: int = 20,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    jobs = db.query(models.Job).filter(
+        models.Job.user_id == current_user.id
+    ).order_by(models.Job.created_at.desc()).limit(limit).all()
+    return [job.to_dict() for job in jobs]
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def get_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    return job.to_dict()
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from backend.app.database import SessionLocal
+from backend.app import models
+from backend.app.auth import user_from_token
+from backend.app.live import FLUSH_INTERVAL_MS, live_sessions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/ws", tags=["live"])
+
+def _bearer(websocket: WebSocket) -> Optional[str]:
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" else None
+
+async def _flush(websocket: WebSocket, session, force: bool = False):
+    try:
+        saved = await session.flush()
+    except Exception:
+        logger.exception("Ошибка записи живой тренировки %s", session.workout_id)
+        await websocket.send_json({"type": "error", "detail": "Не удалось сохранить, повтор позже"})
+        return
+    if saved or force:
+        await websocket.send_json({"type": "saved", "seq": session.saved, "exercises": session.refs})
+
+async def _flush_periodically(websocket: WebSocket, session):
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_MS / 1000)
+        await _flush(websocket, session)
+
+# протокол: сервер -> ready {received, saved, exercises}; клиент -> exercise/set с seq
+# и flush; сервер -> saved {seq, exercises} после записи и error {seq, detail}
+@router.websocket("/workouts/{workout_id}/live")
+async def live_workout(websocket: WebSocket, workout_id: int, token: Optional[str] = None):
+    # браузер не передает заголовки в WebSocket, поэтому токен можно указать в ?token=
+    db = SessionLocal()
+    try:
+        user = user_from_token(db, token or _bearer(websocket))
+        workout = None
+        if user is not None:
+            workout = db.query(models.Workout).filter(
+                models.Workout.id == workout_id,
+                models.Workout.user_id == user.id
+            ).first()
+        if workout is None:
+            await websocket.close(code=1008)
+            return
+        session = live_sessions.open(db, workout)
+    finally:
+        db.close()
+
+    await websocket.accept()
+    previous, session.websocket = session.websocket, websocket
+    if previous is not None:
+        # новое подключение того же клиента вытесняет зависшее старое
+        try:
+            await previous.close(code=4000)
+        except Exception:
+            # старое соединение уже разорвано, исключение зависит от сервера
+            pass
+
+    await websocket.send_json({
+        "type": "ready",
+        "workout_id": workout_id,
+        "received": session.received,
+        "saved": session.saved,
+        "exercises": session.refs
+    })
+
+    flusher = asyncio.get_running_loop().create_task(_flush_periodically(websocket, session))
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                event = json.loads(message)
+            except json.JSONDecodeError:
+                event = None
+            if not isinstance(event, dict):
+                await websocket.send_json({"type": "error", "detail": "Неверный формат события"})
+            elif event.get("type") == "flush":
+                await _flush(websocket, session, force=True)
+            else:
+                error = await session.add(event)
+                if error:
+                    await websocket.send_json({"type": "error", "seq": event.get("seq"), "detail": error})
+                elif session.due:
+                    await _flush(websocket, session)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        if session.websocket is websocket:
+            session.websocket = None
+        try:
+            await session.flush()
+        except Exception:
+            logger.exception("Ошибка записи живой тренировки %s", workout_id)
+        live_sessions.close(session)
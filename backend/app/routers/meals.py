@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
@@ -6,6 +6,10 @@ from datetime import date
 from backend.app.database import get_db
 from backend.app import models, schemas
 from backend.app.auth import get_current_user
+from backend.app.cache import result_cache
+from backend.app.events import publish_daily_totals, publish_deleted, publish_meal
+from backend.app.foods import fill_from_food, food_index, get_food
+from backend.app.idempotency import find_response, save_response
 
 router = APIRouter(prefix="/meals", tags=["meals"])
 
@@ -47,13 +51,47 @@ def get_meal(
 @router.post("/", response_model=schemas.Meal, status_code=201)
 def create_meal(
     meal_data: schemas.MealCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_meal = models.Meal(user_id=current_user.id, **meal_data.dict())
+    if idempotency_key:
+        stored = find_response(db, current_user.id, idempotency_key, "POST /meals", meal_data)
+        if stored:
+            return stored
+        # запись и ключ в одной точке сохранения: при гонке откатываются только они
+        savepoint = db.begin_nested()
+    
+    meal_fields = meal_data.dict(exclude={"food_id"})
+    
+    food = None
+    if meal_data.food_id is not None:
+        food = get_food(db, current_user.id, meal_data.food_id)
+        if not food:
+            raise HTTPException(status_code=404, detail="Продукт не найден")
+        
+        fill_from_food(meal_fields, meal_data.model_fields_set, food)
+        food.usage_count = (food.usage_count or 0) + 1
+    
+    if not meal_fields.get("name"):
+        raise HTTPException(status_code=422, detail="Укажите название блюда или food_id")
+    
+    db_meal = models.Meal(user_id=current_user.id, **meal_fields)
     db.add(db_meal)
+    
+    if idempotency_key:
+        db.flush()
+        body = schemas.Meal.model_validate(db_meal).model_dump(mode="json")
+        stored = save_response(db, savepoint, current_user.id, idempotency_key, "POST /meals", meal_data, 201, body)
+        if stored:
+            return stored
+    
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(db_meal)
+    if food:
+        food_index.record_usage(food)
+    publish_meal(db, current_user.id, "created", db_meal)
     return db_meal
 
 @router.put("/{meal_id}", response_model=schemas.Meal)
@@ -71,11 +109,14 @@ def update_meal(
     if not meal:
         raise HTTPException(status_code=404, detail="Прием пищи не найден")
     
+    previous_date = meal.date
     for field, value in meal_update.dict(exclude_unset=True).items():
         setattr(meal, field, value)
     
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(meal)
+    publish_meal(db, current_user.id, "updated", meal, previous_date)
     return meal
 
 @router.delete("/{meal_id}", status_code=204)
@@ -92,8 +133,12 @@ def delete_meal(
     if not meal:
         raise HTTPException(status_code=404, detail="Прием пищи не найден")
     
+    meal_date = meal.date
     db.delete(meal)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
+    publish_deleted(current_user.id, "meal", meal_id)
+    publish_daily_totals(db, current_user.id, meal_date)
 
 @router.get("/daily/summary")
 def get_daily_summary(
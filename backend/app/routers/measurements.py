@@ -7,9 +7,17 @@ from sqlalchemy import func
 from backend.app.database import get_db
 from backend.app import models, schemas
 from backend.app.auth import get_current_user
+from backend.app.cache import result_cache
+from backend.app.downsample import METHODS as DOWNSAMPLE_METHODS
+from backend.app.formats import SERIES_FORMAT_PATTERN, columns_from_rows, encode_tables
 
 router = APIRouter(prefix="/measurements", tags=["measurements"])
 
+MEASUREMENT_FIELDS = [
+    "weight", "body_fat", "neck", "chest", "waist", "hips",
+    "biceps_left", "biceps_right", "thigh_left", "thigh_right", "calf_left", "calf_right"
+]
+
 @router.get("/", response_model=List[schemas.Measurement])
 def get_measurements(
     skip: int = 0,
@@ -54,6 +62,7 @@ def create_measurement(
     db_measurement = models.Measurement(user_id=current_user.id, **measurement_data.dict())
     db.add(db_measurement)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(db_measurement)
     return db_measurement
 
@@ -76,6 +85,7 @@ def update_measurement(
         setattr(measurement, field, value)
     
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(measurement)
     return measurement
 
@@ -95,10 +105,13 @@ def delete_measurement(
     
     db.delete(measurement)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
 
 @router.get("/stats/progress")
 def get_progress_stats(
     period_days: int = Query(30, ge=7, le=365),
+    fmt: str = Query("json", alias="format", pattern=SERIES_FORMAT_PATTERN),
+    delta: bool = False,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -117,8 +130,72 @@ def get_progress_stats(
         models.Measurement.body_fat.isnot(None)
     ).order_by(models.Measurement.date).all()
     
+    if fmt != "json":
+        return encode_tables({
+            "weight_data": columns_from_rows(weight_data, ["date", "weight"]),
+            "body_fat_data": columns_from_rows(body_fat_data, ["date", "body_fat"])
+        }, fmt, delta_dates=delta, meta={"period": period_days})
+    
     return {
         "weight_data": [{"date": d, "weight": w} for d, w in weight_data],
         "body_fat_data": [{"date": d, "body_fat": bf} for d, bf in body_fat_data],
         "period": period_days
-    }
\ No newline at end of file
+    }
+
+@router.get("/stats/series")
+def get_measurement_series(
+    fields: str = Query("weight,body_fat"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    max_points: int = Query(500, ge=3, le=5000),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    fmt: str = Query("json", alias="format", pattern=SERIES_FORMAT_PATTERN),
+    delta: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in MEASUREMENT_FIELDS]
+    if not requested or unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown) or fields}")
+    
+    columns = [getattr(models.Measurement, f) for f in requested]
+    query = db.query(models.Measurement.date, *columns).filter(
+        models.Measurement.user_id == current_user.id
+    )
+    
+    if start_date:
+        query = query.filter(models.Measurement.date >= start_date)
+    if end_date:
+        query = query.filter(models.Measurement.date <= end_date)
+    
+    points = {f: [] for f in requested}
+    for row in query.order_by(models.Measurement.date):
+        x = row[0].toordinal()
+        for i, field in enumerate(requested, start=1):
+            if row[i] is not None:
+                points[field].append((x, row[i]))
+    
+    downsample = DOWNSAMPLE_METHODS[method]
+    sampled = {field: downsample(field_points, max_points) for field, field_points in points.items()}
+    meta = {
+        "total_points": {f: len(p) for f, p in points.items()},
+        "max_points": max_points,
+        "method": method
+    }
+    
+    if fmt != "json":
+        tables = {
+            field: columns_from_rows(((date.fromordinal(int(x)), v) for x, v in field_points), ["date", field])
+            for field, field_points in sampled.items()
+        }
+        return encode_tables(tables, fmt, delta_dates=delta, meta=meta)
+    
+    series = {}
+    for field, field_points in sampled.items():
+        series[field] = [
+            {"date": date.fromordinal(int(x)), field: value}
+            for x, value in field_points
+        ]
+    
+    return {"series": series, **meta}
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from backend.app.database import get_db
+from backend.app import models, search as search_index
+from backend.app.auth import get_current_user
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[str] = Query(None, pattern="^(workout|exercise|meal)$"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    hits = search_index.search(db, current_user.id, q, kind=kind, limit=limit)
+    return {
+        "query": q,
+        "count": len(hits),
+        "results": hits
+    }
@@ -1,29 +1,42 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import Date, cast, func, extract
 from datetime import date, timedelta, datetime
-from typing import Optional
+from itertools import accumulate
+from typing import Optional, Union
 
 from backend.app.database import get_db
 from backend.app import models, schemas
 from backend.app.auth import get_current_user
+from backend.app.cache import cached
+from backend.app.formats import SERIES_FORMAT_PATTERN, columns_from_rows, encode_tables
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+NUTRITION_MACROS = ("calories", "protein", "carbs", "fat")
+ROLLING_WINDOWS = (7, 28)
+MAX_RANGE_DAYS = 366
+
 @router.get("/dashboard")
 def get_dashboard_stats(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     today = date.today()
+    return cached(
+        current_user.id, ("dashboard", today),
+        lambda: _compute_dashboard(db, current_user.id, today)
+    )
+
+def _compute_dashboard(db: Session, user_id: int, today: date):
     week_ago = today - timedelta(days=7)
     
     total_workouts = db.query(func.count(models.Workout.id)).filter(
-        models.Workout.user_id == current_user.id
+        models.Workout.user_id == user_id
     ).scalar() or 0
     
     weekly_workouts = db.query(func.count(models.Workout.id)).filter(
-        models.Workout.user_id == current_user.id,
+        models.Workout.user_id == user_id,
         models.Workout.date >= week_ago
     ).scalar() or 0
     
@@ -33,17 +46,17 @@ def get_dashboard_stats(
         func.sum(models.Meal.carbs).label('total_carbs'),
         func.sum(models.Meal.fat).label('total_fat')
     ).filter(
-        models.Meal.user_id == current_user.id,
+        models.Meal.user_id == user_id,
         models.Meal.date >= week_ago
     ).first()
     
     last_weight = db.query(models.Measurement.weight).filter(
-        models.Measurement.user_id == current_user.id,
+        models.Measurement.user_id == user_id,
         models.Measurement.weight.isnot(None)
     ).order_by(models.Measurement.date.desc()).first()
     
     active_goals = db.query(func.count(models.Goal.id)).filter(
-        models.Goal.user_id == current_user.id,
+        models.Goal.user_id == user_id,
         models.Goal.is_completed == False
     ).scalar() or 0
     
@@ -71,15 +84,35 @@ def get_dashboard_stats(
 def get_monthly_workout_stats(
     year: int = Query(datetime.now().year),
     month: int = Query(datetime.now().month),
+    fmt: str = Query("json", alias="format", pattern=SERIES_FORMAT_PATTERN),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    result = cached(
+        current_user.id, ("workouts_monthly", year, month),
+        lambda: _compute_monthly(db, current_user.id, year, month)
+    )
+    
+    if fmt != "json":
+        return encode_tables({
+            "workouts_by_day": columns_from_rows(
+                ((row["day"], row["count"], row["total_duration"]) for row in result["workouts_by_day"]),
+                ["day", "count", "total_duration"]
+            ),
+            "top_exercises": columns_from_rows(
+                ((row["name"], row["count"]) for row in result["top_exercises"]), ["name", "count"]
+            )
+        }, fmt, meta={"year": year, "month": month})
+    
+    return result
+
+def _compute_monthly(db: Session, user_id: int, year: int, month: int):
     workouts_by_day = db.query(
         extract('day', models.Workout.date).label('day'),
         func.count(models.Workout.id).label('count'),
         func.sum(models.Workout.duration).label('total_duration')
     ).filter(
-        models.Workout.user_id == current_user.id,
+        models.Workout.user_id == user_id,
         extract('year', models.Workout.date) == year,
         extract('month', models.Workout.date) == month
     ).group_by('day').order_by('day').all()
@@ -88,7 +121,7 @@ def get_monthly_workout_stats(
         models.Exercise.name,
         func.count(models.Exercise.id).label('count')
     ).join(models.Workout).filter(
-        models.Workout.user_id == current_user.id,
+        models.Workout.user_id == user_id,
         extract('year', models.Workout.date) == year,
         extract('month', models.Workout.date) == month
     ).group_by(models.Exercise.name).order_by(func.count(models.Exercise.id).desc()).limit(5).all()
@@ -106,6 +139,90 @@ def get_monthly_workout_stats(
         ]
     }
 
+def _bucket_expression(column, bucket: str, dialect: str):
+    if dialect == "postgresql":
+        if bucket == "week":
+            return cast(func.date_trunc("week", column), Date)
+        return column
+    if bucket == "week":
+        # понедельник недели, в которую попадает дата
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(column)
+
+@router.get("/exercises/{name}/series")
+def get_exercise_series(
+    name: str,
+    bucket: str = Query("week", pattern="^(day|week)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    fmt: str = Query("json", alias="format", pattern=SERIES_FORMAT_PATTERN),
+    delta: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = cached(
+        current_user.id, ("exercise_series", name, bucket, start_date, end_date),
+        lambda: _compute_exercise_series(db, current_user.id, name, bucket, start_date, end_date)
+    )
+    
+    if fmt != "json":
+        keys = ["date", "sets", "reps", "volume", "max_weight", "estimated_1rm"]
+        rows = (
+            [date.fromisoformat(point["date"])] + [point[key] for key in keys[1:]]
+            for point in result["series"]
+        )
+        return encode_tables(
+            {"series": columns_from_rows(rows, keys)}, fmt, delta_dates=delta,
+            meta={"exercise": result["exercise"], "bucket": result["bucket"]}
+        )
+    
+    return result
+
+def _compute_exercise_series(db: Session, user_id: int, name: str, bucket: str,
+                             start_date: Optional[date], end_date: Optional[date]):
+    bucket_expr = _bucket_expression(models.Workout.date, bucket, db.get_bind().dialect.name).label("bucket")
+    estimated_1rm = models.ExerciseSet.weight * (1 + models.ExerciseSet.reps / 30.0)
+    
+    query = db.query(
+        bucket_expr,
+        func.count(models.ExerciseSet.id).label("sets"),
+        func.sum(models.ExerciseSet.reps).label("reps"),
+        func.sum(models.ExerciseSet.reps * models.ExerciseSet.weight).label("volume"),
+        func.max(models.ExerciseSet.weight).label("max_weight"),
+        func.max(estimated_1rm).label("estimated_1rm")
+    ).select_from(models.Exercise).join(
+        models.Workout, models.Workout.id == models.Exercise.workout_id
+    ).join(
+        models.ExerciseSet, models.ExerciseSet.exercise_id == models.Exercise.id
+    ).filter(
+        models.Exercise.name == name,
+        models.Workout.user_id == user_id,
+        models.ExerciseSet.completed == True
+    )
+    
+    if start_date:
+        query = query.filter(models.Workout.date >= start_date)
+    if end_date:
+        query = query.filter(models.Workout.date <= end_date)
+    
+    rows = query.group_by(bucket_expr).order_by(bucket_expr).all()
+    
+    return {
+        "exercise": name,
+        "bucket": bucket,
+        "series": [
+            {
+                "date": str(row.bucket),
+                "sets": row.sets,
+                "reps": row.reps or 0,
+                "volume": round(row.volume or 0, 2),
+                "max_weight": row.max_weight,
+                "estimated_1rm": round(row.estimated_1rm, 2) if row.estimated_1rm is not None else None
+            }
+            for row in rows
+        ]
+    }
+
 @router.get("/nutrition/daily")
 def get_daily_nutrition_stats(
     target_date: Optional[date] = None,
@@ -146,4 +263,92 @@ def get_daily_nutrition_stats(
             "fat": total_fat
         },
         "meals_by_type": meals_by_type
+    }
+
+# format=packed отдает Response и response_model не проходит
+@router.get("/nutrition/range", response_model=Union[schemas.NutritionStats, schemas.NutritionStatsColumnar])
+def get_nutrition_range(
+    start_date: date = Query(alias="from"),
+    end_date: date = Query(alias="to"),
+    fmt: str = Query("json", alias="format", pattern=SERIES_FORMAT_PATTERN),
+    delta: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if end_date < start_date:
+        raise HTTPException(status_code=422, detail="Дата окончания раньше даты начала")
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=422, detail=f"Период не больше {MAX_RANGE_DAYS} дней")
+    
+    result = cached(
+        current_user.id, ("nutrition_range", start_date, end_date),
+        lambda: _compute_nutrition_range(db, current_user.id, start_date, end_date)
+    )
+    
+    if fmt != "json":
+        keys = list(result["calories_by_day"][0])
+        rows = (
+            [date.fromisoformat(day["date"])] + [day[key] for key in keys[1:]]
+            for day in result["calories_by_day"]
+        )
+        meta = {key: value for key, value in result.items() if key != "calories_by_day"}
+        return encode_tables({"calories_by_day": columns_from_rows(rows, keys)}, fmt, delta_dates=delta, meta=meta)
+    
+    return result
+
+def _compute_nutrition_range(db: Session, user_id: int, start_date: date, end_date: date):
+    # скользящим средним на первые дни периода нужны дни до его начала
+    window_start = start_date - timedelta(days=max(ROLLING_WINDOWS) - 1)
+    rows = db.query(
+        models.Meal.date,
+        func.count(models.Meal.id).label("meal_count"),
+        *(func.coalesce(func.sum(getattr(models.Meal, macro)), 0).label(macro) for macro in NUTRITION_MACROS)
+    ).filter(
+        models.Meal.user_id == user_id,
+        models.Meal.date >= window_start,
+        models.Meal.date <= end_date
+    ).group_by(models.Meal.date).all()
+    
+    # плотные колонки по дням: дни без записей - нули
+    days = (end_date - window_start).days + 1
+    columns = {key: [0] * days for key in ("meal_count",) + NUTRITION_MACROS}
+    for row in rows:
+        index = (row.date - window_start).days
+        for key in columns:
+            columns[key][index] = getattr(row, key)
+    columns["logged"] = [1 if count else 0 for count in columns["meal_count"]]
+    
+    # префиксные суммы: сумма за любое окно - разность двух элементов
+    prefix = {key: [0, *accumulate(values)] for key, values in columns.items()}
+    
+    def window_sum(key: str, first: int, last: int):
+        return prefix[key][last + 1] - prefix[key][first]
+    
+    def average(key: str, first: int, last: int):
+        # среднее по дням с записями: пропущенный день - не нулевое питание
+        logged = window_sum("logged", first, last)
+        return round(window_sum(key, first, last) / logged, 1) if logged else None
+    
+    offset = (start_date - window_start).days
+    by_day = []
+    for index in range(offset, days):
+        day = {"date": str(window_start + timedelta(days=index)), "meal_count": columns["meal_count"][index]}
+        for macro in NUTRITION_MACROS:
+            day[macro] = columns[macro][index]
+        for window in ROLLING_WINDOWS:
+            for macro in NUTRITION_MACROS:
+                day[f"{macro}_avg_{window}"] = average(macro, max(index - window + 1, 0), index)
+        by_day.append(day)
+    
+    last = days - 1
+    return {
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "days_logged": window_sum("logged", offset, last),
+        "total_calories": window_sum("calories", offset, last),
+        "avg_calories_per_day": average("calories", offset, last) or 0,
+        "avg_protein": average("protein", offset, last) or 0,
+        "avg_carbs": average("carbs", offset, last) or 0,
+        "avg_fat": average("fat", offset, last) or 0,
+        "calories_by_day": by_day
     }
\ No newline at end of file
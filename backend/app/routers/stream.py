@@ -0,0 +1,52 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from backend.app.database import SessionLocal
+from backend.app.auth import user_from_token
+from backend.app.events import HEARTBEAT_SECONDS, event_bus
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+async def _event_stream(user_id: int):
+    # подписка внутри генератора: finally с отпиской выполнится, только если поток начался
+    subscription = event_bus.subscribe(user_id)
+    try:
+        # при обрыве EventSource переподключается через retry мс и перечитывает дашборд
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # комментарий держит соединение открытым через прокси
+                yield ": ping\n\n"
+                continue
+            data = json.dumps(event["data"], ensure_ascii=False, default=str)
+            yield f"event: {event['type']}\ndata: {data}\n\n"
+    finally:
+        event_bus.unsubscribe(subscription)
+
+@router.get("/dashboard")
+async def stream_dashboard(request: Request, token: Optional[str] = None):
+    # EventSource в браузере не передает заголовки, поэтому токен можно указать в ?token=
+    scheme, _, header_token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        token = token or header_token
+    
+    # сессия закрывается сразу: открытый поток не должен держать соединение с базой
+    db = SessionLocal()
+    try:
+        user = user_from_token(db, token)
+    finally:
+        db.close()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Неверные учетные данные")
+    
+    return StreamingResponse(
+        _event_stream(user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.sync import collect_changes, decode_token, is_legacy_token
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+@router.get("/", response_model=schemas.SyncResponse)
+def sync(
+    since: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    since_seq = None
+    if since and not is_legacy_token(since):
+        since_seq = decode_token(since)
+        if since_seq is None:
+            raise HTTPException(status_code=400, detail="Неверный токен синхронизации")
+    
+    return collect_changes(db, current_user.id, since_seq)
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import date
+
+from backend.app.database import get_db
+from backend.app import models, schemas
+from backend.app.auth import get_current_user
+from backend.app.cache import result_cache
+from backend.app.events import publish_workout
+from backend.app.templates import TEMPLATE_TREE, WORKOUT_TREE, copy_tree
+
+router = APIRouter(prefix="/templates", tags=["templates"])
+
+def load_template(db: Session, user_id: int, template_id: int) -> Optional[models.WorkoutTemplate]:
+    return db.query(models.WorkoutTemplate).options(
+        selectinload(models.WorkoutTemplate.exercises).selectinload(models.TemplateExercise.sets)
+    ).filter(
+        models.WorkoutTemplate.id == template_id,
+        models.WorkoutTemplate.user_id == user_id
+    ).first()
+
+@router.get("/", response_model=List[schemas.WorkoutTemplate])
+def get_templates(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return db.query(models.WorkoutTemplate).options(
+        selectinload(models.WorkoutTemplate.exercises).selectinload(models.TemplateExercise.sets)
+    ).filter(
+        models.WorkoutTemplate.user_id == current_user.id
+    ).order_by(models.WorkoutTemplate.name).all()
+
+@router.get("/{template_id}", response_model=schemas.WorkoutTemplate)
+def get_template(
+    template_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    template = load_template(db, current_user.id, template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Шаблон не найден")
+    return template
+
+@router.post("/", response_model=schemas.WorkoutTemplate, status_code=201)
+def create_template(
+    template_data: schemas.WorkoutTemplateCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    template = models.WorkoutTemplate(
+        user_id=current_user.id,
+        **template_data.dict(exclude={"exercises"})
+    )
+    for exercise_data in template_data.exercises:
+        exercise = models.TemplateExercise(**exercise_data.dict(exclude={"sets"}))
+        exercise.sets = [models.TemplateSet(**set_data.dict()) for set_data in exercise_data.sets]
+        template.exercises.append(exercise)
+    
+    db.add(template)
+    db.commit()
+    db.refresh(template)
+    return template
+
+@router.post("/from-workout/{workout_id}", response_model=schemas.WorkoutTemplate, status_code=201)
+def create_template_from_workout(
+    workout_id: int,
+    name: Optional[str] = Query(None, min_length=1, max_length=100),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    values = {"name": name} if name else {}
+    template_id = copy_tree(db, WORKOUT_TREE, TEMPLATE_TREE, workout_id, current_user.id, **values)
+    if template_id is None:
+        raise HTTPException(status_code=404, detail="Тренировка не найдена")
+    
+    db.commit()
+    return load_template(db, current_user.id, template_id)
+
+@router.post("/{template_id}/apply", response_model=schemas.Workout, status_code=201)
+def apply_template(
+    template_id: int,
+    workout_date: date = Query(default_factory=date.today, alias="date"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    workout_id = copy_tree(db, TEMPLATE_TREE, WORKOUT_TREE, template_id, current_user.id, date=workout_date)
+    if workout_id is None:
+        raise HTTPException(status_code=404, detail="Шаблон не найден")
+    
+    db.commit()
+    result_cache.invalidate_user(current_user.id)
+    workout = db.get(models.Workout, workout_id)
+    publish_workout(current_user.id, "created", workout)
+    return workout
+
+@router.delete("/{template_id}", status_code=204)
+def delete_template(
+    template_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    template = load_template(db, current_user.id, template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Шаблон не найден")
+    
+    db.delete(template)
+    db.commit()
@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from backend.app.database import get_db
+from backend.app.database import assign_shard, get_db
 from backend.app import models, schemas, auth
 from backend.app.auth import get_current_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
@@ -28,6 +28,8 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     
     try:
         db.add(db_user)
+        db.flush()
+        assign_shard(db_user)
         db.commit()
         db.refresh(db_user)
     except Exception as e:
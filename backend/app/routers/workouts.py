@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc, func, insert
 from typing import List, Optional
 from datetime import date, timedelta
 
 from backend.app.database import get_db
 from backend.app import models, schemas
 from backend.app.auth import get_current_user
+from backend.app.cache import cached, result_cache
+from backend.app.events import publish_deleted, publish_workout
+from backend.app.idempotency import find_response, save_response
+from backend.app.templates import WORKOUT_TREE, copy_tree
 
 router = APIRouter(prefix="/workouts", tags=["workouts"])
 
@@ -19,7 +23,10 @@ def get_workouts(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Workout).filter(models.Workout.user_id == current_user.id)
+    # подходы и упражнения всех тренировок страницы - двумя запросами, а не по запросу на тренировку
+    query = db.query(models.Workout).options(
+        selectinload(models.Workout.exercises).selectinload(models.Exercise.sets)
+    ).filter(models.Workout.user_id == current_user.id)
     
     if start_date:
         query = query.filter(models.Workout.date >= start_date)
@@ -35,7 +42,9 @@ def get_workout(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    workout = db.query(models.Workout).filter(
+    workout = db.query(models.Workout).options(
+        selectinload(models.Workout.exercises).selectinload(models.Exercise.sets)
+    ).filter(
         models.Workout.id == workout_id,
         models.Workout.user_id == current_user.id
     ).first()
@@ -48,35 +57,65 @@ def get_workout(
 @router.post("/", response_model=schemas.Workout, status_code=201)
 def create_workout(
     workout_data: schemas.WorkoutCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    if idempotency_key:
+        stored = find_response(db, current_user.id, idempotency_key, "POST /workouts", workout_data)
+        if stored:
+            return stored
+        # запись и ключ в одной точке сохранения: при гонке откатываются только они
+        savepoint = db.begin_nested()
+    
     db_workout = models.Workout(
         user_id=current_user.id,
         **workout_data.dict(exclude={"exercises"})
     )
     
     db.add(db_workout)
-    db.commit()
-    db.refresh(db_workout)
+    db.flush()
     
-    for exercise_data in workout_data.exercises:
-        db_exercise = models.Exercise(
-            workout_id=db_workout.id,
-            **exercise_data.dict(exclude={"sets"})
-        )
-        
-        db.add(db_exercise)
-        db.commit()
-        db.refresh(db_exercise)
-        
-        for set_data in exercise_data.sets:
-            db_set = models.ExerciseSet(exercise_id=db_exercise.id, **set_data.dict())
-            db.add(db_set)
-        
-        db.commit()
+    if db.get_bind().dialect.insert_returning:
+        # все упражнения одним INSERT ... RETURNING, затем все подходы одним INSERT
+        exercise_ids = []
+        if workout_data.exercises:
+            exercise_ids = db.scalars(
+                insert(models.Exercise).returning(models.Exercise.id, sort_by_parameter_order=True),
+                [
+                    {"workout_id": db_workout.id, **exercise_data.dict(exclude={"sets"})}
+                    for exercise_data in workout_data.exercises
+                ]
+            ).all()
+        set_rows = [
+            {"exercise_id": exercise_id, **set_data.dict()}
+            for exercise_id, exercise_data in zip(exercise_ids, workout_data.exercises)
+            for set_data in exercise_data.sets
+        ]
+        if set_rows:
+            db.execute(insert(models.ExerciseSet), set_rows)
+    else:
+        for exercise_data in workout_data.exercises:
+            db_exercise = models.Exercise(
+                workout_id=db_workout.id,
+                **exercise_data.dict(exclude={"sets"})
+            )
+            db_exercise.sets = [models.ExerciseSet(**set_data.dict()) for set_data in exercise_data.sets]
+            db.add(db_exercise)
+    
+    if idempotency_key:
+        # ответ сохраняется в той же транзакции, что и сама тренировка
+        db.flush()
+        db.refresh(db_workout)
+        body = schemas.Workout.model_validate(db_workout).model_dump(mode="json")
+        stored = save_response(db, savepoint, current_user.id, idempotency_key, "POST /workouts", workout_data, 201, body)
+        if stored:
+            return stored
     
+    db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(db_workout)
+    publish_workout(current_user.id, "created", db_workout)
     return db_workout
 
 @router.put("/{workout_id}", response_model=schemas.Workout)
@@ -98,7 +137,102 @@ def update_workout(
         setattr(workout, field, value)
     
     db.commit()
+    result_cache.invalidate_user(current_user.id)
     db.refresh(workout)
+    publish_workout(current_user.id, "updated", workout)
+    return workout
+
+@router.post("/{workout_id}/clone", response_model=schemas.Workout, status_code=201)
+def clone_workout(
+    workout_id: int,
+    workout_date: date = Query(default_factory=date.today, alias="date"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    new_id = copy_tree(db, WORKOUT_TREE, WORKOUT_TREE, workout_id, current_user.id, date=workout_date)
+    if new_id is None:
+        raise HTTPException(status_code=404, detail="Тренировка не найдена")
+    
+    db.commit()
+    result_cache.invalidate_user(current_user.id)
+    workout = db.get(models.Workout, new_id)
+    publish_workout(current_user.id, "created", workout)
+    return workout
+
+def _apply_fields(instance, fields: dict):
+    # UPDATE попадает в запрос только для действительно изменившихся колонок
+    for field, value in fields.items():
+        if getattr(instance, field) != value:
+            setattr(instance, field, value)
+
+@router.patch("/{workout_id}", response_model=schemas.Workout)
+def patch_workout(
+    workout_id: int,
+    patch: schemas.WorkoutPatch,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    workout = db.query(models.Workout).options(
+        selectinload(models.Workout.exercises).selectinload(models.Exercise.sets)
+    ).filter(
+        models.Workout.id == workout_id,
+        models.Workout.user_id == current_user.id
+    ).first()
+    
+    if not workout:
+        raise HTTPException(status_code=404, detail="Тренировка не найдена")
+    
+    fields = patch.dict(exclude_unset=True, exclude={"exercises", "remove_exercises"})
+    if any(field in fields and not fields[field] for field in ("name", "date")):
+        raise HTTPException(status_code=422, detail="Название и дата тренировки не могут быть пустыми")
+    _apply_fields(workout, fields)
+    
+    exercises = {exercise.id: exercise for exercise in workout.exercises}
+    for exercise_id in patch.remove_exercises:
+        if exercise_id not in exercises:
+            raise HTTPException(status_code=404, detail=f"Упражнение {exercise_id} не найдено")
+        workout.exercises.remove(exercises.pop(exercise_id))
+    
+    for exercise_patch in patch.exercises:
+        exercise_fields = exercise_patch.dict(exclude_unset=True, exclude={"id", "sets", "remove_sets"})
+        if exercise_patch.id is None:
+            if not exercise_fields.get("name"):
+                raise HTTPException(status_code=422, detail="Для нового упражнения укажите название")
+            exercise = models.Exercise(**exercise_fields)
+            workout.exercises.append(exercise)
+        else:
+            exercise = exercises.get(exercise_patch.id)
+            if exercise is None:
+                raise HTTPException(status_code=404, detail=f"Упражнение {exercise_patch.id} не найдено")
+            if "name" in exercise_fields and not exercise_fields["name"]:
+                raise HTTPException(status_code=422, detail="Название упражнения не может быть пустым")
+            _apply_fields(exercise, exercise_fields)
+        
+        sets = {exercise_set.id: exercise_set for exercise_set in exercise.sets if exercise_set.id is not None}
+        for set_id in exercise_patch.remove_sets:
+            if set_id not in sets:
+                raise HTTPException(status_code=404, detail=f"Подход {set_id} не найден")
+            exercise.sets.remove(sets.pop(set_id))
+        
+        for set_patch in exercise_patch.sets:
+            set_fields = set_patch.dict(exclude_unset=True, exclude={"id"})
+            if set_patch.id is None:
+                if set_fields.get("set_number") is None:
+                    raise HTTPException(status_code=422, detail="Для нового подхода укажите set_number")
+                exercise.sets.append(models.ExerciseSet(**set_fields))
+                continue
+            exercise_set = sets.get(set_patch.id)
+            if exercise_set is None:
+                raise HTTPException(status_code=404, detail=f"Подход {set_patch.id} не найден")
+            if "set_number" in set_fields and set_fields["set_number"] is None:
+                raise HTTPException(status_code=422, detail="set_number не может быть пустым")
+            _apply_fields(exercise_set, set_fields)
+    
+    # все изменения уходят одним flush и одним коммитом
+    db.commit()
+    result_cache.invalidate_user(current_user.id)
+    db.refresh(workout)
+    publish_workout(current_user.id, "updated", workout)
     return workout
 
 @router.delete("/{workout_id}", status_code=204)
@@ -117,15 +251,28 @@ def delete_workout(
     
     db.delete(workout)
     db.commit()
+    result_cache.invalidate_user(current_user.id)
+    publish_deleted(current_user.id, "workout", workout_id)
 
-@router.get("/stats/summary")
+@router.get("/stats/summary", response_model=schemas.WorkoutStats, response_model_exclude_none=True)
 def get_workout_summary(
     period: str = Query("month", pattern="^(week|month|year|all)$"),
+    by_month: bool = False,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     today = date.today()
-    
+    return cached(
+        current_user.id, ("workout_summary", period, by_month, today),
+        lambda: _compute_workout_summary(db, current_user.id, period, today, by_month)
+    )
+
+def _month_expression(column, dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+def _compute_workout_summary(db: Session, user_id: int, period: str, today: date, by_month: bool = False):
     if period == "week":
         start_date = today - timedelta(days=7)
     elif period == "month":
@@ -135,30 +282,46 @@ def get_workout_summary(
     else:
         start_date = None
     
-    query = db.query(models.Workout).filter(models.Workout.user_id == current_user.id)
-    
+    # один и тот же фильтр периода для итогов, помесячной разбивки и любимых упражнений
+    period_filter = [models.Workout.user_id == user_id]
     if start_date:
-        query = query.filter(models.Workout.date >= start_date)
+        period_filter.append(models.Workout.date >= start_date)
     
-    workouts = query.all()
-    
-    total_duration = sum(w.duration or 0 for w in workouts)
-    total_workouts = len(workouts)
+    duration = func.coalesce(models.Workout.duration, 0)
+    totals = db.query(
+        func.count(models.Workout.id).label("count"),
+        func.coalesce(func.sum(duration), 0).label("total_duration"),
+        func.coalesce(func.avg(duration), 0).label("avg_duration")
+    ).filter(*period_filter).one()
     
     exercises = (
         db.query(models.Exercise.name, func.count(models.Exercise.id).label('count'))
         .join(models.Workout)
-        .filter(models.Workout.user_id == current_user.id)
+        .filter(*period_filter)
         .group_by(models.Exercise.name)
         .order_by(func.count(models.Exercise.id).desc())
         .limit(5)
         .all()
     )
     
-    return {
-        "total_workouts": total_workouts,
-        "total_duration_minutes": total_duration,
-        "avg_duration": total_duration / total_workouts if total_workouts > 0 else 0,
+    result = {
+        "total_workouts": totals.count,
+        "total_duration_minutes": totals.total_duration,
+        "avg_duration": float(totals.avg_duration),
         "favorite_exercises": [{"name": e[0], "count": e[1]} for e in exercises],
         "period": period
-    }
\ No newline at end of file
+    }
+    
+    if by_month:
+        month = _month_expression(models.Workout.date, db.get_bind().dialect.name).label("month")
+        months = db.query(
+            month,
+            func.count(models.Workout.id).label("count"),
+            func.coalesce(func.sum(duration), 0).label("total_duration")
+        ).filter(*period_filter).group_by(month).order_by(month).all()
+        result["workouts_by_month"] = {
+            row.month: {"count": row.count, "total_duration": row.total_duration}
+            for row in months
+        }
+    
+    return result
\ No newline at end of file
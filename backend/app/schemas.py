@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from datetime import date as date_type, datetime
-from typing import Optional, List
+from typing import Any, Optional, List, Dict, Union
 
 class BaseSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -64,8 +64,69 @@ class Workout(WorkoutBase):
     id: int
     user_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     exercises: List[Exercise] = []
 
+# PATCH /workouts/{id}: элемент без id добавляется, с id - обновляются только переданные поля
+class ExerciseSetPatch(BaseSchema):
+    id: Optional[int] = None
+    set_number: Optional[int] = None
+    reps: Optional[int] = None
+    weight: Optional[float] = None
+    rest_time: Optional[int] = None
+    completed: Optional[bool] = None
+
+class ExercisePatch(BaseSchema):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    category: Optional[str] = None
+    order: Optional[int] = None
+    sets: List[ExerciseSetPatch] = []
+    remove_sets: List[int] = []
+
+class WorkoutPatch(BaseSchema):
+    date: Optional[date_type] = None
+    name: Optional[str] = None
+    duration: Optional[int] = None
+    notes: Optional[str] = None
+    exercises: List[ExercisePatch] = []
+    remove_exercises: List[int] = []
+
+class TemplateSetBase(BaseSchema):
+    set_number: int
+    reps: Optional[int] = None
+    weight: Optional[float] = None
+    rest_time: Optional[int] = None
+
+class TemplateSet(TemplateSetBase):
+    id: int
+
+class TemplateExerciseBase(BaseSchema):
+    name: str
+    category: Optional[str] = None
+    order: int = 0
+
+class TemplateExerciseCreate(TemplateExerciseBase):
+    sets: List[TemplateSetBase] = []
+
+class TemplateExercise(TemplateExerciseBase):
+    id: int
+    sets: List[TemplateSet] = []
+
+class WorkoutTemplateBase(BaseSchema):
+    name: str
+    duration: Optional[int] = None
+    notes: Optional[str] = None
+
+class WorkoutTemplateCreate(WorkoutTemplateBase):
+    exercises: List[TemplateExerciseCreate] = []
+
+class WorkoutTemplate(WorkoutTemplateBase):
+    id: int
+    user_id: int
+    created_at: datetime
+    exercises: List[TemplateExercise] = []
+
 class MealBase(BaseSchema):
     date: date_type = Field(default_factory=date_type.today)
     meal_type: str
@@ -78,11 +139,28 @@ class MealBase(BaseSchema):
     time: Optional[datetime] = None
 
 class MealCreate(MealBase):
-    pass
+    name: Optional[str] = None
+    food_id: Optional[int] = None
 
 class Meal(MealBase):
     id: int
     user_id: int
+    updated_at: Optional[datetime] = None
+
+class FoodBase(BaseSchema):
+    name: str
+    calories: Optional[float] = None
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fat: Optional[float] = None
+
+class FoodCreate(FoodBase):
+    pass
+
+class Food(FoodBase):
+    id: int
+    user_id: Optional[int] = None
+    usage_count: int = 0
 
 class MeasurementBase(BaseSchema):
     date: date_type = Field(default_factory=date_type.today)
@@ -105,6 +183,7 @@ class MeasurementCreate(MeasurementBase):
 class Measurement(MeasurementBase):
     id: int
     user_id: int
+    updated_at: Optional[datetime] = None
 
 class GoalBase(BaseSchema):
     title: str
@@ -123,21 +202,122 @@ class Goal(GoalBase):
     id: int
     user_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class JobCreate(BaseModel):
+    kind: str
+    params: dict = {}
+
+class Job(BaseSchema):
+    id: int
+    kind: str
+    status: str
+    progress: float = 0
+    attempts: int = 0
+    max_attempts: int = 3
+    params: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class SyncResponse(BaseModel):
+    token: str
+    full: bool
+    workouts: List[Workout] = []
+    meals: List[Meal] = []
+    measurements: List[Measurement] = []
+    goals: List[Goal] = []
+    deleted: Dict[str, List[int]] = {}
+
+class BatchItem(BaseModel):
+    path: str = Field(..., pattern="^/")
+    params: dict = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(..., min_length=1, max_length=20)
+
+class BufferedSetCreate(ExerciseSetCreate):
+    exercise_id: int
+
+class BufferedWrite(BaseModel):
+    seq: int
+    pending: int
+
+# события /api/ws/workouts/{id}/live; seq растет у клиента в пределах тренировки
+class LiveExerciseEvent(ExerciseBase):
+    seq: int
+    ref: str = Field(..., max_length=64)
+
+class LiveSetEvent(ExerciseSetCreate):
+    seq: int
+    exercise_id: Optional[int] = None
+    exercise_ref: Optional[str] = None
+
+# массовые операции: по списку id и/или диапазону дат (для целей - по сроку)
+class BulkFilter(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=10000)
+    date_from: Optional[date_type] = None
+    date_to: Optional[date_type] = None
+
+class BulkUpdate(BulkFilter):
+    values: Dict[str, Any]
+
+class BulkResult(BaseModel):
+    count: int
+
+class ExerciseCount(BaseSchema):
+    name: str
+    count: int
+
+class MonthWorkouts(BaseSchema):
+    count: int
+    total_duration: int
 
 class WorkoutStats(BaseSchema):
     total_workouts: int
-    total_duration: int
+    total_duration_minutes: int
     avg_duration: float
-    workouts_by_month: dict
-    favorite_exercises: List[dict]
+    favorite_exercises: List[ExerciseCount]
+    period: str
+    # ключ - "YYYY-MM", только при by_month=true
+    workouts_by_month: Optional[Dict[str, MonthWorkouts]] = None
+
+class NutritionDay(BaseSchema):
+    date: date_type
+    meal_count: int
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    # скользящие средние за 7 и 28 дней по дням с записями, None - записей не было
+    calories_avg_7: Optional[float] = None
+    protein_avg_7: Optional[float] = None
+    carbs_avg_7: Optional[float] = None
+    fat_avg_7: Optional[float] = None
+    calories_avg_28: Optional[float] = None
+    protein_avg_28: Optional[float] = None
+    carbs_avg_28: Optional[float] = None
+    fat_avg_28: Optional[float] = None
 
-class NutritionStats(BaseSchema):
+class NutritionTotals(BaseSchema):
+    start_date: date_type
+    end_date: date_type
+    days_logged: int
     total_calories: float
     avg_calories_per_day: float
     avg_protein: float
     avg_carbs: float
     avg_fat: float
-    calories_by_day: List[dict]
+
+class NutritionStats(NutritionTotals):
+    calories_by_day: List[NutritionDay]
+
+class NutritionStatsColumnar(NutritionTotals):
+    # format=columnar: колонки полей NutritionDay массивами; при delta=true
+    # date - разности в днях, а первая дата - в date_start
+    calories_by_day: Dict[str, Union[str, List[Any]]]
 
 class ProgressStats(BaseSchema):
     weight_data: List[dict]
@@ -0,0 +1,253 @@
+import re
+
+from sqlalchemy import text
+
+# rowid в search_index = id * 4 + код типа (1 - workout, 2 - exercise, 3 - meal),
+# чтобы триггеры удаляли записи по rowid, а не сканировали виртуальную таблицу
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE search_index USING fts5(
+    owner,
+    kind,
+    parent_id UNINDEXED,
+    item_date UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+WORKOUT_ROW = """
+SELECT {w}.id * 4 + 1, 'u' || {w}.user_id, 'workout', NULL, {w}.date, {w}.name, coalesce({w}.notes, '')
+"""
+
+EXERCISE_ROW = """
+SELECT e.id * 4 + 2, 'u' || w.user_id, 'exercise', w.id, w.date, e.name, coalesce(e.category, '')
+"""
+
+MEAL_ROW = """
+SELECT {m}.id * 4 + 3, 'u' || {m}.user_id, 'meal', NULL, {m}.date, {m}.name, coalesce({m}.notes, '')
+"""
+
+INSERT_INTO = "INSERT INTO search_index(rowid, owner, kind, parent_id, item_date, title, body)"
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_workouts_ai AFTER INSERT ON workouts BEGIN
+        {INSERT_INTO} {WORKOUT_ROW.format(w="new")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_workouts_au AFTER UPDATE OF name, notes, date ON workouts BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+        {INSERT_INTO} {WORKOUT_ROW.format(w="new")};
+        DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 2 FROM exercises WHERE workout_id = new.id);
+        {INSERT_INTO} {EXERCISE_ROW} FROM exercises e JOIN workouts w ON w.id = e.workout_id WHERE w.id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_workouts_ad AFTER DELETE ON workouts BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_exercises_ai AFTER INSERT ON exercises BEGIN
+        {INSERT_INTO} {EXERCISE_ROW} FROM exercises e JOIN workouts w ON w.id = e.workout_id WHERE e.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_exercises_au AFTER UPDATE OF name, category ON exercises BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+        {INSERT_INTO} {EXERCISE_ROW} FROM exercises e JOIN workouts w ON w.id = e.workout_id WHERE e.id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_exercises_ad AFTER DELETE ON exercises BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_meals_ai AFTER INSERT ON meals BEGIN
+        {INSERT_INTO} {MEAL_ROW.format(m="new")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_meals_au AFTER UPDATE OF name, notes, date ON meals BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+        {INSERT_INTO} {MEAL_ROW.format(m="new")};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_meals_ad AFTER DELETE ON meals BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+]
+
+BACKFILL = [
+    f"{INSERT_INTO} {WORKOUT_ROW.format(w='workouts')} FROM workouts",
+    f"{INSERT_INTO} {EXERCISE_ROW} FROM exercises e JOIN workouts w ON w.id = e.workout_id",
+    f"{INSERT_INTO} {MEAL_ROW.format(m='meals')} FROM meals",
+]
+
+USER_ROWS = [
+    f"{WORKOUT_ROW.format(w='workouts')} FROM workouts WHERE workouts.user_id = :user_id",
+    f"{EXERCISE_ROW} FROM exercises e JOIN workouts w ON w.id = e.workout_id WHERE w.user_id = :user_id",
+    f"{MEAL_ROW.format(m='meals')} FROM meals WHERE meals.user_id = :user_id",
+]
+
+USER_BACKFILL = [f"{INSERT_INTO} {rows}" for rows in USER_ROWS]
+
+SEARCH_QUERY = """
+SELECT
+    rowid,
+    kind,
+    parent_id,
+    item_date,
+    highlight(search_index, 4, '<mark>', '</mark>') AS title,
+    snippet(search_index, 5, '<mark>', '</mark>', '…', 12) AS snippet,
+    bm25(search_index, 0.0, 0.0, 0.0, 0.0, 10.0, 1.0) AS rank
+FROM search_index
+WHERE search_index MATCH :match
+ORDER BY rank
+LIMIT :limit
+"""
+
+# без FTS5 (PostgreSQL) - GIN-индексы по tsvector тех же полей, слова ищутся по префиксу
+TSVECTORS = {
+    "workout": "setweight(to_tsvector('simple', {t}.name), 'A') || "
+               "setweight(to_tsvector('simple', coalesce({t}.notes, '')), 'B')",
+    "exercise": "setweight(to_tsvector('simple', {t}.name), 'A') || "
+                "setweight(to_tsvector('simple', coalesce({t}.category, '')), 'B')",
+    "meal": "setweight(to_tsvector('simple', {t}.name), 'A') || "
+            "setweight(to_tsvector('simple', coalesce({t}.notes, '')), 'B')",
+}
+
+PG_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS ix_workouts_search ON workouts USING gin (({TSVECTORS['workout'].format(t='workouts')}))",
+    f"CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (({TSVECTORS['exercise'].format(t='exercises')}))",
+    f"CREATE INDEX IF NOT EXISTS ix_meals_search ON meals USING gin (({TSVECTORS['meal'].format(t='meals')}))",
+]
+
+TSQUERY = "to_tsquery('simple', :query)"
+
+PG_ROWS = {
+    "workout": f"""
+        SELECT w.id * 4 + 1 AS rowid, 'workout' AS kind, NULL AS parent_id, w.date AS item_date,
+               w.name AS title, coalesce(w.notes, '') AS body, -ts_rank({TSVECTORS['workout'].format(t='w')}, {TSQUERY}) AS rank
+        FROM workouts w
+        WHERE w.user_id = :user_id AND ({TSVECTORS['workout'].format(t='w')}) @@ {TSQUERY}
+    """,
+    "exercise": f"""
+        SELECT e.id * 4 + 2 AS rowid, 'exercise' AS kind, w.id AS parent_id, w.date AS item_date,
+               e.name AS title, coalesce(e.category, '') AS body, -ts_rank({TSVECTORS['exercise'].format(t='e')}, {TSQUERY}) AS rank
+        FROM exercises e JOIN workouts w ON w.id = e.workout_id
+        WHERE w.user_id = :user_id AND ({TSVECTORS['exercise'].format(t='e')}) @@ {TSQUERY}
+    """,
+    "meal": f"""
+        SELECT m.id * 4 + 3 AS rowid, 'meal' AS kind, NULL AS parent_id, m.date AS item_date,
+               m.name AS title, coalesce(m.notes, '') AS body, -ts_rank({TSVECTORS['meal'].format(t='m')}, {TSQUERY}) AS rank
+        FROM meals m
+        WHERE m.user_id = :user_id AND ({TSVECTORS['meal'].format(t='m')}) @@ {TSQUERY}
+    """,
+}
+
+# подсветка считается только для строк, попавших в LIMIT
+PG_SEARCH_QUERY = f"""
+SELECT
+    rowid,
+    kind,
+    parent_id,
+    item_date,
+    ts_headline('simple', title, {TSQUERY}, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') AS title,
+    ts_headline('simple', body, {TSQUERY}, 'StartSel=<mark>, StopSel=</mark>, MaxWords=12, MinWords=4') AS snippet,
+    rank
+FROM ({{rows}} ORDER BY rank, item_date DESC LIMIT :limit) AS items
+ORDER BY rank, item_date DESC
+"""
+
+def create_search_index(engine):
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in PG_INDEXES:
+                conn.execute(text(statement))
+        return
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        )).first()
+
+        if not exists:
+            conn.execute(text(CREATE_TABLE))
+            for statement in BACKFILL:
+                conn.execute(text(statement))
+
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+
+def rebuild_user_index(db, user_id: int, report=None) -> int:
+    if db.get_bind().dialect.name != "sqlite":
+        return 0
+
+    db.execute(text(
+        "DELETE FROM search_index WHERE rowid IN "
+        "(SELECT rowid FROM search_index WHERE search_index MATCH :match)"
+    ), {"match": f'owner:"u{user_id}"'})
+
+    indexed = 0
+    for step, statement in enumerate(USER_BACKFILL, start=1):
+        indexed += db.execute(text(statement), {"user_id": user_id}).rowcount
+        if report:
+            report(step / len(USER_BACKFILL))
+    db.commit()
+    return indexed
+
+def build_match_expression(user_id: int, query: str, kind: str = None):
+    tokens = re.findall(r"\w+", query)
+    if not tokens:
+        return None
+
+    # каждое слово ищется как префикс, владелец и тип фильтруются внутри индекса
+    terms = " ".join('"{}"*'.format(token) for token in tokens)
+    expression = f'owner:"u{user_id}" AND {{title body}}: ({terms})'
+    if kind:
+        expression += f' AND kind:"{kind}"'
+    return expression
+
+def _tsvector_search(db, user_id: int, query: str, kind: str = None, limit: int = 20):
+    tokens = re.findall(r"\w+", query)
+    if not tokens:
+        return []
+
+    # как и в FTS5: каждое слово - префикс, все слова обязательны
+    tsquery = " & ".join(f"{token}:*" for token in tokens)
+    rows = " UNION ALL ".join(PG_ROWS[name] for name in PG_ROWS if kind in (None, name))
+    return db.execute(
+        text(PG_SEARCH_QUERY.format(rows=rows)),
+        {"user_id": user_id, "query": tsquery, "limit": limit}
+    ).all()
+
+def search(db, user_id: int, query: str, kind: str = None, limit: int = 20):
+    if db.get_bind().dialect.name != "sqlite":
+        rows = _tsvector_search(db, user_id, query, kind, limit)
+    else:
+        match = build_match_expression(user_id, query, kind)
+        if match is None:
+            return []
+        rows = db.execute(text(SEARCH_QUERY), {"match": match, "limit": limit}).all()
+
+    hits = []
+    for row in rows:
+        hits.append({
+            "type": row.kind,
+            "id": row.rowid // 4,
+            "workout_id": row.parent_id if row.kind == "exercise" else None,
+            "date": row.item_date,
+            "title": row.title,
+            "snippet": row.snippet,
+            "rank": row.rank
+        })
+
+    return hits
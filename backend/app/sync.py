@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session, attributes, selectinload
+
+from backend.app import models
+
+# сущности верхнего уровня, которые отдает /api/sync
+SYNCED_MODELS = {
+    "workouts": models.Workout,
+    "meals": models.Meal,
+    "measurements": models.Measurement,
+    "goals": models.Goal,
+}
+
+ENTITY_NAMES = {
+    models.Workout: "workouts",
+    models.Exercise: "exercises",
+    models.ExerciseSet: "exercise_sets",
+    models.Meal: "meals",
+    models.Measurement: "measurements",
+    models.Goal: "goals",
+}
+
+# коллекции с delete-orphan: убранные из них строки удаляются уже внутри flush
+ORPHAN_COLLECTIONS = {
+    models.Workout: "exercises",
+    models.Exercise: "sets",
+}
+
+# таблицы, в строки которых база подставляет sync_seq (models.SYNC_SEQ)
+SEQUENCED_MODELS = set(SYNCED_MODELS.values()) | {models.Tombstone}
+
+# Токен - номер из sync_counters. Пишущая транзакция первым делом увеличивает
+# счетчик и держит блокировку его строки до коммита, поэтому номера выдаются
+# в порядке коммитов: все, что зафиксируют позже, получит номер больше токена
+TOKEN_PREFIX = "s"
+
+def encode_token(seq: int) -> str:
+    return f"{TOKEN_PREFIX}{seq}"
+
+def decode_token(token: str) -> Optional[int]:
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    try:
+        return int(token[len(TOKEN_PREFIX):])
+    except ValueError:
+        return None
+
+def is_legacy_token(token: str) -> bool:
+    # раньше токеном было время в микросекундах; по нему отдается полная синхронизация
+    return token.isdigit()
+
+def init_counter(bind):
+    counters = models.SyncCounter.__table__
+    with bind.begin() as conn:
+        if conn.execute(select(counters.c.id).where(counters.c.id == 1)).first() is None:
+            conn.execute(insert(counters).values(id=1, value=0))
+
+def next_seq(session: Session):
+    # один номер на транзакцию; флаг сбрасывается в _reset_seq.
+    # Вставки через Table (templates.copy_tree) вызывают его сами
+    if session.info.get("sync_seq_taken"):
+        return
+    session.info["sync_seq_taken"] = True
+    session.execute(update(models.SyncCounter).where(models.SyncCounter.id == 1).values(
+        value=models.SyncCounter.value + 1
+    ))
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_seq(session: Session, transaction):
+    # после отката точки сохранения номер тоже откатился: следующая запись берет новый
+    if transaction.parent is None or transaction.nested:
+        session.info.pop("sync_seq_taken", None)
+
+@event.listens_for(Session, "do_orm_execute")
+def _sequence_statement(state):
+    # INSERT/UPDATE/DELETE через session.execute(insert(models.Meal)...) минуя unit of work
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None \
+            and state.bind_mapper.class_ in SEQUENCED_MODELS:
+        next_seq(state.session)
+
+def _owner_workout(session: Session, instance):
+    if isinstance(instance, models.Workout):
+        return instance
+    if isinstance(instance, models.ExerciseSet):
+        exercise = instance.exercise or session.get(models.Exercise, instance.exercise_id)
+        instance = exercise
+    if isinstance(instance, models.Exercise):
+        return instance.workout or session.get(models.Workout, instance.workout_id)
+    return None
+
+def _orphans(session: Session):
+    orphans = []
+    for instance in list(session.dirty):
+        collection = ORPHAN_COLLECTIONS.get(type(instance))
+        if collection is None:
+            continue
+        for child in attributes.get_history(instance, collection).deleted:
+            if child not in session.new and attributes.instance_state(child).persistent:
+                orphans.append(child)
+    return orphans
+
+@event.listens_for(Session, "before_flush")
+def _track_changes(session: Session, flush_context, instances):
+    now = datetime.utcnow()
+    touched_workouts = set()
+
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(type(instance) in ENTITY_NAMES for instance in changed):
+        next_seq(session)
+
+    for instance in changed:
+        if isinstance(instance, (models.Exercise, models.ExerciseSet)):
+            workout = _owner_workout(session, instance)
+            if workout is not None and workout not in session.deleted:
+                touched_workouts.add(workout)
+
+    # изменение упражнения или подхода меняет дерево тренировки целиком
+    for workout in touched_workouts:
+        workout.updated_at = now
+
+    for instance in list(session.deleted) + _orphans(session):
+        entity = ENTITY_NAMES.get(type(instance))
+        if entity is None:
+            continue
+        if hasattr(instance, "user_id"):
+            user_id = instance.user_id
+        else:
+            workout = _owner_workout(session, instance)
+            # при удалении тренировки достаточно ее собственной записи
+            if workout is None or workout in session.deleted:
+                continue
+            user_id = workout.user_id
+        session.add(models.Tombstone(user_id=user_id, entity=entity, entity_id=instance.id, deleted_at=now))
+
+def collect_changes(db: Session, user_id: int, since: Optional[int]):
+    # счетчик читается до строк: то, что зафиксируют между запросами, придет еще раз
+    token = db.query(models.SyncCounter.value).filter(models.SyncCounter.id == 1).scalar() or 0
+    changes = {}
+
+    for name, model in SYNCED_MODELS.items():
+        query = db.query(model).filter(model.user_id == user_id)
+        if since is not None:
+            query = query.filter(model.sync_seq > since)
+        if model is models.Workout:
+            query = query.options(selectinload(models.Workout.exercises).selectinload(models.Exercise.sets))
+        changes[name] = query.order_by(model.id).all()
+
+    deleted = {name: [] for name in ENTITY_NAMES.values()}
+    if since is not None:
+        tombstones = db.query(models.Tombstone).filter(
+            models.Tombstone.user_id == user_id,
+            models.Tombstone.sync_seq > since
+        ).order_by(models.Tombstone.id).all()
+        for tombstone in tombstones:
+            deleted.setdefault(tombstone.entity, []).append(tombstone.entity_id)
+
+    return {
+        "token": encode_token(token),
+        "full": since is None,
+        **changes,
+        "deleted": deleted
+    }
@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Table, func, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from backend.app import models
+from backend.app.sync import next_seq
+
+class Tree(NamedTuple):
+    root: Table
+    exercises: Table
+    sets: Table
+    # колонка exercises со ссылкой на root; подходы ссылаются на exercise_id
+    parent: str
+
+WORKOUT_TREE = Tree(
+    models.Workout.__table__, models.Exercise.__table__, models.ExerciseSet.__table__, "workout_id"
+)
+TEMPLATE_TREE = Tree(
+    models.WorkoutTemplate.__table__, models.TemplateExercise.__table__, models.TemplateSet.__table__, "template_id"
+)
+
+# номер синхронизации и время изменения у копии свои, а не исходной записи
+SKIP_COLUMNS = {"id", "sync_seq", "updated_at"}
+
+def _columns(source: Table, target: Table, skip: set, values: dict):
+    """Имена колонок target и выражения для SELECT из source.
+
+    Общие колонки копируются как есть, values подставляются вместо них
+    (значения - как параметры, выражения SQLAlchemy - как есть).
+    """
+    names = list(values) + [
+        name for name in target.c.keys()
+        if name in source.c and name not in skip and name not in values
+    ]
+    columns = []
+    for name in names:
+        if name not in values:
+            columns.append(source.c[name])
+        elif isinstance(values[name], ColumnElement):
+            columns.append(values[name].label(name))
+        else:
+            columns.append(literal(values[name], target.c[name].type).label(name))
+    return names, columns
+
+def _positions(exercises: Table, parent: str, root_id):
+    # порядковый номер упражнения внутри тренировки или шаблона
+    return select(
+        exercises.c.id,
+        func.row_number().over(order_by=exercises.c.id).label("position")
+    ).where(exercises.c[parent] == root_id).subquery()
+
+def copy_tree(db: Session, source: Tree, target: Tree, source_id: int, user_id: int, **values) -> Optional[int]:
+    """Копирует тренировку или шаблон с упражнениями и подходами тремя INSERT ... SELECT.
+
+    ORM-объекты не загружаются, число запросов не зависит от размера дерева.
+    Новые упражнения сопоставляются со старыми по порядку id: вставка идет
+    в порядке старых id, а новые id выдаются по возрастанию. Возвращает id
+    новой записи или None, если исходной нет у пользователя. Коммит - за
+    вызывающим.
+    """
+    now = datetime.utcnow()
+    values = {"user_id": user_id, **values}
+    for name in ("created_at", "updated_at"):
+        if name in target.root.c:
+            values[name] = now
+    if "sync_seq" in target.root.c:
+        # INSERT по Table минует do_orm_execute из sync.py: счетчик двигаем сами,
+        # иначе копия получит номер, который клиенты уже видели
+        next_seq(db)
+    names, columns = _columns(source.root, target.root, SKIP_COLUMNS, values)
+    statement = insert(target.root).from_select(names, select(*columns).where(
+        source.root.c.id == source_id,
+        source.root.c.user_id == user_id
+    ))
+    if db.get_bind().dialect.insert_returning:
+        new_id = db.execute(statement.returning(target.root.c.id)).scalar()
+    else:
+        result = db.execute(statement)
+        new_id = result.lastrowid if result.rowcount else None
+    if new_id is None:
+        return None
+
+    exercise_values = {target.parent: new_id}
+    if "updated_at" in target.exercises.c:
+        exercise_values["updated_at"] = now
+    names, columns = _columns(
+        source.exercises, target.exercises, SKIP_COLUMNS | {source.parent}, exercise_values
+    )
+    db.execute(insert(target.exercises).from_select(names, select(*columns).where(
+        source.exercises.c[source.parent] == source_id
+    ).order_by(source.exercises.c.id)))
+
+    old = _positions(source.exercises, source.parent, source_id)
+    new = _positions(target.exercises, target.parent, new_id)
+    set_values = {"exercise_id": new.c.id}
+    if "updated_at" in target.sets.c:
+        set_values["updated_at"] = now
+    names, columns = _columns(source.sets, target.sets, SKIP_COLUMNS, set_values)
+    db.execute(insert(target.sets).from_select(names, select(*columns).select_from(
+        source.sets
+        .join(old, source.sets.c.exercise_id == old.c.id)
+        .join(new, new.c.position == old.c.position)
+    ).order_by(source.sets.c.id)))
+
+    return new_id
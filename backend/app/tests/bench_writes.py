@@ -0,0 +1,135 @@
+"""Нагрузочный тест конкурентной записи в SQLite.
+
+Сравнивает обычный режим и FITLOG_SINGLE_WRITER=1: каждый режим
+запускается в отдельном процессе на чистой базе во временной папке.
+
+    python -m backend.app.tests.bench_writes --threads 16 --ops 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def create_workout(SessionLocal, models, user_id):
+    # повторяет create_workout из роутера: коммит на тренировку и на каждое упражнение
+    db = SessionLocal()
+    try:
+        workout = models.Workout(user_id=user_id, date=date.today(), name="bench", duration=60)
+        db.add(workout)
+        db.commit()
+        db.refresh(workout)
+        for order in range(3):
+            exercise = models.Exercise(workout_id=workout.id, name=f"ex{order}", order=order)
+            db.add(exercise)
+            db.commit()
+            db.refresh(exercise)
+            for number in range(1, 4):
+                db.add(models.ExerciseSet(exercise_id=exercise.id, set_number=number, reps=10, weight=50))
+            db.commit()
+    finally:
+        db.close()
+
+def read_dashboard(SessionLocal, models, user_id):
+    from sqlalchemy import func
+
+    db = SessionLocal()
+    try:
+        db.query(func.count(models.Workout.id)).filter(models.Workout.user_id == user_id).scalar()
+    finally:
+        db.close()
+
+def worker(threads: int, ops: int, read_ratio: float):
+    from backend.app import database, models
+
+    database.engine.echo = False
+    database.read_engine.echo = False
+    database.init_db()
+
+    db = database.SessionLocal()
+    user = models.User(email="bench@fitlog.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    def run(index):
+        latencies = {"write": [], "read": []}
+        errors = 0
+        for op in range(ops):
+            kind = "read" if (op * 7 + index) % 100 < read_ratio * 100 else "write"
+            started = time.perf_counter()
+            try:
+                if kind == "write":
+                    create_workout(database.SessionLocal, models, user_id)
+                else:
+                    read_dashboard(database.SessionLocal, models, user_id)
+            except Exception:
+                errors += 1
+                continue
+            latencies[kind].append(time.perf_counter() - started)
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, range(threads)))
+    elapsed = time.perf_counter() - started
+
+    writes = [lat for r, _ in results for lat in r["write"]]
+    reads = [lat for r, _ in results for lat in r["read"]]
+    print(json.dumps({
+        "elapsed": elapsed,
+        "writes_per_sec": len(writes) / elapsed,
+        "write_p50_ms": percentile(writes, 0.5) * 1000,
+        "write_p99_ms": percentile(writes, 0.99) * 1000,
+        "read_p99_ms": percentile(reads, 0.99) * 1000,
+        "errors": sum(e for _, e in results)
+    }))
+
+def run_mode(single_writer: bool, args) -> dict:
+    env = dict(os.environ, FITLOG_SINGLE_WRITER="1" if single_writer else "0")
+    env["PYTHONPATH"] = str(project_root)
+    with tempfile.TemporaryDirectory() as workdir:
+        process = subprocess.run(
+            [sys.executable, "-m", "backend.app.tests.bench_writes", "--worker",
+             "--threads", str(args.threads), "--ops", str(args.ops), "--read-ratio", str(args.read_ratio)],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr[-2000:])
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=50)
+    parser.add_argument("--read-ratio", type=float, default=0.2)
+    parser.add_argument("--worker", action="store_true")
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.threads, args.ops, args.read_ratio)
+        return
+
+    for name, single_writer in (("обычный режим", False), ("single writer", True)):
+        result = run_mode(single_writer, args)
+        print(f"{name}: {result['writes_per_sec']:.1f} записей/с, "
+              f"p50 {result['write_p50_ms']:.1f} мс, p99 {result['write_p99_ms']:.1f} мс, "
+              f"чтение p99 {result['read_p99_ms']:.1f} мс, ошибок {result['errors']}")
+
+if __name__ == "__main__":
+    main()
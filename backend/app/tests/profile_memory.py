@@ -0,0 +1,267 @@
+"""Профилирование памяти эндпоинтов на большой базе (tracemalloc).
+
+Запросы выполняются в процессе через TestClient. Для каждого считается
+пик выделенной памяти, места выделения на пике и то, что осталось в
+памяти после запроса. Пороги PROFILES рассчитаны на базу по умолчанию
+(DEFAULT_WORKOUTS тренировок); с --check превышение дает код выхода 1.
+
+    python -m backend.app.tests.profile_memory
+    python -m backend.app.tests.profile_memory --workouts 20000 --top 15
+    python -m backend.app.tests.profile_memory --check
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, NamedTuple
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+PROJECT_PREFIX = f"{project_root}{os.sep}"
+TESTS_PREFIX = f"{Path(__file__).parent}{os.sep}"
+
+DEFAULT_WORKOUTS = 2000
+NFRAMES = 25
+MB = 1024 * 1024
+
+# (путь, порог пика в МБ)
+PROFILES = [
+    ("/api/workouts/?limit=100", 8),
+    ("/api/workouts/?limit=1000", 48),
+    ("/api/workouts/1", 1),
+    ("/api/workouts/stats/summary?period=all&by_month=true", 1),
+    ("/api/workouts/stats/summary?period=month", 2),
+    ("/api/meals/?limit=1000", 8),
+    ("/api/stats/dashboard", 1),
+    ("/api/stats/nutrition/daily", 1),
+]
+# после запроса (без кэша результатов) в памяти не должно оставаться больше
+RETAINED_LIMIT_MB = 0.5
+
+# выделения самого профилировщика и импортов не относятся к запросу
+IGNORED_FILES = {tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>"}
+
+class MemoryProfile(NamedTuple):
+    path: str
+    status: int
+    peak: int
+    retained: int
+    retained_blocks: int
+    top: List[tuple]
+    leaks: List[tuple]
+
+def seed(db, user_id: int, workouts: int = DEFAULT_WORKOUTS):
+    """Тренировки по дню назад от сегодня: 3 упражнения по 3 подхода и 3 приема пищи в день."""
+    from sqlalchemy import func, insert
+
+    from backend.app import models
+
+    first = (db.query(func.max(models.Workout.id)).scalar() or 0) + 1
+    first_exercise = (db.query(func.max(models.Exercise.id)).scalar() or 0) + 1
+    today = date.today()
+    workout_rows, exercise_rows, set_rows, meal_rows = [], [], [], []
+    for i in range(workouts):
+        day = today - timedelta(days=i)
+        workout_id = first + i
+        workout_rows.append({
+            "id": workout_id, "user_id": user_id, "date": day, "name": f"Тренировка {i}",
+            "duration": 60, "notes": "Заметка к тренировке " * 5
+        })
+        for order, name in enumerate(("Жим лежа", "Присед", "Тяга")):
+            exercise_id = first_exercise + i * 3 + order
+            exercise_rows.append({"id": exercise_id, "workout_id": workout_id, "name": name, "order": order})
+            set_rows.extend(
+                {"exercise_id": exercise_id, "set_number": n, "reps": 8, "weight": 80 + n}
+                for n in (1, 2, 3)
+            )
+        meal_rows.extend(
+            {"user_id": user_id, "date": day, "meal_type": meal_type, "name": "Рис с курицей",
+             "calories": 600, "protein": 40, "carbs": 70, "fat": 15}
+            for meal_type in ("breakfast", "lunch", "dinner")
+        )
+    db.execute(insert(models.Workout), workout_rows)
+    db.execute(insert(models.Exercise), exercise_rows)
+    db.execute(insert(models.ExerciseSet), set_rows)
+    db.execute(insert(models.Meal), meal_rows)
+    db.commit()
+
+class _PeakSampler(threading.Thread):
+    """Снимок памяти каждый раз, когда объем заметно вырос с прошлого снимка.
+
+    Последний снимок близок к пику; сами снимки тоже занимают память,
+    поэтому пик считается отдельным проходом без сэмплера.
+    """
+
+    INTERVAL = 0.002
+    GROWTH = 1.25
+    MIN_STEP = 256 * 1024
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.start_level = tracemalloc.get_traced_memory()[0]
+        self.level = 0
+        self.snapshot = None
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.INTERVAL):
+            current = tracemalloc.get_traced_memory()[0] - self.start_level
+            if current > max(self.level * self.GROWTH, self.level + self.MIN_STEP):
+                self.snapshot = tracemalloc.take_snapshot()
+                self.level = tracemalloc.get_traced_memory()[0] - self.start_level
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def _reset():
+    from backend.app.cache import result_cache
+
+    # кэш результатов ограничен по размеру и утечкой не считается
+    result_cache.clear()
+    gc.collect()
+
+def _site(traceback) -> str:
+    # ближайшая строка кода приложения, иначе место в библиотеке
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PROJECT_PREFIX) and not frame.filename.startswith(TESTS_PREFIX):
+            return f"{frame.filename[len(PROJECT_PREFIX):]}:{frame.lineno} <- {traceback[-1]}"
+    return str(traceback[-1])
+
+def _top_sites(snapshot, before, limit: int) -> List[tuple]:
+    # группировка по трассе целиком идет по уникальным стекам, а не по каждому блоку
+    sizes = defaultdict(lambda: [0, 0])
+    for snap, sign in ((snapshot, 1), (before, -1)):
+        for stat in snap.statistics("traceback"):
+            if stat.traceback[-1].filename in IGNORED_FILES:
+                continue
+            entry = sizes[_site(stat.traceback)]
+            entry[0] += sign * stat.size
+            entry[1] += sign * stat.count
+    top = sorted(((site, size, count) for site, (size, count) in sizes.items() if size > 0),
+                 key=lambda item: item[1], reverse=True)
+    return top[:limit]
+
+def profile_request(client, path: str, headers: dict, top: int = 10) -> MemoryProfile:
+    # прогрев без трассировки: импорты, кэш скомпилированных запросов SQLAlchemy, схемы pydantic
+    client.get(path, headers=headers)
+    _reset()
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(NFRAMES)
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        response = client.get(path, headers=headers)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        status = response.status_code
+        del response
+
+        _reset()
+        retained = [
+            stat for stat in tracemalloc.take_snapshot().compare_to(before, "lineno")
+            if stat.traceback[0].filename not in IGNORED_FILES
+        ]
+
+        sampler = _PeakSampler()
+        sampler.start()
+        try:
+            client.get(path, headers=headers)
+        finally:
+            sampler.stop()
+        top_sites = []
+        if sampler.snapshot is not None:
+            top_sites = _top_sites(sampler.snapshot, before, top)
+        _reset()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    return MemoryProfile(
+        path=path,
+        status=status,
+        peak=peak,
+        retained=max(sum(stat.size_diff for stat in retained), 0),
+        retained_blocks=max(sum(stat.count_diff for stat in retained), 0),
+        top=top_sites,
+        leaks=[(str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+               for stat in retained[:top] if stat.size_diff > 0]
+    )
+
+def check(profile: MemoryProfile, limit_mb: float) -> List[str]:
+    problems = []
+    if profile.status != 200:
+        problems.append(f"{profile.path}: ответ {profile.status}")
+    if profile.peak > limit_mb * MB:
+        problems.append(f"{profile.path}: пик {profile.peak / MB:.1f} МБ больше порога {limit_mb} МБ")
+    if profile.retained > RETAINED_LIMIT_MB * MB:
+        problems.append(f"{profile.path}: после запроса осталось {profile.retained / MB:.2f} МБ")
+    return problems
+
+def report(profile: MemoryProfile, limit_mb: float) -> str:
+    lines = [
+        f"{profile.path}: пик {profile.peak / MB:.2f} МБ (порог {limit_mb}), "
+        f"осталось {profile.retained / MB:.2f} МБ в {profile.retained_blocks} блоках"
+    ]
+    for location, size, count in profile.top:
+        lines.append(f"    {size / MB:8.2f} МБ {count:8d}  {location}")
+    if profile.leaks:
+        lines.append("  осталось после запроса:")
+        for location, size, count in profile.leaks:
+            lines.append(f"    {size / 1024:8.1f} КБ {count:8d}  {location}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workouts", type=int, default=DEFAULT_WORKOUTS)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fitlog-memory-")
+    os.environ["FITLOG_DATABASE_URL"] = f"sqlite:///{workdir}/fitlog.db"
+    os.environ["FITLOG_BUFFER_PATH"] = f"{workdir}/fitlog.db-buffer"
+    os.environ["FITLOG_SHARD_DIR"] = f"{workdir}/shards"
+    os.environ["FITLOG_RATE_LIMIT"] = "0"
+
+    from fastapi.testclient import TestClient
+
+    from backend.app import database, models
+    from backend.app.auth import create_access_token
+
+    # журнал SQL сам по себе выделяет память на каждый запрос;
+    # выключается до импорта server, который создает схему
+    database.engine.echo = False
+    database.read_engine.echo = False
+    from server import app
+
+    db = database.SessionLocal()
+    user = models.User(email="memory@fitlog.com", username="memory", hashed_password="x")
+    db.add(user)
+    db.commit()
+    seed(db, user.id, args.workouts)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+    db.close()
+
+    client = TestClient(app)
+    problems = []
+    for path, limit_mb in PROFILES:
+        profile = profile_request(client, path, headers, args.top)
+        print(report(profile, limit_mb))
+        problems.extend(check(profile, limit_mb))
+
+    if args.check and problems:
+        print("\n".join(problems), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Запись SQL-запросов через события engine и проверка их планов в SQLite."""
+from typing import List, NamedTuple
+
+from sqlalchemy import event
+
+class Query(NamedTuple):
+    statement: str
+    parameters: object
+    executemany: bool
+
+class Queries(list):
+    """Запросы одного блока with QueryLog."""
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+
+    @property
+    def statements(self) -> List[str]:
+        return [query.statement for query in self]
+
+    @property
+    def selects(self) -> List[Query]:
+        return [query for query in self if query.statement.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+    def plans(self) -> List[tuple]:
+        """(запрос, строки EXPLAIN QUERY PLAN) для каждого SELECT."""
+        result = []
+        with self.engine.connect() as conn:
+            cursor = conn.connection.cursor()
+            try:
+                for query in self.selects:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {query.statement}", query.parameters)
+                    result.append((query.statement, [row[3] for row in cursor.fetchall()]))
+            finally:
+                cursor.close()
+        return result
+
+    def scans(self) -> List[str]:
+        """Шаги планов, которые читают таблицу или индекс целиком."""
+        problems = []
+        for statement, details in self.plans():
+            for detail in details:
+                # FTS5 отвечает на MATCH своим индексом, хотя план пишет SCAN
+                if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW" and "VIRTUAL TABLE" not in detail:
+                    problems.append(f"{detail}\n    {statement}")
+        return problems
+
+class QueryLog:
+    """Запросы, выполненные через engine внутри блока with.
+
+        with query_log as queries:
+            client.get("/api/workouts/", headers=headers)
+        assert len(queries) <= 4
+        assert queries.scans() == []
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._queries = None
+
+    def __enter__(self) -> Queries:
+        self._queries = Queries(self.engine)
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self._queries
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self._queries.append(Query(statement, parameters, executemany))
@@ -58,6 +58,11 @@ def test_api_endpoints():
             ("GET /goals/", f"{base_url}/goals/", "GET"),
             ("GET /stats/dashboard", f"{base_url}/stats/dashboard", "GET"),
             ("GET /stats/workouts/monthly", f"{base_url}/stats/workouts/monthly", "GET"),
+            ("GET /stats/exercises/{name}/series", f"{base_url}/stats/exercises/Приседания/series", "GET"),
+            ("GET /search/", f"{base_url}/search/?q=тренировка", "GET"),
+            ("GET /foods/suggest", f"{base_url}/foods/suggest?q=греч", "GET"),
+            ("GET /measurements/stats/series", f"{base_url}/measurements/stats/series?max_points=100", "GET"),
+            ("GET /sync/", f"{base_url}/sync/", "GET"),
         ]
         
         for name, url, method in endpoints:
@@ -0,0 +1,58 @@
+import asyncio
+
+from backend.app.routers import batch as batch_router
+from backend.app.tests.test_workouts import create_workout
+
+def batch(client, headers, *requests):
+    response = client.post("/api/batch", headers=headers, json={"requests": list(requests)})
+    assert response.status_code == 200, response.text
+    return response.json()["responses"]
+
+def test_batch_runs_sub_requests(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+
+    workouts, detail, missing = batch(
+        client, auth_headers,
+        {"path": "/workouts/", "params": {"limit": 5}},
+        {"path": f"/workouts/{workout['id']}"},
+        {"path": "/workouts/999"}
+    )
+    assert (workouts["status"], [w["id"] for w in workouts["body"]]) == (200, [workout["id"]])
+    assert (detail["status"], detail["body"]["name"]) == (200, "Силовая")
+    assert missing["status"] == 404
+
+def test_batch_follows_trailing_slash_redirect(client, auth_headers):
+    create_workout(client, auth_headers)
+
+    (response,) = batch(client, auth_headers, {"path": "/workouts?limit=1"})
+    assert response["path"] == "/workouts?limit=1"
+    assert response["status"] == 200
+    assert len(response["body"]) == 1
+
+def test_batch_rejects_non_json_bodies(client, auth_headers):
+    (response,) = batch(client, auth_headers, {"path": "/measurements/stats/progress", "params": {"format": "packed"}})
+    assert response["status"] == 415
+    assert response["body"]["detail"]
+
+def test_batch_cannot_nest(client, auth_headers):
+    (response,) = batch(client, auth_headers, {"path": "/batch"})
+    assert response["status"] == 400
+
+def test_batch_rejects_streams(client, auth_headers, monkeypatch):
+    (response,) = batch(client, auth_headers, {"path": "/stream/dashboard"})
+    assert response["status"] == 400
+
+    # без проверки пути поток прерывается на заголовках: не JSON
+    monkeypatch.setattr(batch_router, "STREAM_PREFIXES", ())
+    stream, after = batch(client, auth_headers, {"path": "/stream/dashboard"}, {"path": "/workouts/"})
+    assert stream["status"] == 415
+    assert after["status"] == 200
+
+def test_slow_sub_request_times_out(client, auth_headers, monkeypatch):
+    async def hang(*args):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(batch_router, "SUB_REQUEST_TIMEOUT", 0.05)
+    monkeypatch.setattr(batch_router, "_call", hang)
+    slow, rest = batch(client, auth_headers, {"path": "/workouts/"}, {"path": "/goals/"})
+    assert (slow["status"], rest["status"]) == (504, 504)
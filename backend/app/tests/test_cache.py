@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.app import cache
+from backend.app.cache import ResultCache, cached
+from backend.app.routers import stats
+from backend.app.tests.test_workouts import create_workout
+
+REQUESTS = 5
+
+def test_concurrent_identical_requests_compute_once(client, auth_headers, monkeypatch):
+    create_workout(client, auth_headers)
+    waiting = threading.Semaphore(0)
+    calls = []
+
+    class CountedEvent(threading.Event):
+        def wait(self, timeout=None):
+            waiting.release()
+            return super().wait(timeout)
+
+    class Call(cache._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = CountedEvent()
+
+    compute = stats._compute_dashboard
+
+    def slow_compute(db, user_id, today):
+        calls.append(user_id)
+        # лидер отвечает, только когда остальные запросы уже ждут его результат
+        for _ in range(REQUESTS - 1):
+            assert waiting.acquire(timeout=5)
+        return compute(db, user_id, today)
+
+    monkeypatch.setattr(cache, "_Call", Call)
+    monkeypatch.setattr(stats, "_compute_dashboard", slow_compute)
+
+    with ThreadPoolExecutor(REQUESTS) as pool:
+        responses = list(pool.map(lambda _: client.get("/api/stats/dashboard", headers=auth_headers), range(REQUESTS)))
+
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    assert len({response.text for response in responses}) == 1
+    assert len(calls) == 1
+    # следующий запрос берет результат из кэша
+    assert client.get("/api/stats/dashboard", headers=auth_headers).status_code == 200
+    assert len(calls) == 1
+
+def test_result_computed_before_write_is_not_cached(monkeypatch):
+    result_cache = ResultCache()
+    monkeypatch.setattr(cache, "result_cache", result_cache)
+
+    def compute():
+        # запись данных пользователя во время вычисления
+        result_cache.invalidate_user(1)
+        return {"total": 1}
+
+    assert cached(1, "key", compute) == {"total": 1}
+    assert result_cache.get(1, "key") is None
+    assert cached(1, "key", lambda: {"total": 2}) == {"total": 2}
+    assert result_cache.get(1, "key") == {"total": 2}
+
+def test_generations_are_bounded_and_never_reused():
+    result_cache = ResultCache(maxsize=2)
+    # результат пользователя 1 посчитан до записи его данных
+    stale = result_cache.generation(1)
+    result_cache.invalidate_user(1)
+    for user_id in range(2, 5):
+        result_cache.invalidate_user(user_id)
+
+    assert list(result_cache._generations) == [3, 4]
+    # поколение вытесненного пользователя не возвращается к старому номеру
+    result_cache.set(1, "key", {"total": 1}, generation=stale)
+    assert result_cache.get(1, "key") is None
+    result_cache.set(1, "key", {"total": 2}, generation=result_cache.generation(1))
+    assert result_cache.get(1, "key") == {"total": 2}
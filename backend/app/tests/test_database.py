@@ -7,6 +7,11 @@ sys.path.insert(0, str(project_root))
 
 def test_sqlite_file():
     print("Проверка файла базы данных")
+    from backend.app.database import IS_SQLITE
+    if not IS_SQLITE:
+        print("Используется не SQLite, проверка файла пропущена")
+        return True
+    
     db_path = project_root / "fitlog.db"
     print(f"Путь: {db_path}")
     
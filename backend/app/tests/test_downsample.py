@@ -0,0 +1,56 @@
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from backend.app import models
+from backend.app.downsample import lttb, min_max
+
+POINTS = [(x, math.sin(x / 10)) for x in range(1000)]
+
+def test_lttb_keeps_size_and_ends():
+    sampled = lttb(POINTS, 50)
+    assert len(sampled) == 50
+    assert sampled[0] == POINTS[0] and sampled[-1] == POINTS[-1]
+    assert [p[0] for p in sampled] == sorted(p[0] for p in sampled)
+
+def test_lttb_keeps_spike():
+    points = [(x, 0.0) for x in range(1000)]
+    points[517] = (517, 100.0)
+    assert (517, 100.0) in lttb(points, 20)
+
+def test_min_max_keeps_extremes_of_each_bucket():
+    sampled = min_max(POINTS, 100)
+    assert len(sampled) <= 100
+    assert max(POINTS, key=lambda p: p[1]) in sampled
+    assert min(POINTS, key=lambda p: p[1]) in sampled
+
+@pytest.mark.parametrize("method", [lttb, min_max])
+def test_short_series_is_returned_as_is(method):
+    assert method(POINTS[:10], 50) == POINTS[:10]
+
+def test_series_endpoint_downsamples(client, auth_headers, db_session, user):
+    start = date(2025, 1, 1)
+    for i in range(400):
+        db_session.add(models.Measurement(user_id=user.id, date=start + timedelta(days=i),
+                                          weight=80 + math.sin(i / 7), body_fat=None if i % 2 else 15))
+    db_session.commit()
+
+    for method in ("lttb", "minmax"):
+        response = client.get("/api/measurements/stats/series", headers=auth_headers,
+                              params={"max_points": 60, "method": method})
+        assert response.status_code == 200, response.text
+        result = response.json()
+        assert result["total_points"] == {"weight": 400, "body_fat": 200}
+        assert 0 < len(result["series"]["weight"]) <= 60
+        assert 0 < len(result["series"]["body_fat"]) <= 60
+        dates = [point["date"] for point in result["series"]["weight"]]
+        assert dates == sorted(dates)
+
+    response = client.get("/api/measurements/stats/series", headers=auth_headers, params={"max_points": 60})
+    weights = response.json()["series"]["weight"]
+    assert weights[0]["date"] == "2025-01-01" and weights[-1]["date"] == "2026-02-04"
+
+def test_series_endpoint_rejects_unknown_field(client, auth_headers):
+    response = client.get("/api/measurements/stats/series?fields=weight,height", headers=auth_headers)
+    assert response.status_code == 400
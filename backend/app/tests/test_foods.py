@@ -0,0 +1,105 @@
+import threading
+
+from backend.app import models
+from backend.app.foods import FoodIndex
+
+def add_food(db, name, user_id=None, calories=100, usage_count=0):
+    food = models.Food(user_id=user_id, name=name, calories=calories, protein=10, carbs=20, fat=5,
+                       usage_count=usage_count)
+    db.add(food)
+    db.commit()
+    return food
+
+def suggest(client, headers, q):
+    response = client.get("/api/foods/suggest", params={"q": q}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [food["name"] for food in response.json()]
+
+def test_suggest_matches_word_prefixes(client, auth_headers, db_session, user):
+    add_food(db_session, "Гречка отварная")
+    add_food(db_session, "Греческий йогурт")
+    add_food(db_session, "Рис отварной")
+    add_food(db_session, "Гречневая каша", user_id=user.id)
+
+    # свой справочник идет раньше общего
+    assert suggest(client, auth_headers, "греч") == ["Гречневая каша", "Греческий йогурт", "Гречка отварная"]
+    assert suggest(client, auth_headers, "отвар греч") == ["Гречка отварная"]
+    assert suggest(client, auth_headers, "йог") == ["Греческий йогурт"]
+
+def test_suggest_sees_new_food_and_usage(client, auth_headers, db_session):
+    rice = add_food(db_session, "Рис бурый")
+    add_food(db_session, "Рис белый")
+    assert suggest(client, auth_headers, "рис") == ["Рис белый", "Рис бурый"]
+
+    response = client.post("/api/meals/", headers=auth_headers, json={"food_id": rice.id, "meal_type": "lunch"})
+    assert response.status_code == 201, response.text
+    assert suggest(client, auth_headers, "рис") == ["Рис бурый", "Рис белый"]
+
+    client.post("/api/foods/", headers=auth_headers, json={"name": "Рисовая лапша"})
+    assert suggest(client, auth_headers, "рис")[0] == "Рисовая лапша"
+
+def test_meal_from_food_fills_missing_macros(client, auth_headers, db_session):
+    food = add_food(db_session, "Овсянка", calories=350)
+
+    response = client.post("/api/meals/", headers=auth_headers, json={
+        "food_id": food.id, "meal_type": "breakfast", "calories": 400
+    })
+    assert response.status_code == 201, response.text
+    meal = response.json()
+    assert meal["name"] == "Овсянка"
+    assert (meal["calories"], meal["protein"], meal["carbs"], meal["fat"]) == (400, 10, 20, 5)
+
+    missing = client.post("/api/meals/", headers=auth_headers, json={"food_id": 999, "meal_type": "lunch"})
+    assert missing.status_code == 404
+
+def test_foods_of_other_user_are_hidden(client, auth_headers, db_session, make_user):
+    other = make_user("other")
+    food = add_food(db_session, "Секретный соус", user_id=other.id)
+
+    assert suggest(client, auth_headers, "секрет") == []
+    response = client.post("/api/meals/", headers=auth_headers, json={"food_id": food.id, "meal_type": "lunch"})
+    assert response.status_code == 404
+
+def test_concurrent_misses_load_scope_once(db_session):
+    add_food(db_session, "Творог")
+    index = FoodIndex()
+    loads = []
+    started = threading.Event()
+    load_scope = index._load_scope
+
+    def slow_load(db, user_id):
+        loads.append(user_id)
+        started.wait(1)
+        return load_scope(db, user_id)
+
+    index._load_scope = slow_load
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index._scope(db_session, None))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [None]
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+def test_scopes_are_bounded(db_session, make_user):
+    index = FoodIndex(maxsize=2)
+    users = [make_user(f"user{i}") for i in range(3)]
+    for user in users:
+        index.suggest(db_session, user.id, "творог")
+
+    # общий справочник нужен всем и остается, из личных - только последний
+    assert list(index._scopes) == [(None, users[2].id), (None, None)]
+
+def test_generations_are_bounded(make_user):
+    index = FoodIndex(maxsize=2)
+    users = [make_user(f"user{i}") for i in range(3)]
+    loaded = index._generation(users[0].id)
+    for user in users:
+        index.invalidate(user.id)
+
+    assert list(index._generations) == [users[1].id, users[2].id]
+    # снимок, загруженный до сброса, не совпадет и после вытеснения поколения
+    assert index._generation(users[0].id) not in (loaded, index._generation(users[1].id))
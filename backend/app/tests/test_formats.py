@@ -0,0 +1,71 @@
+import json
+import math
+import struct
+from array import array
+from datetime import date, timedelta
+
+from backend.app import models
+from backend.app.formats import EPOCH, pack_tables, to_columnar
+
+DAYS = [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 5)]
+
+def unpack_tables(data: bytes):
+    """Обратное преобразование pack_tables, как его выполняет клиент."""
+    (header_length,) = struct.unpack_from("<I", data)
+    header = json.loads(data[4:4 + header_length])
+    body = data[4 + header_length:]
+    tables = {}
+    for table in header["tables"]:
+        columns = dict(table["strings"])
+        for column in table["columns"]:
+            values = array("f")
+            values.frombytes(body[column["offset"]:column["offset"] + 4 * table["rows"]])
+            if column["type"] == "date":
+                columns[column["name"]] = [EPOCH + timedelta(days=int(v)) for v in values]
+            else:
+                columns[column["name"]] = [None if math.isnan(v) else v for v in values]
+        tables[table["name"]] = columns
+    return header["meta"], tables
+
+def test_columnar_delta_dates_round_trip():
+    result = to_columnar({"date": DAYS, "weight": [80.5, None, 79]}, delta_dates=True)
+    assert result == {"date_start": "2026-03-01", "date": [0, 1, 3], "weight": [80.5, None, 79]}
+
+    # разности считаются от предыдущей даты
+    day, days = date.fromisoformat(result["date_start"]), []
+    for delta in result["date"]:
+        day += timedelta(days=delta)
+        days.append(day)
+    assert days == DAYS
+
+def test_packed_round_trip():
+    tables = {
+        "weights": {"date": DAYS, "weight": [80.5, None, 79.25]},
+        "top": {"name": ["Жим", "Тяга"], "count": [3, 2]}
+    }
+    meta, unpacked = unpack_tables(pack_tables(tables, meta={"period": 30}))
+    assert meta == {"period": 30}
+    assert unpacked == tables
+
+def test_progress_formats_carry_same_data(client, auth_headers, db_session, user):
+    today = date.today()
+    for i, weight in enumerate((81.5, 81, 80.25)):
+        db_session.add(models.Measurement(user_id=user.id, date=today - timedelta(days=10 - i * 3),
+                                          weight=weight, body_fat=20 - i))
+    db_session.commit()
+    path = "/api/measurements/stats/progress"
+
+    rows = client.get(path, headers=auth_headers).json()["weight_data"]
+    columnar = client.get(path, params={"format": "columnar"}, headers=auth_headers).json()
+    assert columnar["weight_data"]["date"] == [row["date"] for row in rows]
+    assert columnar["weight_data"]["weight"] == [row["weight"] for row in rows]
+
+    delta = client.get(path, params={"format": "columnar", "delta": True}, headers=auth_headers).json()
+    assert delta["weight_data"]["date"] == [0, 3, 3]
+
+    response = client.get(path, params={"format": "packed"}, headers=auth_headers)
+    assert response.headers["content-type"] == "application/octet-stream"
+    meta, tables = unpack_tables(response.content)
+    assert meta == {"period": 30}
+    assert [d.isoformat() for d in tables["weight_data"]["date"]] == [row["date"] for row in rows]
+    assert tables["weight_data"]["weight"] == [row["weight"] for row in rows]
@@ -0,0 +1,82 @@
+from datetime import date, datetime, timedelta
+
+from backend.app import idempotency, models, schemas
+from backend.app.idempotency import IdempotencyCompactor, request_hash
+from backend.app.routers import meals
+
+MEAL = {"name": "Рис", "meal_type": "lunch", "calories": 500}
+
+def post_meal(client, headers, key, body=MEAL):
+    return client.post("/api/meals/", headers={**headers, "Idempotency-Key": key}, json=body)
+
+def test_retry_replays_stored_response(client, auth_headers, db_session):
+    first = post_meal(client, auth_headers, "k1")
+    assert first.status_code == 201, first.text
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = post_meal(client, auth_headers, "k1")
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert db_session.query(models.Meal).count() == 1
+
+    # другой ключ - новая запись
+    assert post_meal(client, auth_headers, "k2").json()["id"] != first.json()["id"]
+
+def test_key_reused_for_other_body_is_rejected(client, auth_headers, make_user, headers_for):
+    post_meal(client, auth_headers, "k1")
+
+    response = post_meal(client, auth_headers, "k1", {**MEAL, "calories": 600})
+    assert response.status_code == 422
+    assert "Idempotency-Key" in response.json()["detail"]
+    # ключи у каждого пользователя свои
+    assert post_meal(client, headers_for(make_user("other")), "k1", {**MEAL, "calories": 600}).status_code == 201
+
+def test_default_date_is_not_hashed():
+    # повтор без даты после полуночи должен совпасть с первым запросом
+    without_date = request_hash("POST /meals", schemas.MealCreate(**MEAL))
+    assert without_date == request_hash("POST /meals", schemas.MealCreate(**MEAL))
+    assert without_date != request_hash("POST /meals", schemas.MealCreate(**MEAL, date=date.today()))
+
+def test_compactor_removes_only_expired_keys(client, auth_headers, db_session, user, monkeypatch):
+    monkeypatch.setattr(idempotency, "COMPACT_BATCH", 2)
+    now = datetime.utcnow()
+    db_session.add_all([
+        models.IdempotencyKey(user_id=user.id, key=f"old{number}", request_hash="x", status_code=201,
+                              response="{}", created_at=now - timedelta(days=2), expires_at=now - timedelta(days=1))
+        for number in range(5)
+    ])
+    db_session.commit()
+    post_meal(client, auth_headers, "fresh")
+
+    assert IdempotencyCompactor().compact() == 5
+    assert [key for (key,) in db_session.query(models.IdempotencyKey.key)] == ["fresh"]
+    assert IdempotencyCompactor().compact() == 0
+
+def test_expired_key_can_be_reused(client, auth_headers, db_session):
+    first = post_meal(client, auth_headers, "k1").json()
+    db_session.query(models.IdempotencyKey).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+
+    response = post_meal(client, auth_headers, "k1", {**MEAL, "calories": 600})
+    assert response.status_code == 201
+    assert response.json()["id"] != first["id"]
+    assert db_session.query(models.IdempotencyKey).count() == 1
+
+def test_lost_race_replays_winner(client, auth_headers, db_session, monkeypatch):
+    first = post_meal(client, auth_headers, "k1").json()
+    # параллельный запрос не увидел ключ и записывает прием пищи сам
+    monkeypatch.setattr(meals, "find_response", lambda *args: None)
+
+    retry = post_meal(client, auth_headers, "k1")
+    assert retry.status_code == 201
+    assert retry.json() == first
+    assert db_session.query(models.Meal).count() == 1
+
+def test_conflict_without_stored_response_is_409(client, auth_headers, db_session, monkeypatch):
+    post_meal(client, auth_headers, "k1")
+    monkeypatch.setattr(meals, "find_response", lambda *args: None)
+    monkeypatch.setattr(idempotency, "find_response", lambda *args: None)
+
+    assert post_meal(client, auth_headers, "k1").status_code == 409
+    assert db_session.query(models.Meal).count() == 1
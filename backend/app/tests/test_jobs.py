@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.app import models
+from backend.app.jobs import JOB_HANDLERS, JobRunner
+
+@pytest.fixture
+def handlers(monkeypatch):
+    def register(kind, handler):
+        monkeypatch.setitem(JOB_HANDLERS, kind, handler)
+    return register
+
+def flaky(failures):
+    calls = []
+
+    def handler(db, user_id, params, report):
+        calls.append(user_id)
+        if len(calls) <= failures:
+            raise RuntimeError("сбой")
+        return {"calls": len(calls)}
+
+    handler.calls = calls
+    return handler
+
+def job_state(db, job_id):
+    db.expire_all()
+    return db.get(models.Job, job_id)
+
+def run_until_done(runner, db, job_ids, timeout=5):
+    async def main():
+        await runner.start()
+        try:
+            for _ in range(int(timeout / 0.01)):
+                if all(job_state(db, job_id).status in ("succeeded", "failed") for job_id in job_ids):
+                    return
+                await asyncio.sleep(0.01)
+            raise AssertionError("задачи не завершились")
+        finally:
+            await runner.stop()
+
+    asyncio.run(main())
+
+def test_job_goes_from_queued_to_succeeded(db_session, user, handlers):
+    progress_seen = []
+
+    def handler(db, user_id, params, report):
+        assert job_state(db, job.id).status == "running"
+        report(0.5)
+        progress_seen.append(job_state(db, job.id).progress)
+        return {"user": user_id, **params}
+
+    handlers("test_ok", handler)
+    runner = JobRunner()
+    job = runner.submit(db_session, "test_ok", user_id=user.id, params={"x": 1})
+    assert (job.status, job.attempts) == ("queued", 0)
+
+    assert runner._execute(job.id) == 0
+    job = job_state(db_session, job.id)
+    assert progress_seen == [0.5]
+    assert (job.status, job.attempts, job.progress) == ("succeeded", 1, 1.0)
+    assert json.loads(job.result) == {"user": user.id, "x": 1}
+    assert job.started_at and job.finished_at
+
+    # повторный запуск завершенной задачи ничего не делает
+    assert runner._execute(job.id) == 0
+
+def test_failed_attempts_are_retried_until_max_attempts(db_session, handlers):
+    handler = flaky(failures=5)
+    handlers("test_flaky", handler)
+    runner = JobRunner()
+    job = runner.submit(db_session, "test_flaky", max_attempts=2)
+
+    assert runner._execute(job.id) == 1
+    job = job_state(db_session, job.id)
+    assert job.status == "queued"
+    assert "RuntimeError: сбой" in job.error
+
+    assert runner._execute(job.id) == 0
+    job = job_state(db_session, job.id)
+    assert (job.status, job.attempts) == ("failed", 2)
+    assert job.finished_at is not None
+    assert len(handler.calls) == 2
+
+def test_runner_retries_in_background(db_session, handlers):
+    handler = flaky(failures=1)
+    handlers("test_flaky", handler)
+    runner = JobRunner(retry_delay=0.01)
+    job = runner.submit(db_session, "test_flaky")
+
+    run_until_done(runner, db_session, [job.id])
+    job = job_state(db_session, job.id)
+    assert (job.status, job.attempts, json.loads(job.result)) == ("succeeded", 2, {"calls": 2})
+
+def test_running_jobs_are_requeued_after_restart(db_session, handlers):
+    handlers("test_ok", lambda db, user_id, params, report: {"done": True})
+    # задача, которую выполнял процесс до перезапуска
+    interrupted = models.Job(kind="test_ok", status="running", progress=0.3, attempts=1, max_attempts=3, params="{}")
+    finished = models.Job(kind="test_ok", status="failed", progress=0, attempts=3, max_attempts=3, params="{}")
+    db_session.add_all([interrupted, finished])
+    db_session.commit()
+
+    run_until_done(JobRunner(), db_session, [interrupted.id])
+    assert (job_state(db_session, interrupted.id).status, interrupted.attempts) == ("succeeded", 2)
+    assert job_state(db_session, finished.id).status == "failed"
+
+def test_unknown_kind_is_rejected(client, auth_headers, db_session):
+    with pytest.raises(ValueError):
+        JobRunner().submit(db_session, "no_such_job")
+    assert client.post("/api/jobs/", headers=auth_headers, json={"kind": "no_such_job"}).status_code == 400
+
+def test_user_sees_own_jobs(client, auth_headers, make_user, headers_for):
+    response = client.post("/api/jobs/", headers=auth_headers, json={"kind": "seed_foods"})
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert job["status"] == "queued"
+
+    assert [j["id"] for j in client.get("/api/jobs/", headers=auth_headers).json()] == [job["id"]]
+    assert client.get(f"/api/jobs/{job['id']}", headers=headers_for(make_user("other"))).status_code == 404
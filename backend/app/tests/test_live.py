@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from backend.app import models
+from backend.app.live import LiveStatePurger
+from backend.app.routers import live
+from backend.app.tests.test_workouts import create_workout
+
+@pytest.fixture(autouse=True)
+def manual_flush(monkeypatch):
+    # сохранение только по {"type": "flush"}, чтобы порядок сообщений не зависел от таймера
+    monkeypatch.setattr(live, "FLUSH_INTERVAL_MS", 60_000)
+
+@pytest.fixture
+def workout(client, auth_headers):
+    return create_workout(client, auth_headers)
+
+def connect(client, headers, workout):
+    return client.websocket_connect(f"/api/ws/workouts/{workout['id']}/live", headers=headers)
+
+def flush(ws):
+    ws.send_json({"type": "flush"})
+    message = ws.receive_json()
+    assert message["type"] == "saved", message
+    return message
+
+def set_event(seq, **target):
+    return {"type": "set", "seq": seq, "set_number": seq, "reps": 8, "weight": 60, **target}
+
+def sets_of(client, headers, workout):
+    detail = client.get(f"/api/workouts/{workout['id']}", headers=headers).json()
+    return {exercise["name"]: len(exercise["sets"]) for exercise in detail["exercises"]}
+
+def test_events_are_saved_and_resumed_after_reconnect(client, auth_headers, workout):
+    bench = workout["exercises"][0]
+    before = sets_of(client, auth_headers, workout)
+
+    with connect(client, auth_headers, workout) as ws:
+        assert ws.receive_json() == {"type": "ready", "workout_id": workout["id"], "received": 0, "saved": 0, "exercises": {}}
+        ws.send_json({"type": "exercise", "seq": 1, "ref": "b", "name": "Подтягивания", "order": 2})
+        ws.send_json(set_event(2, exercise_ref="b"))
+        ws.send_json(set_event(3, exercise_id=bench["id"]))
+        saved = flush(ws)
+    assert saved["seq"] == 3 and set(saved["exercises"]) == {"b"}
+
+    # клиент не получил подтверждение и досылает последние события еще раз
+    with connect(client, auth_headers, workout) as ws:
+        ready = ws.receive_json()
+        assert (ready["received"], ready["saved"], ready["exercises"]) == (3, 3, saved["exercises"])
+        ws.send_json(set_event(2, exercise_ref="b"))
+        ws.send_json(set_event(3, exercise_id=bench["id"]))
+        ws.send_json(set_event(4, exercise_ref="b"))
+        assert flush(ws)["seq"] == 4
+
+    assert sets_of(client, auth_headers, workout) == {
+        **before, "Подтягивания": 2, bench["name"]: before[bench["name"]] + 1
+    }
+
+def test_rejected_event_can_be_resent_with_same_seq(client, auth_headers, workout):
+    bench = workout["exercises"][0]
+
+    with connect(client, auth_headers, workout) as ws:
+        ws.receive_json()
+        ws.send_json(set_event(1, exercise_id=999999))
+        assert ws.receive_json() == {"type": "error", "seq": 1, "detail": "Упражнение не найдено"}
+        ws.send_json(set_event(1, exercise_id=bench["id"]))
+        assert flush(ws)["seq"] == 1
+
+    with connect(client, auth_headers, workout) as ws:
+        assert ws.receive_json()["received"] == 1
+
+def test_exercise_added_after_connect_is_found(client, auth_headers, workout, db_session):
+    with connect(client, auth_headers, workout) as ws:
+        ws.receive_json()
+        exercise = models.Exercise(workout_id=workout["id"], name="Присед", order=5)
+        db_session.add(exercise)
+        db_session.commit()
+
+        ws.send_json(set_event(1, exercise_id=exercise.id))
+        assert flush(ws)["seq"] == 1
+    assert sets_of(client, auth_headers, workout)["Присед"] == 1
+
+def test_other_users_workout_is_refused(client, workout, make_user, headers_for):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with connect(client, headers_for(make_user("other")), workout) as ws:
+            ws.receive_json()
+    assert refused.value.code == 1008
+
+def test_old_and_orphaned_states_are_purged(client, auth_headers, db_session):
+    kept, stale = create_workout(client, auth_headers), create_workout(client, auth_headers)
+    old = datetime.utcnow() - timedelta(days=30)
+    db_session.add_all([
+        models.LiveSessionState(workout_id=kept["id"], last_seq=3),
+        models.LiveSessionState(workout_id=stale["id"], last_seq=3, updated_at=old),
+        models.LiveSessionState(workout_id=999999, last_seq=3),
+    ])
+    db_session.commit()
+
+    assert LiveStatePurger().purge() == 2
+    assert [state.workout_id for state in db_session.query(models.LiveSessionState)] == [kept["id"]]
@@ -0,0 +1,21 @@
+from backend.app.tests.profile_memory import MB, PROFILES, RETAINED_LIMIT_MB, profile_request, seed
+
+LIMITS = dict(PROFILES)
+
+def test_workout_page_stays_under_threshold(client, auth_headers, db_session, user):
+    # страница из 100 тренировок не зависит от размера базы, хватает 150
+    seed(db_session, user.id, 150)
+    path = "/api/workouts/?limit=100"
+
+    profile = profile_request(client, path, auth_headers)
+    assert profile.status == 200
+    assert profile.peak < LIMITS[path] * MB, profile.top
+    assert profile.top, "сэмплер не снял ни одного снимка"
+
+def test_requests_do_not_retain_memory(client, auth_headers, db_session, user):
+    seed(db_session, user.id, 150)
+
+    for path in ("/api/workouts/stats/summary?period=all", "/api/meals/?limit=1000", "/api/stats/dashboard"):
+        profile = profile_request(client, path, auth_headers)
+        assert profile.status == 200
+        assert profile.retained < RETAINED_LIMIT_MB * MB, profile.leaks
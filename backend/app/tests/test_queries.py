@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+import pytest
+
+from backend.app import models
+
+DAY = date(2026, 3, 1)
+
+# запросов на эндпоинт, включая чтение пользователя в get_current_user
+MAX_QUERIES = {
+    "/api/workouts/": 4,
+    "/api/workouts/1": 4,
+    "/api/workouts/stats/summary?period=all": 3,
+    "/api/workouts/stats/summary?period=all&by_month=true": 4,
+    "/api/meals/": 2,
+    "/api/meals/daily/summary?target_date=2026-03-01": 2,
+    "/api/measurements/": 2,
+    "/api/measurements/stats/progress": 3,
+    "/api/goals/": 2,
+    "/api/templates/": 4,
+    "/api/stats/dashboard": 6,
+    "/api/stats/workouts/monthly?year=2026&month=3": 3,
+    "/api/stats/nutrition/daily": 2,
+    "/api/stats/nutrition/range?from=2025-12-02&to=2026-03-01": 2,
+    "/api/stats/exercises/Жим лежа/series": 2,
+    "/api/sync/": 8,
+    "/api/search/?q=жим": 2,
+}
+
+def seed(db, user, count, start=0):
+    for i in range(start, start + count):
+        day = DAY - timedelta(days=i)
+        workout = models.Workout(user_id=user.id, name="Силовая", date=day, duration=60)
+        for order, name in enumerate(("Жим лежа", "Тяга")):
+            exercise = models.Exercise(name=name, order=order)
+            exercise.sets = [models.ExerciseSet(set_number=n, reps=8, weight=80) for n in (1, 2, 3)]
+            workout.exercises.append(exercise)
+        db.add(workout)
+        db.add(models.Meal(user_id=user.id, name="Рис", meal_type="lunch", date=day, calories=500))
+        db.add(models.Measurement(user_id=user.id, date=day, weight=80))
+    db.add(models.Goal(user_id=user.id, title="Жим 100", target_value=100, current_value=80))
+    db.commit()
+
+@pytest.fixture
+def seeded(db_session, user):
+    seed(db_session, user, 20)
+    return user
+
+def test_workout_list_query_count_does_not_grow(client, auth_headers, db_session, user, query_log):
+    seed(db_session, user, 1)
+    with query_log as one:
+        assert len(client.get("/api/workouts/", headers=auth_headers).json()) == 1
+
+    seed(db_session, user, 99, start=1)
+    with query_log as hundred:
+        assert len(client.get("/api/workouts/", headers=auth_headers).json()) == 100
+
+    assert len(one) == len(hundred), "\n".join(hundred.statements)
+
+@pytest.mark.parametrize("path", MAX_QUERIES)
+def test_query_count(client, seeded, auth_headers, query_log, path):
+    with query_log as queries:
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert len(queries) <= MAX_QUERIES[path], "\n".join(queries.statements)
+
+@pytest.mark.sqlite_only
+@pytest.mark.parametrize("path", MAX_QUERIES)
+def test_hot_queries_use_indexes(client, seeded, auth_headers, query_log, path):
+    with query_log as queries:
+        assert client.get(path, headers=auth_headers).status_code == 200
+    assert queries.scans() == []
+
+@pytest.mark.sqlite_only
+def test_meals_of_day_use_date_index(client, seeded, auth_headers, query_log):
+    with query_log as queries:
+        client.get("/api/meals/daily/summary?target_date=2026-03-01", headers=auth_headers)
+    details = [detail for _, plan in queries.plans() for detail in plan if " meals " in detail]
+    assert details == ["SEARCH meals USING INDEX ix_meals_user_id_date (user_id=? AND date=?)"]
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import ratelimit
+from backend.app.ratelimit import RateLimitMiddleware, TokenBuckets
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(ratelimit, "ENABLED", True)
+    return monkeypatch
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    # часы подменяются только для корзин, asyncio и TestClient идут по настоящим
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def scope(path, method="GET", client="10.0.0.1"):
+    return {"type": "http", "method": method, "path": path, "headers": [], "client": (client, 1234)}
+
+async def call(middleware, path, **kwargs):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope(path, **kwargs), receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+def test_bucket_refills_over_time(clock):
+    buckets = TokenBuckets()
+    assert [buckets.take("key", rate=2, burst=3) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("key", rate=2, burst=3) == 0.5
+
+    clock[0] += 0.5
+    assert buckets.take("key", rate=2, burst=3) == 0
+    # за простой корзина наполняется не больше burst
+    clock[0] += 60
+    assert [buckets.take("key", rate=2, burst=3) for _ in range(4)] == [0, 0, 0, 0.5]
+
+def test_over_limit_gets_429_with_retry_after(client, enabled, clock, user, make_user, headers_for):
+    enabled.setitem(ratelimit.LIMITS, "default", {"user": (0.25, 2)})
+    headers = headers_for(user)
+
+    assert [client.get("/api/workouts/", headers=headers).status_code for _ in range(2)] == [200, 200]
+    response = client.get("/api/workouts/", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "4"
+    assert response.json()["detail"]
+
+    # корзины у каждого пользователя свои
+    assert client.get("/api/workouts/", headers=headers_for(make_user("other"))).status_code == 200
+    clock[0] += 4
+    assert client.get("/api/workouts/", headers=headers).status_code == 200
+
+def test_full_queue_gets_503(enabled):
+    enabled.setattr(ratelimit, "MAX_CONCURRENT", 1)
+    enabled.setattr(ratelimit, "MAX_QUEUE", 1)
+    enabled.setattr(ratelimit, "MAX_QUEUE_WAIT", 0.5)
+    enabled.setattr(ratelimit, "LIMITS", {name: {} for name in ratelimit.LIMITS})
+
+    async def main():
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            if scope["path"] == "/api/slow":
+                await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = RateLimitMiddleware(app)
+        slow = asyncio.create_task(call(middleware, "/api/slow"))
+        await asyncio.sleep(0)
+
+        # единственное место занято: второй ждет в очереди и не дожидается
+        status, headers = await call(middleware, "/api/workouts/")
+        assert (status, headers[b"retry-after"]) == (503, b"1")
+
+        # очередь заполнена: третий получает отказ сразу
+        queued = asyncio.create_task(call(middleware, "/api/workouts/"))
+        await asyncio.sleep(0)
+        assert (await call(middleware, "/api/workouts/"))[0] == 503
+
+        # потоки SSE не занимают места
+        assert (await call(middleware, "/api/stream/events"))[0] == 200
+
+        release.set()
+        assert (await slow)[0] == 200
+        assert (await queued)[0] == 200
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+
+from backend.app.search import PG_ROWS, TSQUERY
+from backend.app.tests.test_workouts import create_workout
+
+def search(client, headers, q, **params):
+    response = client.get("/api/search/", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+def test_search_finds_workouts_exercises_and_meals(client, auth_headers):
+    workout = create_workout(client, auth_headers, notes="Жим на наклонной скамье")
+    client.post("/api/meals/", headers=auth_headers, json={
+        "name": "Жимолость с творогом", "meal_type": "snack", "date": "2026-03-02", "calories": 200
+    })
+
+    hits = search(client, auth_headers, "жим")
+    assert {hit["type"] for hit in hits} == {"workout", "exercise", "meal"}
+    exercise = next(hit for hit in hits if hit["type"] == "exercise")
+    assert exercise["id"] == workout["exercises"][0]["id"]
+    assert exercise["workout_id"] == workout["id"]
+    assert "<mark>Жим</mark>" in exercise["title"]
+
+    assert [hit["type"] for hit in search(client, auth_headers, "жим", kind="meal")] == ["meal"]
+
+def test_search_is_limited_to_owner(client, auth_headers, make_user, headers_for):
+    create_workout(client, auth_headers)
+
+    assert search(client, headers_for(make_user("other")), "жим") == []
+
+def test_search_follows_updates(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    bench = workout["exercises"][0]
+
+    response = client.patch(f"/api/workouts/{workout['id']}", headers=auth_headers, json={
+        "name": "Кардио", "exercises": [{"id": bench["id"], "name": "Велотренажер"}]
+    })
+    assert response.status_code == 200, response.text
+
+    assert search(client, auth_headers, "силовая") == []
+    assert [hit["type"] for hit in search(client, auth_headers, "кардио")] == ["workout"]
+    assert [hit["id"] for hit in search(client, auth_headers, "жим")] == []
+    assert [hit["id"] for hit in search(client, auth_headers, "велотренажер")] == [bench["id"]]
+
+def test_search_forgets_deleted_rows(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+
+    assert client.delete(f"/api/workouts/{workout['id']}", headers=auth_headers).status_code == 204
+    assert search(client, auth_headers, "силовая") == []
+    assert search(client, auth_headers, "тяга") == []
+
+@pytest.mark.postgres_only
+def test_postgres_search_uses_gin_index(db_session, user):
+    # на пустой таблице планировщик выбрал бы полный просмотр
+    db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db_session.execute(text(f"EXPLAIN {PG_ROWS['meal']}"), {"user_id": user.id, "query": "жим:*"}).scalars().all()
+    assert any("ix_meals_search" in line for line in plan), "\n".join(plan)
@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+
+# шардирование включается при импорте database.py, поэтому проверяется в отдельном процессе
+SCRIPT = textwrap.dedent("""
+    import json
+    from fastapi.testclient import TestClient
+    from backend.app import database, models
+    from backend.app.auth import create_access_token
+    from backend.app.rebalance import move_user
+    from server import app
+
+    database.engine.echo = False
+    database.init_db()
+    client = TestClient(app)
+    directory = database.SessionLocal()
+
+    def add_user(name, sharded):
+        user = models.User(email=f"{name}@fitlog.com", username=name, hashed_password="x")
+        directory.add(user)
+        directory.flush()
+        if sharded:
+            database.assign_shard(user)
+        directory.commit()
+        return user, {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+
+    def post(path, headers, body):
+        response = client.post(path, headers=headers, json=body)
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+
+    def fill(headers):
+        workout = post("/api/workouts/", headers, {"name": "Силовая", "date": "2026-03-01", "exercises": [
+            {"name": "Жим лежа", "order": 0, "sets": [{"set_number": 1, "reps": 5, "weight": 100}]}
+        ]})
+        meals = [post("/api/meals/", headers, {"name": name, "meal_type": "lunch", "date": "2026-03-01", "calories": 300})
+                 for name in ("Рис", "Гречка")]
+        assert client.delete(f"/api/meals/{meals[0]['id']}", headers=headers).status_code == 204
+        return workout, meals
+
+    # пользователь до включения шардирования живет в основной базе
+    legacy, legacy_headers = add_user("legacy", sharded=False)
+    sharded, sharded_headers = add_user("sharded", sharded=True)
+    fill(legacy_headers)
+    post("/api/meals/", {**legacy_headers, "Idempotency-Key": "k1"}, {"name": "Творог", "meal_type": "snack", "calories": 200})
+    workout, meals = fill(sharded_headers)
+    read = client.get(f"/api/workouts/{workout['id']}", headers=sharded_headers).json()
+
+    token = client.get("/api/sync/", headers=legacy_headers).json()["token"]
+    old = client.get("/api/workouts/", headers=legacy_headers).json()[0]
+    moved = move_user(directory, legacy, sharded.shard)
+    delta = client.get("/api/sync/", params={"since": token}, headers=legacy_headers).json()
+
+    print(json.dumps({
+        "shard": sharded.shard,
+        "read": [read["name"], [e["name"] for e in read["exercises"]]],
+        "deleted_meal": meals[0]["id"],
+        "old_workout": old["id"],
+        "moved": moved,
+        "delta_workouts": [w["id"] for w in delta["workouts"]],
+        "delta_deleted": delta["deleted"],
+        "after_move": [w["id"] for w in client.get("/api/workouts/", headers=legacy_headers).json()],
+    }))
+""")
+
+def rows(path, query):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(query).fetchall()
+
+def test_users_are_served_from_their_shards_and_moved_with_tombstones(tmp_path):
+    env = dict(os.environ, FITLOG_SHARDS="user", FITLOG_DATABASE_URL=f"sqlite:///{tmp_path / 'fitlog.db'}",
+               FITLOG_SHARD_DIR=str(tmp_path / "shards"), FITLOG_RATE_LIMIT="0", PYTHONPATH=str(project_root))
+    result = subprocess.run([sys.executable, "-c", SCRIPT], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    shard = tmp_path / "shards" / f"{report['shard']}.db"
+    assert report["shard"] == "user_2"
+    assert report["read"] == ["Силовая", ["Жим лежа"]]
+
+    # после переезда в основной базе не остается данных пользователей
+    main = tmp_path / "fitlog.db"
+    assert rows(main, "SELECT count(*) FROM workouts") == [(0,)]
+    assert rows(main, "SELECT count(*) FROM tombstones") == [(0,)]
+    assert rows(main, "SELECT count(*) FROM idempotency_keys") == [(0,)]
+    assert rows(shard, "SELECT user_id, key FROM idempotency_keys") == [(1, "k1")]
+    assert rows(main, "SELECT id, shard FROM users ORDER BY id") == [(1, "user_2"), (2, "user_2")]
+
+    # удаление в шарде пишет надгробие туда же; при переезде id тренировки заняты, она получает новый
+    assert report["moved"]["workouts"] == 1 and report["moved"]["exercise_sets"] == 1
+    assert rows(shard, "SELECT user_id, entity, entity_id FROM tombstones WHERE user_id = 2") == [
+        (2, "meals", report["deleted_meal"])
+    ]
+    assert report["after_move"] == report["delta_workouts"]
+    assert report["after_move"] != [report["old_workout"]]
+    assert report["delta_deleted"]["workouts"] == [report["old_workout"]]
+    # прием пищи 1 удален до переезда (надгробие перенесено), 2 и 3 получили новые id
+    assert sorted(report["delta_deleted"]["meals"]) == [1, 2, 3]
+    assert sorted(rows(shard, "SELECT entity, entity_id FROM tombstones WHERE user_id = 1")) == [
+        ("meals", 1), ("meals", 2), ("meals", 3), ("workouts", report["old_workout"])
+    ]
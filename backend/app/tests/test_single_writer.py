@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+
+# режим выбирается при импорте database.py, поэтому проверяется в отдельном процессе
+SCRIPT = textwrap.dedent("""
+    import threading, time
+    from backend.app import database, models
+
+    database.engine.echo = database.read_engine.echo = False
+    database.init_db()
+
+    def add_user(db, name):
+        db.add(models.User(email=f"{name}@fitlog.com", username=name, hashed_password="x"))
+        db.flush()
+
+    request_db = database.SessionLocal()
+    add_user(request_db, "first")
+
+    nested = database.SessionLocal()
+    started = time.monotonic()
+    try:
+        add_user(nested, "nested")
+    except RuntimeError:
+        print("nested", round(time.monotonic() - started))
+    nested.close()
+
+    # другой поток ждет, пока писатель освободится
+    background = threading.Thread(target=lambda: (lambda db: (add_user(db, "background"), db.commit()))(database.SessionLocal()))
+    background.start()
+    time.sleep(0.2)
+    request_db.commit()
+    background.join()
+    print("users", database.SessionLocal().query(models.User).count())
+""")
+
+def test_nested_write_session_fails_fast(tmp_path):
+    env = dict(os.environ, FITLOG_SINGLE_WRITER="1", FITLOG_DATABASE_URL=f"sqlite:///{tmp_path / 'fitlog.db'}",
+               PYTHONPATH=str(project_root))
+    result = subprocess.run([sys.executable, "-c", SCRIPT], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split("\n")[:2] == ["nested 0", "users 2"]
@@ -0,0 +1,71 @@
+import json
+from datetime import date, timedelta
+
+from backend.app import models, schemas
+
+def add_meal(db, user, day, calories, protein=10):
+    db.add(models.Meal(user_id=user.id, name="Обед", meal_type="lunch", date=day,
+                       calories=calories, protein=protein, carbs=0, fat=0))
+
+def test_nutrition_range_groups_by_day(client, auth_headers, db_session, user):
+    start = date(2026, 3, 1)
+    add_meal(db_session, user, start, 500)
+    add_meal(db_session, user, start, 700)
+    add_meal(db_session, user, start + timedelta(days=2), 1800)
+    add_meal(db_session, user, start + timedelta(days=10), 9999)
+    db_session.commit()
+    
+    response = client.get("/api/stats/nutrition/range?from=2026-03-01&to=2026-03-03", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert [(d["date"], d["meal_count"], d["calories"]) for d in stats["calories_by_day"]] == [
+        ("2026-03-01", 2, 1200), ("2026-03-02", 0, 0), ("2026-03-03", 1, 1800)
+    ]
+    assert stats["total_calories"] == 3000
+    assert stats["days_logged"] == 2
+    # среднее по дням с записями, а не по всем дням периода
+    assert stats["avg_calories_per_day"] == 1500
+    assert stats["avg_protein"] == 15
+
+def test_nutrition_range_rolling_averages_reach_before_period(client, auth_headers, db_session, user):
+    end = date(2026, 3, 31)
+    for offset in range(40):
+        add_meal(db_session, user, end - timedelta(days=offset), 1000 + offset * 10)
+    db_session.commit()
+    
+    stats = client.get("/api/stats/nutrition/range?from=2026-03-31&to=2026-03-31", headers=auth_headers).json()
+    day = stats["calories_by_day"][0]
+    assert day["calories_avg_7"] == sum(1000 + i * 10 for i in range(7)) / 7
+    assert day["calories_avg_28"] == sum(1000 + i * 10 for i in range(28)) / 28
+    assert day["protein_avg_28"] == 10
+
+def test_nutrition_range_without_meals(client, auth_headers):
+    stats = client.get("/api/stats/nutrition/range?from=2026-03-01&to=2026-03-07", headers=auth_headers).json()
+    assert stats["days_logged"] == 0
+    assert stats["avg_calories_per_day"] == 0
+    assert all(d["calories_avg_7"] is None for d in stats["calories_by_day"])
+
+def test_nutrition_range_validates_period(client, auth_headers):
+    assert client.get("/api/stats/nutrition/range?from=2026-03-07&to=2026-03-01", headers=auth_headers).status_code == 422
+    assert client.get("/api/stats/nutrition/range?from=2024-01-01&to=2026-03-01", headers=auth_headers).status_code == 422
+    assert client.get("/api/stats/nutrition/range?from=2026-03-01", headers=auth_headers).status_code == 422
+
+def test_nutrition_range_columnar(client, auth_headers, db_session, user):
+    add_meal(db_session, user, date(2026, 3, 2), 800)
+    db_session.commit()
+    
+    stats = client.get("/api/stats/nutrition/range?from=2026-03-01&to=2026-03-03&format=columnar",
+                       headers=auth_headers).json()
+    assert stats["calories_by_day"]["calories"] == [0, 800, 0]
+    assert stats["total_calories"] == 800
+
+def test_nutrition_range_shapes_are_declared(client, auth_headers):
+    responses = client.app.openapi()["paths"]["/api/stats/nutrition/range"]["get"]["responses"]
+    declared = json.dumps(responses["200"])
+    assert "NutritionStats" in declared and "NutritionStatsColumnar" in declared
+
+    columnar = client.get("/api/stats/nutrition/range?from=2026-03-01&to=2026-03-03&format=columnar&delta=true",
+                          headers=auth_headers).json()
+    assert (columnar["calories_by_day"]["date_start"], columnar["calories_by_day"]["date"]) == ("2026-03-01", [0, 1, 1])
+    rows = client.get("/api/stats/nutrition/range?from=2026-03-01&to=2026-03-01", headers=auth_headers).json()
+    assert set(rows["calories_by_day"][0]) == set(schemas.NutritionDay.model_fields)
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from backend.app.auth import create_access_token
+from backend.app.events import event_bus
+
+MEAL = {"name": "Рис", "meal_type": "lunch", "date": "2026-03-02", "calories": 500}
+
+async def read_events(chunks, count):
+    """Первые count событий потока (без retry и пингов) как (тип, данные)."""
+    events = []
+    while len(events) < count:
+        chunk = await asyncio.wait_for(chunks.get(), 5)
+        for block in chunk.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+            if "event" in lines:
+                events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_write_is_pushed_to_dashboard_stream(app, client, auth_headers, user):
+    # TestClient отдает потоковый ответ только целиком, поэтому приложение вызывается напрямую
+    async def main():
+        chunks = asyncio.Queue()
+        disconnected = asyncio.Event()
+        token = create_access_token(data={"user_id": user.id})
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/stream/dashboard", "raw_path": b"/api/stream/dashboard",
+            "query_string": f"token={token}".encode(), "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80), "root_path": "",
+        }
+        statuses = []
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message.get("body"):
+                chunks.put_nowait(message["body"].decode())
+
+        stream = asyncio.create_task(app(scope, receive, send))
+        assert (await asyncio.wait_for(chunks.get(), 5)).startswith("retry:")
+        assert statuses == [200]
+        assert event_bus.has_subscribers(user.id)
+
+        # запись идет через обычный API в другом потоке
+        response = await asyncio.to_thread(client.post, "/api/meals/", headers=auth_headers, json=MEAL)
+        assert response.status_code == 201
+        meal, totals = await read_events(chunks, 2)
+        assert meal == ("meal", {**meal[1], "action": "created", "id": response.json()["id"], "name": "Рис"})
+        assert totals == ("daily_totals", {**totals[1], "date": "2026-03-02", "meal_count": 1})
+        assert totals[1]["totals"]["calories"] == 500
+
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
+        assert not event_bus.has_subscribers(user.id)
+
+    asyncio.run(main())
+
+def test_stream_requires_token(client):
+    assert client.get("/api/stream/dashboard").status_code == 401
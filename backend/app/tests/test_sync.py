@@ -0,0 +1,79 @@
+from backend.app import models
+from backend.app.tests.test_workouts import create_workout
+
+MEAL = {"name": "Рис", "meal_type": "lunch", "date": "2026-03-02", "calories": 500}
+
+def sync(client, headers, since=None):
+    response = client.get("/api/sync/", params={"since": since} if since else {}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_full_sync_then_empty_delta(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    client.post("/api/meals/", headers=auth_headers, json=MEAL)
+
+    full = sync(client, auth_headers)
+    assert full["full"] is True
+    assert [w["id"] for w in full["workouts"]] == [workout["id"]]
+    assert len(full["workouts"][0]["exercises"]) == 2
+    assert len(full["meals"]) == 1
+
+    delta = sync(client, auth_headers, full["token"])
+    assert delta["full"] is False
+    assert (delta["workouts"], delta["meals"]) == ([], [])
+    assert delta["token"] == full["token"]
+
+def test_delta_contains_only_changes(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    meal = client.post("/api/meals/", headers=auth_headers, json=MEAL).json()
+    token = sync(client, auth_headers)["token"]
+
+    bench = workout["exercises"][0]
+    client.patch(f"/api/workouts/{workout['id']}", headers=auth_headers, json={
+        "exercises": [{"id": bench["id"], "sets": [{"id": bench["sets"][0]["id"], "weight": 90}]}]
+    })
+    delta = sync(client, auth_headers, token)
+    # изменение подхода отдает тренировку целиком
+    assert [w["id"] for w in delta["workouts"]] == [workout["id"]]
+    assert delta["meals"] == []
+
+    # запись в обход ORM тоже получает номер изменения
+    client.post("/api/bulk/meals/update", headers=auth_headers, json={"ids": [meal["id"]], "values": {"calories": 450}})
+    delta = sync(client, auth_headers, delta["token"])
+    assert [(m["id"], m["calories"]) for m in delta["meals"]] == [(meal["id"], 450)]
+    assert delta["workouts"] == []
+
+def test_delta_reports_tombstones(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    meals = [client.post("/api/meals/", headers=auth_headers, json=MEAL).json() for _ in range(2)]
+    token = sync(client, auth_headers)["token"]
+
+    client.patch(f"/api/workouts/{workout['id']}", headers=auth_headers,
+                 json={"remove_exercises": [workout["exercises"][1]["id"]]})
+    client.delete(f"/api/meals/{meals[0]['id']}", headers=auth_headers)
+    client.post("/api/bulk/meals/delete", headers=auth_headers, json={"ids": [meals[1]["id"]]})
+
+    delta = sync(client, auth_headers, token)
+    assert delta["deleted"]["exercises"] == [workout["exercises"][1]["id"]]
+    assert delta["deleted"]["meals"] == [meals[0]["id"], meals[1]["id"]]
+    assert sync(client, auth_headers, delta["token"])["deleted"]["meals"] == []
+
+def test_write_committed_after_sync_is_not_lost(client, auth_headers, db_session, user):
+    token = sync(client, auth_headers)["token"]
+
+    # транзакция получила номер до синхронизации, а зафиксировалась после нее
+    db_session.add(models.Meal(user_id=user.id, name="Гречка", meal_type="dinner", calories=300))
+    db_session.flush()
+    during = sync(client, auth_headers, token)
+    assert during["meals"] == []
+    db_session.commit()
+
+    assert [m["name"] for m in sync(client, auth_headers, during["token"])["meals"]] == ["Гречка"]
+
+def test_tokens(client, auth_headers):
+    client.post("/api/meals/", headers=auth_headers, json=MEAL)
+
+    assert client.get("/api/sync/?since=abc", headers=auth_headers).status_code == 400
+    # токен старого формата (время) дает полную синхронизацию
+    legacy = sync(client, auth_headers, "1767225600000000")
+    assert legacy["full"] is True and len(legacy["meals"]) == 1
@@ -0,0 +1,129 @@
+from datetime import date
+
+WORKOUT = {
+    "name": "Силовая",
+    "date": "2026-03-02",
+    "duration": 60,
+    "exercises": [
+        {"name": "Жим лежа", "order": 0, "sets": [
+            {"set_number": 1, "reps": 8, "weight": 80},
+            {"set_number": 2, "reps": 8, "weight": 80}
+        ]},
+        {"name": "Тяга", "order": 1, "sets": [{"set_number": 1, "reps": 10, "weight": 60}]}
+    ]
+}
+
+def create_workout(client, headers, **fields):
+    response = client.post("/api/workouts/", json={**WORKOUT, **fields}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def test_database_is_fresh_for_each_test(client, auth_headers):
+    assert client.get("/api/workouts/", headers=auth_headers).json() == []
+    create_workout(client, auth_headers)
+    assert len(client.get("/api/workouts/", headers=auth_headers).json()) == 1
+
+def test_database_is_fresh_again(client, auth_headers):
+    assert client.get("/api/workouts/", headers=auth_headers).json() == []
+
+def test_create_and_get_workout(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    
+    response = client.get(f"/api/workouts/{workout['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert [len(exercise["sets"]) for exercise in response.json()["exercises"]] == [2, 1]
+
+def test_workout_of_other_user_is_hidden(client, auth_headers, make_user, headers_for):
+    workout = create_workout(client, auth_headers)
+    other = headers_for(make_user("other"))
+    
+    assert client.get(f"/api/workouts/{workout['id']}", headers=other).status_code == 404
+    assert client.delete(f"/api/workouts/{workout['id']}", headers=other).status_code == 404
+
+def test_patch_updates_one_set(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    bench = workout["exercises"][0]
+    
+    response = client.patch(f"/api/workouts/{workout['id']}", headers=auth_headers, json={
+        "exercises": [{"id": bench["id"], "sets": [{"id": bench["sets"][0]["id"], "weight": 85}]}]
+    })
+    assert response.status_code == 200, response.text
+    weights = {s["id"]: s["weight"] for e in response.json()["exercises"] for s in e["sets"]}
+    assert weights[bench["sets"][0]["id"]] == 85
+    assert weights[bench["sets"][1]["id"]] == 80
+
+def test_clone_copies_tree(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    
+    response = client.post(f"/api/workouts/{workout['id']}/clone?date=2026-03-09", headers=auth_headers)
+    assert response.status_code == 201, response.text
+    clone = response.json()
+    assert clone["date"] == "2026-03-09"
+    assert [e["name"] for e in clone["exercises"]] == [e["name"] for e in workout["exercises"]]
+
+def synced_workouts(client, headers, token):
+    delta = client.get("/api/sync/", params={"since": token}, headers=headers).json()
+    return [w["id"] for w in delta["workouts"]], delta["token"]
+
+def test_clone_appears_in_sync_delta(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    token = client.get("/api/sync/", headers=auth_headers).json()["token"]
+
+    clone = client.post(f"/api/workouts/{workout['id']}/clone", headers=auth_headers).json()
+    ids, new_token = synced_workouts(client, auth_headers, token)
+    assert ids == [clone["id"]]
+    assert new_token != token
+
+def test_applied_template_appears_in_sync_delta(client, auth_headers):
+    workout = create_workout(client, auth_headers)
+    template = client.post(f"/api/templates/from-workout/{workout['id']}", headers=auth_headers).json()
+    token = client.get("/api/sync/", headers=auth_headers).json()["token"]
+
+    response = client.post(f"/api/templates/{template['id']}/apply", headers=auth_headers)
+    assert response.status_code == 201, response.text
+    assert synced_workouts(client, auth_headers, token)[0] == [response.json()["id"]]
+
+def test_bulk_delete_by_range(client, auth_headers, db_session):
+    from backend.app import models
+    
+    for day in (1, 2, 3):
+        create_workout(client, auth_headers, date=str(date(2026, 4, day)))
+    
+    response = client.post("/api/bulk/workouts/delete", headers=auth_headers,
+                           json={"date_from": "2026-04-01", "date_to": "2026-04-02"})
+    assert response.json() == {"count": 2}
+    assert db_session.query(models.ExerciseSet).count() == 3
+
+def test_batch_uses_parent_session(client, auth_headers):
+    create_workout(client, auth_headers)
+    
+    response = client.post("/api/batch", headers=auth_headers, json={"requests": [
+        {"path": "/workouts/"},
+        {"path": "/stats/dashboard"}
+    ]})
+    assert response.status_code == 200, response.text
+    responses = response.json()["responses"]
+    assert [item["status"] for item in responses] == [200, 200]
+    assert len(responses[0]["body"]) == 1
+
+def test_summary_applies_period_to_every_part(client, auth_headers):
+    today = date.today()
+    long_ago = date(today.year - 2, 1, 15)
+    create_workout(client, auth_headers, date=str(today), duration=40,
+                   exercises=[{"name": "Присед", "sets": []}])
+    create_workout(client, auth_headers, date=str(long_ago), duration=90)
+    
+    month = client.get("/api/workouts/stats/summary?period=month", headers=auth_headers).json()
+    assert month["total_workouts"] == 1
+    assert month["total_duration_minutes"] == 40
+    assert month["favorite_exercises"] == [{"name": "Присед", "count": 1}]
+    assert "workouts_by_month" not in month
+    
+    everything = client.get("/api/workouts/stats/summary?period=all&by_month=true", headers=auth_headers).json()
+    assert everything["total_workouts"] == 2
+    assert everything["avg_duration"] == 65
+    assert {e["name"] for e in everything["favorite_exercises"]} == {"Присед", "Жим лежа", "Тяга"}
+    assert everything["workouts_by_month"] == {
+        long_ago.strftime("%Y-%m"): {"count": 1, "total_duration": 90},
+        today.strftime("%Y-%m"): {"count": 1, "total_duration": 40}
+    }
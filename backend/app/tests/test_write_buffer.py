@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend.app import models, schemas
+from backend.app.write_buffer import WriteBuffer
+
+def meal(name="Рис"):
+    return schemas.MealBase(name=name, meal_type="lunch", calories=300)
+
+def count(db, model):
+    return db.query(model).count()
+
+def last_seq(db):
+    db.expire_all()
+    state = db.get(models.WriteBufferState, 1)
+    return state.last_seq if state else 0
+
+def dead_letters(buffer):
+    if not os.path.exists(buffer.dead_letter_path):
+        return []
+    with open(buffer.dead_letter_path, encoding="utf-8") as dead:
+        return [json.loads(line) for line in dead]
+
+def files(tmp_path):
+    return sorted(path.name for path in tmp_path.iterdir() if path.name.startswith("buffer"))
+
+@pytest.fixture
+def buffer(db_engine, tmp_path):
+    buffer = WriteBuffer(path=str(tmp_path / "buffer"))
+    yield buffer
+    if buffer._journal is not None:
+        buffer._journal.close()
+
+def crash(buffer):
+    # процесс падает: память теряется, на диске остаются журнал и сегменты
+    buffer._journal.close()
+    buffer._journal = None
+    return WriteBuffer(path=buffer.path)
+
+@pytest.fixture
+def exercise(db_session, user):
+    workout = models.Workout(user_id=user.id, name="Силовая")
+    workout.exercises.append(models.Exercise(name="Жим лежа", order=0))
+    db_session.add(workout)
+    db_session.commit()
+    return workout.exercises[0]
+
+def test_appended_entries_reach_database_on_flush(buffer, db_session, user, exercise, tmp_path):
+    assert buffer.append("meal", user.id, meal()) == 1
+    buffer.append("set", user.id, schemas.ExerciseSetCreate(set_number=1, reps=5, weight=100), exercise_id=exercise.id)
+    assert buffer.pending == 2
+    assert count(db_session, models.Meal) == 0
+
+    assert buffer.flush() == 2
+    assert (count(db_session, models.Meal), count(db_session, models.ExerciseSet)) == (1, 1)
+    assert buffer.pending == 0
+    assert last_seq(db_session) == 2
+    # журнал не переписывается: сегмент с пачкой удален, новый журнал пуст
+    assert files(tmp_path) == ["buffer"]
+    assert os.path.getsize(buffer.path) == 0
+    assert buffer.flush() == 0
+
+def test_journal_is_replayed_after_crash(buffer, db_session, user):
+    for name in ("Рис", "Гречка", "Овсянка"):
+        buffer.append("meal", user.id, meal(name))
+    with open(buffer.path, "a", encoding="utf-8") as journal:
+        journal.write('{"kind": "meal", "user_id": ')
+
+    restarted = crash(buffer)
+    assert restarted.flush() == 3
+    assert sorted(name for (name,) in db_session.query(models.Meal.name)) == ["Гречка", "Овсянка", "Рис"]
+
+    # недописанная строка не портит следующие записи
+    assert restarted.append("meal", user.id, meal("Творог")) == 4
+    assert crash(restarted).flush() == 1
+    assert count(db_session, models.Meal) == 4
+
+def test_applied_entries_are_skipped_by_last_seq(buffer, db_session, user, tmp_path):
+    buffer.append("meal", user.id, meal())
+    buffer.append("meal", user.id, meal())
+    with open(buffer.path, encoding="utf-8") as journal:
+        journal_before_flush = journal.read()
+    buffer.flush()
+
+    # падение после коммита, но до удаления сегмента
+    with open(f"{buffer.path}.2", "w", encoding="utf-8") as segment:
+        segment.write(journal_before_flush)
+    restarted = crash(buffer)
+    restarted.flush()
+    assert count(db_session, models.Meal) == 2
+    assert files(tmp_path) == ["buffer"]
+    assert restarted.append("meal", user.id, meal()) == 3
+
+def test_bad_entry_goes_to_dead_letter_file(buffer, db_session, user, caplog):
+    for name in ("Рис", "Гречка", "Овсянка", "Творог", "Кефир"):
+        buffer.append("meal", user.id, meal(name))
+    # ошибка базы (NOT NULL) и ошибка схемы
+    buffer._pending[1]["user_id"] = None
+    buffer._pending[3]["values"]["meal_type"] = None
+
+    with caplog.at_level(logging.WARNING, logger="backend.app.write_buffer"):
+        assert buffer.flush() == 5
+    assert sorted(name for (name,) in db_session.query(models.Meal.name)) == ["Кефир", "Овсянка", "Рис"]
+    assert sorted(record["seq"] for record in dead_letters(buffer)) == [2, 4]
+    assert all(record["error"] for record in dead_letters(buffer))
+    assert len([r for r in caplog.records if "отброшена" in r.getMessage()]) == 2
+    assert last_seq(db_session) == 5
+    assert buffer.pending == 0
+
+def test_sets_of_deleted_exercise_are_reported(buffer, db_session, user, exercise):
+    buffer.append("set", user.id, schemas.ExerciseSetCreate(set_number=1, reps=5, weight=100), exercise_id=exercise.id)
+    buffer.append("meal", user.id, meal())
+    db_session.delete(exercise.workout)
+    db_session.commit()
+
+    assert buffer.flush() == 2
+    assert count(db_session, models.ExerciseSet) == 0
+    assert count(db_session, models.Meal) == 1
+    assert [(record["seq"], record["error"]) for record in dead_letters(buffer)] == [(1, "Упражнение удалено")]
+
+def test_transient_failure_keeps_batch(buffer, db_session, user, monkeypatch, tmp_path):
+    buffer.append("meal", user.id, meal())
+
+    def locked(db, batch):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(buffer, "_apply", locked)
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    assert buffer.pending == 1
+    assert dead_letters(buffer) == []
+    assert files(tmp_path) == ["buffer", "buffer.1"]
+
+    # повторная неудача не теряет сегмент, а записи после нее идут в новый журнал
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    buffer.append("meal", user.id, meal())
+    assert files(tmp_path) == ["buffer", "buffer.1"]
+
+    monkeypatch.undo()
+    assert buffer.flush() == 2
+    assert count(db_session, models.Meal) == 2
+    assert files(tmp_path) == ["buffer"]
+
+def test_clients_cannot_force_flush(client, auth_headers):
+    # сброс общий для всех пользователей, его делает только фоновый поток
+    assert client.post("/api/buffered/flush", headers=auth_headers).status_code in (404, 405)
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from backend.app import models, schemas
+from backend.app.cache import result_cache
+from backend.app.database import SHARDS, SessionLocal, open_shard_session, shard_names, user_shards
+from backend.app.events import publish_refresh
+
+logger = logging.getLogger(__name__)
+
+BUFFER_PATH = os.getenv("FITLOG_BUFFER_PATH", "./fitlog.db-buffer")
+FLUSH_INTERVAL_MS = int(os.getenv("FITLOG_BUFFER_FLUSH_MS", "200"))
+FLUSH_MAX_ROWS = int(os.getenv("FITLOG_BUFFER_MAX_ROWS", "500"))
+
+# вид записи -> (модель, схема, по которой значения восстанавливаются из журнала)
+BUFFERED_KINDS = {
+    "set": (models.ExerciseSet, schemas.ExerciseSetCreate),
+    "meal": (models.Meal, schemas.MealBase),
+    "measurement": (models.Measurement, schemas.MeasurementCreate),
+}
+
+# вид записи -> раздел, который перечитывает дашборд после сброса
+REFRESHED_ENTITIES = {"set": "workouts", "meal": "meals", "measurement": "measurements"}
+
+# ошибки данных отдельной записи; остальные (блокировка, диск) - повод повторить пачку целиком
+BAD_ENTRY_ERRORS = (IntegrityError, DataError)
+
+class WriteBuffer:
+    """Буфер отложенной записи для частых мелких вставок.
+
+    Запись подтверждается после добавления строки в журнал на диске (с fsync)
+    и в очередь в памяти. Фоновая задача раз в flush_interval секунд или при
+    накоплении max_rows записей вставляет очередь одной транзакцией (по одной
+    на шард). Номер последней вставленной записи хранится в той же транзакции,
+    поэтому после падения журнал воспроизводится без дублей. Рассчитан на
+    один процесс.
+
+    Перед сбросом журнал переименовывается в сегмент path.<последний seq>,
+    новые записи идут в пустой журнал; после сброса сегменты удаляются.
+    Записи, которые база не принимает, попадают в path.dead и не держат
+    остальные: при ошибке данных пачка делится пополам, пока плохая запись
+    не останется одна.
+    """
+
+    def __init__(self, path: str = BUFFER_PATH, flush_interval: float = FLUSH_INTERVAL_MS / 1000,
+                 max_rows: int = FLUSH_MAX_ROWS):
+        self.path = path
+        self.dead_letter_path = path + ".dead"
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._pending = []
+        self._seq = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # первый сброс заодно воспроизводит журнал, оставшийся после падения
+        await self._loop.run_in_executor(None, self.flush)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # дописываем все, что успели подтвердить клиентам
+        await self._loop.run_in_executor(None, self.flush)
+
+    def append(self, kind: str, user_id: int, data: BaseModel, **parent) -> int:
+        entry = {
+            "kind": kind,
+            "user_id": user_id,
+            "values": {**data.model_dump(mode="json"), **parent},
+        }
+        with self._lock:
+            self._open()
+            self._seq += 1
+            entry["seq"] = self._seq
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_rows
+
+        if full and self.running:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return entry["seq"]
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                self._open()
+                batch = list(self._pending)
+                if batch:
+                    self._rotate()
+            if not batch:
+                return 0
+
+            db = SessionLocal()
+            try:
+                shards = user_shards(db, {entry["user_id"] for entry in batch})
+            finally:
+                db.close()
+            
+            groups = defaultdict(list)
+            for entry in batch:
+                if entry["user_id"] in shards:
+                    groups[shards[entry["user_id"]]].append(entry)
+            
+            # каждый шард - своя транзакция; после частичной ошибки уже вставленное
+            # в шард отсеется при повторе по его last_seq
+            for shard, entries in groups.items():
+                self._flush_shard(shard, entries)
+
+            for entry in batch:
+                if entry["user_id"] not in shards:
+                    self._dead_letter(entry, "Пользователь удален")
+
+            with self._lock:
+                del self._pending[:len(batch)]
+            for seq, segment in self._segments():
+                if seq <= batch[-1]["seq"]:
+                    os.remove(segment)
+
+            entities = defaultdict(set)
+            for entry in batch:
+                entities[entry["user_id"]].add(REFRESHED_ENTITIES[entry["kind"]])
+            for user_id, names in entities.items():
+                result_cache.invalidate_user(user_id)
+                publish_refresh(user_id, *names)
+            return len(batch)
+
+    def _flush_shard(self, shard, entries):
+        db = open_shard_session(shard)
+        try:
+            rejected = self._apply(db, entries)
+            db.commit()
+        except BAD_ENTRY_ERRORS as error:
+            db.rollback()
+            rejected, failure = None, error
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if rejected is not None:
+            for entry, reason in rejected:
+                self._dead_letter(entry, reason)
+            return
+
+        if len(entries) == 1:
+            self._dead_letter(entries[0], str(failure.orig))
+            self._skip(shard, entries[0]["seq"])
+            return
+        middle = len(entries) // 2
+        self._flush_shard(shard, entries[:middle])
+        self._flush_shard(shard, entries[middle:])
+
+    def _apply(self, db, batch):
+        """Вставляет записи пачки и возвращает отброшенные как [(запись, причина)]."""
+        state = db.get(models.WriteBufferState, 1)
+        applied = state.last_seq if state else 0
+        batch = [entry for entry in batch if entry["seq"] > applied]
+        if not batch:
+            return []
+        
+        rejected = []
+        rows = defaultdict(list)
+        for entry in batch:
+            schema = BUFFERED_KINDS[entry["kind"]][1]
+            try:
+                values = schema.model_validate(entry["values"]).dict()
+            except ValidationError as error:
+                rejected.append((entry, str(error)))
+                continue
+            if entry["kind"] == "set":
+                values["exercise_id"] = entry["values"]["exercise_id"]
+            else:
+                values["user_id"] = entry["user_id"]
+            rows[entry["kind"]].append((entry, values))
+
+        sets = rows.get("set", [])
+        if sets:
+            exercise_ids = {values["exercise_id"] for _, values in sets}
+            existing = set(db.scalars(select(models.Exercise.id).where(models.Exercise.id.in_(exercise_ids))))
+            # упражнение могли удалить, пока подход ждал в буфере
+            rejected.extend((entry, "Упражнение удалено") for entry, values in sets if values["exercise_id"] not in existing)
+            rows["set"] = [(entry, values) for entry, values in sets if values["exercise_id"] in existing]
+            # вставка в обход ORM не вызывает before_flush из sync.py
+            db.execute(
+                update(models.Workout)
+                .where(models.Workout.id.in_(
+                    select(models.Exercise.workout_id).where(models.Exercise.id.in_(existing))
+                ))
+                .values(updated_at=datetime.utcnow())
+            )
+
+        for kind, kind_rows in rows.items():
+            if kind_rows:
+                db.execute(insert(BUFFERED_KINDS[kind][0]), [values for _, values in kind_rows])
+
+        if state is None:
+            db.add(models.WriteBufferState(id=1, last_seq=batch[-1]["seq"]))
+        else:
+            state.last_seq = batch[-1]["seq"]
+        return rejected
+
+    def _skip(self, shard, seq: int):
+        # отброшенная запись не должна вернуться при воспроизведении журнала
+        db = open_shard_session(shard)
+        try:
+            state = db.get(models.WriteBufferState, 1)
+            if state is None:
+                db.add(models.WriteBufferState(id=1, last_seq=seq))
+            elif state.last_seq < seq:
+                state.last_seq = seq
+            db.commit()
+        finally:
+            db.close()
+
+    def _dead_letter(self, entry: dict, reason: str):
+        logger.warning("Запись буфера %s (%s) отброшена: %s", entry["seq"], entry["kind"], reason)
+        record = {**entry, "error": reason, "rejected_at": datetime.utcnow().isoformat()}
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead:
+            dead.write(json.dumps(record, ensure_ascii=False) + "\n")
+            dead.flush()
+            os.fsync(dead.fileno())
+
+    def _segments(self):
+        directory, name = os.path.split(os.path.abspath(self.path))
+        segments = []
+        for filename in os.listdir(directory):
+            prefix, _, suffix = filename.rpartition(".")
+            if prefix == name and suffix.isdigit():
+                segments.append((int(suffix), os.path.join(directory, filename)))
+        return sorted(segments)
+
+    def _rotate(self):
+        # вызывается под self._lock, когда весь журнал попал в сбрасываемую пачку;
+        # после неудачного сброса журнал пуст, а его записи уже лежат в сегменте
+        if os.path.getsize(self.path) == 0:
+            return
+        self._journal.close()
+        os.replace(self.path, f"{self.path}.{self._seq}")
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def _open(self):
+        # вызывается под self._lock
+        if self._journal is not None:
+            return
+
+        applied = 0
+        for shard in (shard_names() if SHARDS else [None]):
+            db = open_shard_session(shard)
+            try:
+                state = db.get(models.WriteBufferState, 1)
+                applied = max(applied, state.last_seq if state else 0)
+            finally:
+                db.close()
+
+        # уже вставленные записи отсеиваются в _apply по last_seq своего шарда
+        self._seq = applied
+        self._pending = []
+        journal_entries = 0
+        paths = [segment for _, segment in self._segments()]
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        for path in paths:
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # недописанная строка при падении: клиент ее подтверждения не получил
+                        break
+                    self._seq = max(self._seq, entry["seq"])
+                    self._pending.append(entry)
+                    journal_entries += path == self.path
+        if self._pending:
+            logger.info("Восстановлено записей из журнала буфера: %s", len(self._pending))
+
+        # после недописанной строки новые записи нельзя дописывать в тот же файл
+        if journal_entries:
+            os.replace(self.path, f"{self.path}.{self._seq}")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._loop.run_in_executor(None, self.flush)
+            except Exception:
+                logger.exception("Ошибка сброса буфера записи")
+
+write_buffer = WriteBuffer()
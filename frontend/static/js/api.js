@@ -57,6 +57,40 @@ class FitLogAPI {
         }
     }
 
+    async batch(paths) {
+        const data = await this.request('/batch', {
+            method: 'POST',
+            body: JSON.stringify({ requests: paths.map(path => ({ path })) })
+        })
+        return data.responses
+    }
+
+    async requestPacked(endpoint) {
+        const separator = endpoint.includes('?') ? '&' : '?'
+        const response = await fetch(`${API_BASE_URL}${endpoint}${separator}format=packed`, {
+            headers: this.token ? { 'Authorization': `Bearer ${this.token}` } : {}
+        })
+
+        if (!response.ok) {
+            throw new Error(`Ошибка (${response.status})`)
+        }
+
+        const buffer = await response.arrayBuffer()
+        const headerLength = new DataView(buffer).getUint32(0, true)
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)))
+        const dataOffset = 4 + headerLength
+
+        const result = { ...header.meta }
+        for (const table of header.tables) {
+            const columns = { ...table.strings }
+            for (const column of table.columns) {
+                columns[column.name] = new Float32Array(buffer, dataOffset + column.offset, table.rows)
+            }
+            result[table.name] = columns
+        }
+        return result
+    }
+
     async register(userData) {
         if (!userData.email || !userData.password) {
             throw new Error('Email и пароль обязательны')
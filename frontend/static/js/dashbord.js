@@ -22,18 +22,32 @@ async function loadDashboardData() {
         document.getElementById('userEmail').textContent = user.email
         document.getElementById('currentUserEmail').textContent = user.email
         
-        await loadStats()
-        await loadWorkouts()
-        await loadGoals()
+        let batched = []
+        try {
+            batched = await api.batch(['/stats/dashboard', '/workouts/?limit=5', '/goals/'])
+        } catch (error) {
+            batched = []
+        }
+        
+        await loadStats(batched[0])
+        await loadWorkouts(batched[1])
+        await loadGoals(batched[2])
         
     } catch (error) {
         showNotification('Ошибка загрузки данных', 'error')
     }
 }
 
-async function loadStats() {
+function batchBody(item) {
+    if (item.status >= 400) {
+        throw new Error(item.body?.detail || `Ошибка (${item.status})`)
+    }
+    return item.body
+}
+
+async function loadStats(preloaded) {
     try {
-        const stats = await api.request('/stats/dashboard')
+        const stats = preloaded ? batchBody(preloaded) : await api.request('/stats/dashboard')
         updateStatsUI(stats)
     } catch (error) {
         document.getElementById('statsGrid').innerHTML = `
@@ -82,9 +96,9 @@ function updateStatsUI(stats) {
     `
 }
 
-async function loadWorkouts() {
+async function loadWorkouts(preloaded) {
     try {
-        const workouts = await api.request('/workouts/?limit=5')
+        const workouts = preloaded ? batchBody(preloaded) : await api.request('/workouts/?limit=5')
         updateWorkoutsUI(workouts)
     } catch (error) {
         document.getElementById('workoutsList').innerHTML = `
@@ -125,9 +139,9 @@ function updateWorkoutsUI(workouts) {
     `).join('')
 }
 
-async function loadGoals() {
+async function loadGoals(preloaded) {
     try {
-        const goals = await api.request('/goals/')
+        const goals = preloaded ? batchBody(preloaded) : await api.request('/goals/')
         const activeGoals = goals.filter(g => !g.is_completed)
         updateGoalsUI(activeGoals)
     } catch (error) {
@@ -5,6 +5,11 @@ from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from pathlib import Path
 from sqlalchemy import text
 from backend.app.database import SessionLocal
+from backend.app.idempotency import idempotency_compactor
+from backend.app.jobs import job_runner
+from backend.app.live import live_state_purger
+from backend.app.write_buffer import write_buffer
+from backend.app.ratelimit import RateLimitMiddleware
 
 app = FastAPI(title="FitLog", docs_url=None, redoc_url=None)
 
@@ -13,7 +18,20 @@ async def startup_event():
     db = SessionLocal()
     db.execute(text("SELECT 1"))
     db.close()
+    await job_runner.start()
+    await write_buffer.start()
+    await idempotency_compactor.start()
+    await live_state_purger.start()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await live_state_purger.stop()
+    await idempotency_compactor.stop()
+    await write_buffer.stop()
+    await job_runner.stop()
+
+# лимиты внутри CORS, чтобы ответы 429/503 тоже несли CORS-заголовки
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,8 +40,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from backend.app.database import engine, Base
-Base.metadata.create_all(bind=engine)
+from backend.app.database import init_db
+init_db()
 
 BASE_DIR = Path(__file__).parent
 FRONTEND_DIR = BASE_DIR / "frontend"
@@ -37,6 +55,9 @@ app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 try:
     from backend.app.routers import users_router, workouts_router, meals_router
     from backend.app.routers import measurements_router, goals_router, stats_router
+    from backend.app.routers import search_router, foods_router, batch_router, sync_router
+    from backend.app.routers import jobs_router, buffered_router, templates_router, bulk_router
+    from backend.app.routers import live_router, stream_router
     
     app.include_router(users_router, prefix="/api")
     app.include_router(workouts_router, prefix="/api")
@@ -44,6 +65,16 @@ try:
     app.include_router(measurements_router, prefix="/api")
     app.include_router(goals_router, prefix="/api")
     app.include_router(stats_router, prefix="/api")
+    app.include_router(search_router, prefix="/api")
+    app.include_router(foods_router, prefix="/api")
+    app.include_router(batch_router, prefix="/api")
+    app.include_router(sync_router, prefix="/api")
+    app.include_router(jobs_router, prefix="/api")
+    app.include_router(buffered_router, prefix="/api")
+    app.include_router(templates_router, prefix="/api")
+    app.include_router(bulk_router, prefix="/api")
+    app.include_router(live_router, prefix="/api")
+    app.include_router(stream_router, prefix="/api")
     
 except ImportError:
     @app.post("/api/users/register")